@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+数据分析模块
+将电影快照一次性加载为列式数组，并提供向量化的聚合分析
+
+支持的分析:
+- 按国家/地区统计想看人数
+- 按上映周统计想看人数
+- 每部电影的评论数量
+- 同一电影在不同城市之间的想看人数差异
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Tuple, Union
+from models import Movie, movies_from_dicts
+
+# 快照来源: JSON 文件路径或 Movie 列表
+SnapshotSource = Union[str, Sequence[Movie]]
+
+# 国家/地区分隔符，如 "中国大陆 / 美国"
+COUNTRY_SEPARATOR = r'\s*[/,，、]\s*'
+
+# 上映日期，如 "2026-05-01"、"2026-05-01(中国大陆)"、"2026"
+RELEASE_DATE_PATTERN = r'(?P<year>\d{4})(?:[-./年](?P<month>\d{1,2}))?(?:[-./月](?P<day>\d{1,2}))?'
+
+
+def _parse_unique(values: pd.Series, parse) -> pd.Series:
+    """
+    只解析去重后的取值，再按编码映射回每一行
+
+    Args:
+        values: 字符串列
+        parse: 以去重后的字符串 Series 为参数的向量化解析函数
+
+    Returns:
+        与 values 等长的解析结果
+    """
+    codes, uniques = pd.factorize(values.fillna('').astype(str))
+    parsed = parse(pd.Series(uniques, dtype=object))
+    return parsed.take(codes).reset_index(drop=True)
+
+
+def _primary_country(countries: pd.Series) -> pd.Series:
+    """取第一个国家/地区作为主要国家"""
+    primary = countries.str.split(COUNTRY_SEPARATOR, n=1, regex=True).str[0].str.strip()
+    return primary.replace('', '未知')
+
+
+def _all_countries(countries: pd.Series) -> pd.Series:
+    """拆分出全部国家/地区"""
+    return countries.map(
+        lambda text: [c for c in re.split(COUNTRY_SEPARATOR, text.strip()) if c] or ['未知'])
+
+
+def _release_dates(texts: pd.Series) -> pd.Series:
+    """解析上映日期，缺失的月/日按 1 补齐"""
+    parts = texts.str.extract(RELEASE_DATE_PATTERN)
+    return pd.to_datetime(
+        pd.DataFrame({
+            'year': pd.to_numeric(parts['year'], errors='coerce'),
+            'month': pd.to_numeric(parts['month'], errors='coerce').fillna(1),
+            'day': pd.to_numeric(parts['day'], errors='coerce').fillna(1),
+        }),
+        errors='coerce',
+    )
+
+
+class MovieAnalytics:
+    """电影快照分析器类"""
+
+    def __init__(self):
+        """初始化分析器"""
+        # 快照键 -> 列式数据
+        self._frames: Dict[str, pd.DataFrame] = {}
+        # (快照键, 分析名称, 参数) -> 分析结果
+        self._results: Dict[Tuple, pd.DataFrame] = {}
+        # id(内存快照) -> (快照对象, 快照键)，内存快照在分析期间视为不可变
+        self._memory_keys: Dict[int, Tuple[Sequence[Movie], str]] = {}
+
+    # ----------------------------------------------------------------
+    # 快照加载
+    # ----------------------------------------------------------------
+
+    def snapshot_key(self, source: SnapshotSource) -> str:
+        """
+        计算快照键，文件使用路径+修改时间+大小，内存数据使用内容摘要
+
+        Args:
+            source: JSON 文件路径或 Movie 列表
+
+        Returns:
+            快照键字符串
+        """
+        if isinstance(source, str):
+            stat = os.stat(source)
+            return f"{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+        memo = self._memory_keys.get(id(source))
+        if memo is not None and memo[0] is source:
+            return memo[1]
+
+        digest = hashlib.md5()
+        for movie in source:
+            digest.update(f"{movie.movie_url}\t{movie.city}\t{movie.wish_count}\t"
+                          f"{len(movie.comments)}\n".encode('utf-8'))
+        key = f"memory:{digest.hexdigest()}"
+        self._memory_keys[id(source)] = (source, key)
+        return key
+
+    def load(self, source: SnapshotSource) -> pd.DataFrame:
+        """
+        加载快照为列式数据，同一快照只解析一次
+
+        Args:
+            source: JSON 文件路径或 Movie 列表
+
+        Returns:
+            每部电影一行的 DataFrame
+        """
+        key = self.snapshot_key(source)
+        frame = self._frames.get(key)
+        if frame is not None:
+            return frame
+
+        if isinstance(source, str):
+            with open(source, 'r', encoding='utf-8') as f:
+                movies = movies_from_dicts(json.load(f))
+        else:
+            movies = list(source)
+
+        frame = self._build_frame(movies)
+        self._frames[key] = frame
+        logging.info("加载快照 %s: %s 部电影", key, len(frame))
+        return frame
+
+    def load_many(self, sources: Sequence[SnapshotSource]) -> pd.DataFrame:
+        """
+        加载并合并多个快照（如多个城市），每个快照各自缓存
+
+        Args:
+            sources: 快照来源列表
+
+        Returns:
+            合并后的 DataFrame
+        """
+        frames = [self.load(source) for source in sources]
+        if not frames:
+            return self._build_frame([])
+        return pd.concat(frames, ignore_index=True)
+
+    def _build_frame(self, movies: List[Movie]) -> pd.DataFrame:
+        """
+        将电影记录转换为带类型的列式数据，国家和日期解析均为向量化操作
+
+        Args:
+            movies: 电影记录列表
+
+        Returns:
+            DataFrame
+        """
+        frame = pd.DataFrame({
+            'movie_id': [movie.movie_id or movie.movie_name for movie in movies],
+            'movie_name': [movie.movie_name for movie in movies],
+            'city': pd.Categorical([movie.city for movie in movies]),
+            'country_raw': [movie.country for movie in movies],
+            'release_raw': [movie.release_date for movie in movies],
+            'wish_count': np.fromiter((movie.wish_count for movie in movies),
+                                      dtype=np.int64, count=len(movies)),
+            'comment_count': np.fromiter((len(movie.comments) for movie in movies),
+                                         dtype=np.int32, count=len(movies)),
+        })
+
+        # 国家和日期字符串取值很少，只对去重后的取值做向量化解析
+        frame['country'] = _parse_unique(frame['country_raw'], _primary_country).astype('category')
+        frame['release_date'] = _parse_unique(frame['release_raw'], _release_dates)
+        frame['release_week'] = frame['release_date'].dt.to_period('W-SUN').dt.start_time
+        return frame
+
+    def _cached(self, source: SnapshotSource, name: str, params: tuple, compute) -> pd.DataFrame:
+        """
+        按快照缓存分析结果
+
+        Args:
+            source: 快照来源
+            name: 分析名称
+            params: 影响结果的参数
+            compute: 以 DataFrame 为参数的计算函数
+
+        Returns:
+            分析结果
+        """
+        cache_key = (self.snapshot_key(source), name, params)
+        result = self._results.get(cache_key)
+        if result is None:
+            result = compute(self.load(source))
+            self._results[cache_key] = result
+        return result
+
+    def clear_cache(self):
+        """清空快照与分析结果缓存"""
+        self._frames.clear()
+        self._results.clear()
+
+    # ----------------------------------------------------------------
+    # 聚合分析
+    # ----------------------------------------------------------------
+
+    def wish_by_country(self, source: SnapshotSource, all_countries: bool = False) -> pd.DataFrame:
+        """
+        按国家/地区统计想看人数
+
+        Args:
+            source: 快照来源
+            all_countries: 为True时合拍片计入每个出品国家，否则只计主要国家
+
+        Returns:
+            列为 country, movies, wish_count 的 DataFrame（按想看人数降序）
+        """
+        def compute(frame: pd.DataFrame) -> pd.DataFrame:
+            if all_countries:
+                exploded = frame.assign(
+                    country=_parse_unique(frame['country_raw'], _all_countries)
+                ).explode('country')
+                grouped = exploded.groupby('country')
+            else:
+                grouped = frame.groupby('country', observed=True)
+            result = grouped.agg(movies=('movie_id', 'nunique'), wish_count=('wish_count', 'sum'))
+            return result.sort_values('wish_count', ascending=False).reset_index()
+
+        return self._cached(source, 'wish_by_country', (all_countries,), compute)
+
+    def wish_by_release_week(self, source: SnapshotSource) -> pd.DataFrame:
+        """
+        按上映周统计想看人数（无法解析日期的电影不计入）
+
+        Args:
+            source: 快照来源
+
+        Returns:
+            列为 release_week, movies, wish_count 的 DataFrame（按周升序）
+        """
+        def compute(frame: pd.DataFrame) -> pd.DataFrame:
+            dated = frame[frame['release_week'].notna()]
+            result = dated.groupby('release_week').agg(
+                movies=('movie_id', 'nunique'), wish_count=('wish_count', 'sum'))
+            return result.sort_index().reset_index()
+
+        return self._cached(source, 'wish_by_release_week', (), compute)
+
+    def comment_counts(self, source: SnapshotSource) -> pd.DataFrame:
+        """
+        统计每部电影的评论数量
+
+        Args:
+            source: 快照来源
+
+        Returns:
+            列为 movie_id, movie_name, comment_count 的 DataFrame（按评论数降序）
+        """
+        def compute(frame: pd.DataFrame) -> pd.DataFrame:
+            result = frame.groupby('movie_id', sort=False).agg(
+                movie_name=('movie_name', 'first'), comment_count=('comment_count', 'sum'))
+            return result.sort_values('comment_count', ascending=False).reset_index()
+
+        return self._cached(source, 'comment_counts', (), compute)
+
+    def city_spread(self, sources: Sequence[SnapshotSource]) -> pd.DataFrame:
+        """
+        统计同一电影在不同城市之间的想看人数差异
+
+        Args:
+            sources: 快照来源列表（通常每个城市一个快照）
+
+        Returns:
+            列为 movie_id, movie_name, cities, wish_min, wish_max, wish_spread, wish_std
+            的 DataFrame（按差异降序）
+        """
+        keys = tuple(self.snapshot_key(source) for source in sources)
+        cache_key = (keys, 'city_spread', ())
+        result = self._results.get(cache_key)
+        if result is not None:
+            return result
+
+        frame = self.load_many(sources)
+        result = frame.groupby('movie_id', sort=False).agg(
+            movie_name=('movie_name', 'first'),
+            cities=('city', 'nunique'),
+            wish_min=('wish_count', 'min'),
+            wish_max=('wish_count', 'max'),
+            wish_std=('wish_count', 'std'),
+        )
+        result['wish_spread'] = result['wish_max'] - result['wish_min']
+        result['wish_std'] = result['wish_std'].fillna(0.0)
+        result = result.sort_values('wish_spread', ascending=False).reset_index()
+        self._results[cache_key] = result
+        return result
+
+    def dashboard(self, sources: Sequence[SnapshotSource]) -> Dict[str, pd.DataFrame]:
+        """
+        计算看板所需的全部分析结果
+
+        Args:
+            sources: 快照来源列表
+
+        Returns:
+            分析名称 -> 结果 DataFrame
+        """
+        sources = list(sources)
+        latest = sources[-1] if sources else []
+        return {
+            'wish_by_country': self.wish_by_country(latest),
+            'wish_by_release_week': self.wish_by_release_week(latest),
+            'comment_counts': self.comment_counts(latest),
+            'city_spread': self.city_spread(sources),
+        }
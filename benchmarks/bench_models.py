@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型基准测试
+对比普通字典与 __slots__ 记录类型 (Movie/Comment) 的内存占用和属性访问速度
+
+运行方式:
+    python benchmarks/bench_models.py [电影数量] [每部电影评论数]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Movie, Comment  # noqa: E402
+
+
+def make_dict_movies(n: int, comments_per_movie: int) -> list:
+    """构造字典形式的电影数据"""
+    return [
+        {
+            'movie_name': f'电影{i}',
+            'movie_url': f'https://movie.douban.com/subject/{1000000 + i}/',
+            'release_date': '2026-05-01',
+            'country': '中国大陆',
+            'wish_count': i * 7,
+            'comments': [
+                {'text': f'评论内容{i}-{j}', 'comment_id': str(j), 'rating': 4,
+                 'create_time': '2026-05-07 12:00:00'}
+                for j in range(comments_per_movie)
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def make_record_movies(n: int, comments_per_movie: int) -> list:
+    """构造 Movie/Comment 记录形式的电影数据"""
+    return [
+        Movie(
+            movie_name=f'电影{i}',
+            movie_url=f'https://movie.douban.com/subject/{1000000 + i}/',
+            release_date='2026-05-01',
+            country='中国大陆',
+            wish_count=i * 7,
+            comments=[
+                Comment(f'评论内容{i}-{j}', str(j), 4, '2026-05-07 12:00:00')
+                for j in range(comments_per_movie)
+            ],
+        )
+        for i in range(n)
+    ]
+
+
+def measure_memory(factory, *args) -> int:
+    """测量构造数据时分配的内存峰值（字节）"""
+    tracemalloc.start()
+    data = factory(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return peak
+
+
+def measure_access(movies: list, getter, repeat: int = 5) -> float:
+    """测量遍历读取 wish_count 的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = 0
+        for movie in movies:
+            total += getter(movie)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    comments_per_movie = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    dict_mem = measure_memory(make_dict_movies, n, comments_per_movie)
+    record_mem = measure_memory(make_record_movies, n, comments_per_movie)
+
+    dict_time = measure_access(make_dict_movies(n, 0), lambda m: m.get('wish_count', 0))
+    record_time = measure_access(make_record_movies(n, 0), lambda m: m.wish_count)
+
+    print(f"电影数: {n}, 每部评论数: {comments_per_movie}")
+    print(f"内存峰值  dict: {dict_mem / 1024 / 1024:8.2f} MB   "
+          f"Movie: {record_mem / 1024 / 1024:8.2f} MB   "
+          f"节省: {(1 - record_mem / dict_mem) * 100:5.1f}%")
+    print(f"属性访问  dict: {dict_time * 1000:8.2f} ms   "
+          f"Movie: {record_time * 1000:8.2f} ms   "
+          f"加速: {dict_time / record_time:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+热点路径基准测试套件
+覆盖页面解析、数据存储、分词/词频统计和图片渲染，完全离线运行
+
+数据来源:
+- 仓库中的 debug_page.html（真实豆瓣页面）和按真实结构生成的"正在上映"列表页
+- 按 Rexxar API interests 结构生成的评论 JSON，规模 1k / 100k / 1m 条评论
+  （评论文本按 Zipf 分布从电影评论常用词中抽取，固定随机种子，每次生成结果相同）
+
+每个基准测试在计时前单独准备输入（不计入耗时），重复执行取最短和中位耗时。
+结果追加到 benchmarks/history.jsonl（每行一次运行），compare 命令将最近一次运行
+与同一规模的上一次运行比较，耗时增加超过阈值的项目标记为退化并以非零状态退出。
+
+运行方式:
+    python benchmarks/bench_suite.py run [--sizes 1k,100k] [--only parse,storage] [--repeat 3]
+    python benchmarks/bench_suite.py compare [--threshold 0.1] [--size 1k]
+    python benchmarks/bench_suite.py list
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import itertools
+import random
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import warnings
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from models import Movie  # noqa: E402
+
+# 评论规模
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+# 每个样本的最短计时（秒），耗时很短的测试在一个样本内重复多次取平均，降低计时噪声
+MIN_SAMPLE_TIME = 0.2
+
+HISTORY_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'history.jsonl')
+FIXTURE_PAGE = os.path.join(ROOT_DIR, 'debug_page.html')
+
+# 生成评论文本使用的词汇（按出现频率从高到低排列）
+VOCABULARY = (
+    '电影 剧情 好看 演员 导演 故事 特效 画面 感觉 真的 觉得 还是 喜欢 一部 最后 结局 节奏 '
+    '精彩 推荐 配乐 镜头 角色 主角 表演 情节 不错 感动 失望 无聊 值得 一般 期待 演技 '
+    '剧本 观众 影院 场面 动作 喜剧 笑点 泪点 人物 逻辑 细节 叙事 风格 质感 氛围 台词 '
+    '反转 高潮 开头 铺垫 设定 世界观 情怀 续集 原著 改编 票房 口碑 制作 视觉 震撼 音效 '
+    '温暖 治愈 悬疑 紧张 刺激 搞笑 尴尬 拖沓 老套 惊喜 经典 神作 烂片 良心 用心 敷衍 '
+    '父亲 母亲 孩子 爱情 友情 青春 成长 回忆 时代 历史 战争 英雄 城市 人生 命运 梦想'
+).split()
+PUNCTUATION = '，。！？'
+
+# 正在上映列表页中单部电影的 HTML 结构
+NOWPLAYING_ITEM = (
+    '<li id="{id}" class="list-item" data-title="{title}" data-score="7.5" data-release="2026" '
+    'data-duration="120分钟" data-region="{region}" data-director="导演{i}" '
+    'data-actors="演员甲 / 演员乙" data-category="nowplaying" data-enough="True" '
+    'data-showed="True" data-votecount="{votes}" data-subject="{id}">'
+    '<ul><li class="poster"><a href="https://movie.douban.com/subject/{id}/?from=playing_poster">'
+    '<img src="https://img.doubanio.com/view/photo/s_ratio_poster/public/p{id}.jpg" alt="{title}" /></a></li>'
+    '<li class="stitle"><a href="https://movie.douban.com/subject/{id}/?from=playing_poster" '
+    'class="ticket-btn" title="{title}">{title}</a></li>'
+    '<li class="srating"><span class="rating-star allstar40"></span><span class="subject-rate">7.5</span></li>'
+    '<li class="sbtn"><a class="ticket-btn" href="https://movie.douban.com/ticket/redirect/?movie_id={id}">选座购票</a></li>'
+    '</ul></li>'
+)
+
+
+# ----------------------------------------------------------------
+# 数据生成
+# ----------------------------------------------------------------
+
+def make_comment_texts(n: int, seed: int = 42) -> List[str]:
+    """生成评论文本（词频服从 Zipf 分布）"""
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+    texts = []
+    for _ in range(n):
+        words = rng.choices(VOCABULARY, cum_weights=cum_weights, k=rng.randint(4, 24))
+        for pos in range(5, len(words), 6):
+            words[pos] += rng.choice(PUNCTUATION)
+        texts.append(''.join(words))
+    return texts
+
+
+def make_interests(n: int, seed: int = 42) -> Dict:
+    """生成 Rexxar API interests 结构的评论 JSON"""
+    rng = random.Random(seed)
+    return {
+        'count': n,
+        'start': 0,
+        'total': n,
+        'interests': [
+            {
+                'id': str(2000000000 + i),
+                'comment': text,
+                'rating': {'value': rng.randint(1, 5), 'max': 5},
+                'create_time': f'2026-05-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00',
+                'status': 'done',
+            }
+            for i, text in enumerate(make_comment_texts(n, seed))
+        ],
+    }
+
+
+def make_nowplaying_html(n_movies: int) -> str:
+    """生成"正在上映"列表页"""
+    items = ''.join(
+        NOWPLAYING_ITEM.format(id=30000000 + i, i=i, title=f'电影{i}',
+                               region='中国大陆' if i % 3 else '美国', votes=1000 + i * 37)
+        for i in range(n_movies))
+    return (f'<html><head><meta charset="utf-8"><title>正在上映</title></head><body>'
+            f'<div id="nowplaying"><ul class="lists">{items}</ul></div></body></html>')
+
+
+def make_movies(interests: Dict, n_movies: int) -> List[Movie]:
+    """把评论平均分配到 n_movies 部电影"""
+    from spider import DoubanMovieSpider
+
+    spider = DoubanMovieSpider()
+    comments = [spider._parse_interest(item) for item in interests['interests']]
+    comments = [comment for comment in comments if comment]
+    per_movie = -(-len(comments) // n_movies)
+    return [
+        Movie(f'电影{i}', f'https://movie.douban.com/subject/{30000000 + i}/', '2026-05-01',
+              '中国大陆' if i % 3 else '美国', 1000 + (i * 7919) % 50000, 'wuhan',
+              comments=comments[i * per_movie:(i + 1) * per_movie])
+        for i in range(n_movies)
+    ]
+
+
+# ----------------------------------------------------------------
+# 基准测试定义
+# ----------------------------------------------------------------
+
+class Benchmark:
+    """单个基准测试: setup 准备输入（不计时），run 为计时部分"""
+
+    __slots__ = ('name', 'group', 'setup', 'run', 'items')
+
+    def __init__(self, name: str, group: str, setup: Callable[[], object],
+                 run: Callable[[object], object], items: int):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.run = run
+        self.items = items
+
+
+def build_benchmarks(n_comments: int, workdir: str) -> List[Benchmark]:
+    """
+    构建指定规模的基准测试
+
+    Args:
+        n_comments: 评论数量
+        workdir: 临时输出目录
+
+    Returns:
+        基准测试列表
+    """
+    from bs4 import BeautifulSoup
+    from spider import DoubanMovieSpider
+    from data_processor import DataProcessor
+    from visualizer import Visualizer
+    from wordcloud_generator import WordCloudGenerator
+    from utils import load_jieba
+
+    load_jieba().setLogLevel(logging.WARNING)
+
+    n_movies = max(10, n_comments // 1000)
+    interests = make_interests(n_comments)
+    interests_json = json.dumps(interests, ensure_ascii=False)
+    movies = make_movies(interests, n_movies)
+    comments = [comment.text for movie in movies for comment in movie.comments]
+    spider = DoubanMovieSpider()
+    processor = DataProcessor()
+    with open(FIXTURE_PAGE, 'r', encoding='utf-8') as f:
+        fixture_html = f.read()
+    nowplaying_html = make_nowplaying_html(n_movies)
+
+    csv_path = os.path.join(workdir, 'movies.csv')
+    json_path = os.path.join(workdir, 'movies.json')
+    processor.save_to_csv(movies, csv_path)
+    processor.save_to_json(movies, json_path)
+
+    def new_generator():
+        # 每次重复使用新的生成器，避免分词缓存和本次运行的分词记录影响计时
+        return WordCloudGenerator(use_cache=False)
+
+    # 分词结果只在需要时计算一次（只运行解析/存储测试时不加载 jieba）
+    @lru_cache(maxsize=None)
+    def words():
+        return new_generator().segment_text(''.join(comments))
+
+    @lru_cache(maxsize=None)
+    def word_freq():
+        return new_generator().count_word_frequency(words())
+
+    return [
+        Benchmark('parse_fixture_page', 'parse',
+                  lambda: fixture_html,
+                  lambda html: spider.parse_movie_list(BeautifulSoup(html, 'lxml')), 1),
+        Benchmark('parse_movie_list', 'parse',
+                  lambda: BeautifulSoup(nowplaying_html, 'lxml'),
+                  spider.parse_movie_list, n_movies),
+        Benchmark('parse_interests', 'parse',
+                  lambda: interests_json,
+                  lambda text: [spider._parse_interest(item) for item in json.loads(text)['interests']],
+                  n_comments),
+        Benchmark('save_to_csv', 'storage', lambda: movies,
+                  lambda data: processor.save_to_csv(data, csv_path), n_comments),
+        Benchmark('save_to_json', 'storage', lambda: movies,
+                  lambda data: processor.save_to_json(data, json_path), n_comments),
+        Benchmark('load_from_csv', 'storage', lambda: csv_path, processor.load_from_csv, n_comments),
+        Benchmark('load_from_json', 'storage', lambda: json_path, processor.load_from_json, n_comments),
+        Benchmark('segment_text', 'nlp',
+                  lambda: (new_generator(), ''.join(comments)),
+                  lambda args: args[0].segment_text(args[1]), n_comments),
+        Benchmark('segment_comments', 'nlp',
+                  lambda: (new_generator(), comments),
+                  lambda args: args[0].segment_comments(args[1], workers=1), n_comments),
+        Benchmark('count_word_frequency', 'nlp',
+                  lambda: (new_generator(), words()),
+                  lambda args: args[0].count_word_frequency(args[1]), len(comments)),
+        Benchmark('generate_wordcloud', 'render',
+                  lambda: (new_generator(), word_freq()),
+                  lambda args: args[0].generate_wordcloud(args[1], os.path.join(workdir, 'wordcloud.png')),
+                  1),
+        Benchmark('plot_top_movies', 'render',
+                  lambda: sorted(movies, key=lambda movie: movie.wish_count, reverse=True),
+                  lambda data: Visualizer().plot_top_movies(data, filepath=os.path.join(workdir, 'top.png')),
+                  1),
+    ]
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict:
+    """
+    执行一个基准测试
+
+    Args:
+        benchmark: 基准测试
+        repeat: 重复次数
+
+    Returns:
+        结果字典: 单次最短/中位耗时（秒）、每秒处理量
+    """
+    timings = []
+    loops = 0
+    for _ in range(repeat):
+        elapsed = 0.0
+        loops = 0
+        while loops == 0 or elapsed < MIN_SAMPLE_TIME:
+            args = benchmark.setup()
+            gc.collect()
+            start = time.perf_counter()
+            benchmark.run(args)
+            elapsed += time.perf_counter() - start
+            loops += 1
+        timings.append(elapsed / loops)
+    best = min(timings)
+    return {
+        'best': best,
+        'median': statistics.median(timings),
+        'repeat': repeat,
+        'loops': loops,
+        'items': benchmark.items,
+        'items_per_sec': benchmark.items / best if best > 0 else None,
+    }
+
+
+# ----------------------------------------------------------------
+# 历史记录
+# ----------------------------------------------------------------
+
+def git_revision() -> Optional[str]:
+    """当前 git 提交（工作区有修改时加 -dirty 后缀）"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    """运行环境（比较时只比较相同环境的记录）"""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'node': platform.node(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_history(filepath: str = HISTORY_FILE) -> List[Dict]:
+    """读取历史记录"""
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(record: Dict, filepath: str = HISTORY_FILE):
+    """追加一条历史记录"""
+    with open(filepath, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+# ----------------------------------------------------------------
+# 命令
+# ----------------------------------------------------------------
+
+def cmd_list(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        for benchmark in build_benchmarks(SIZES['1k'], workdir):
+            print(f"{benchmark.group:8s} {benchmark.name}")
+
+
+def cmd_run(args):
+    only = set(args.only.split(',')) if args.only else None
+    for size in args.sizes.split(','):
+        n_comments = SIZES[size]
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            benchmarks = build_benchmarks(n_comments, workdir)
+            print(f"\n规模 {size}: {n_comments} 条评论，准备数据耗时 {time.perf_counter() - start:.1f} 秒")
+            results = {}
+            for benchmark in benchmarks:
+                if only and benchmark.name not in only and benchmark.group not in only:
+                    continue
+                result = measure(benchmark, args.repeat)
+                results[benchmark.name] = result
+                rate = result['items_per_sec']
+                print(f"  {benchmark.name:22s} best {result['best'] * 1000:10.2f} ms   "
+                      f"median {result['median'] * 1000:10.2f} ms"
+                      + (f"   {rate:12.0f} 项/秒" if rate and benchmark.items > 1 else ''))
+
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'label': args.label,
+            'size': size,
+            'environment': environment(),
+            'results': results,
+        }
+        if not args.no_save:
+            append_history(record, args.history)
+    if not args.no_save:
+        print(f"\n结果已追加到 {args.history}")
+
+
+def cmd_compare(args) -> int:
+    history = load_history(args.history)
+    if args.size:
+        history = [record for record in history if record['size'] == args.size]
+    if not history:
+        print("没有历史记录")
+        return 0
+
+    latest = history[-1]
+    candidates = [record for record in history[:-1]
+                  if record['size'] == latest['size']
+                  and record['environment'] == latest['environment']]
+    if args.baseline:
+        candidates = [record for record in candidates
+                      if args.baseline in (record.get('revision'), record.get('label'))]
+    if not candidates:
+        print(f"没有可比较的基准记录（规模 {latest['size']}，相同运行环境）")
+        return 0
+    baseline = candidates[-1]
+
+    print(f"规模 {latest['size']}: {baseline.get('revision')} ({baseline['time']}) -> "
+          f"{latest.get('revision')} ({latest['time']})，阈值 {args.threshold:.0%}")
+    regressions = 0
+    for name, result in latest['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"  {name:22s} (新增)")
+            continue
+        ratio = result['best'] / base['best'] if base['best'] > 0 else 1.0
+        if ratio > 1 + args.threshold:
+            status = '退化'
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            status = '加速'
+        else:
+            status = ''
+        print(f"  {name:22s} {base['best'] * 1000:10.2f} ms -> {result['best'] * 1000:10.2f} ms "
+              f"{(ratio - 1) * 100:+7.1f}%  {status}")
+
+    if regressions:
+        print(f"\n{regressions} 项退化超过 {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="热点路径基准测试（离线）")
+    parser.add_argument('--history', default=HISTORY_FILE, help="历史记录文件")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="运行基准测试并追加到历史记录")
+    run_parser.add_argument('--sizes', default='1k', help="评论规模，逗号分隔: 1k,100k,1m")
+    run_parser.add_argument('--only', help="只运行指定的测试或分组（parse,storage,nlp,render），逗号分隔")
+    run_parser.add_argument('--repeat', type=int, default=3, help="每项重复次数")
+    run_parser.add_argument('--label', help="本次运行的标签（compare --baseline 可引用）")
+    run_parser.add_argument('--no-save', action='store_true', help="不写入历史记录")
+
+    compare_parser = subparsers.add_parser('compare', help="比较最近一次运行与上一次运行")
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="退化阈值（比例）")
+    compare_parser.add_argument('--size', help="只比较指定规模")
+    compare_parser.add_argument('--baseline', help="基准记录的提交或标签，默认为上一次运行")
+
+    subparsers.add_parser('list', help="列出基准测试")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    # 运行环境缺少中文字体时 matplotlib 会对每个字符告警，不影响计时
+    warnings.filterwarnings('ignore', message='Glyph .* missing')
+    if args.command == 'run':
+        cmd_run(args)
+    elif args.command == 'compare':
+        return cmd_compare(args)
+    else:
+        cmd_list(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,78 +1,211 @@
-# -*- coding: utf-8 -*-
-"""
-配置文件
-包含项目的所有配置信息
-"""
-
-# Python 解释器路径
-PYTHON_INTERPRETER = r"D:\Program Files\python3.9\python.exe"
-
-# 城市配置
-CITY = "wuhan"  # 武汉
-
-# 豆瓣电影URL
-DOUBAN_MOVIE_BASE_URL = "https://movie.douban.com"
-DOUBAN_MOVIE_NOWPLAYING_URL = f"https://movie.douban.com/cinema/nowplaying/{CITY}/"
-DOUBAN_MOVIE_COMMENTS_URL = "https://movie.douban.com/subject/{movie_id}/comments"
-
-# 请求头配置 (桌面端, 用于爬取电影列表页面)
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-    'Accept-Encoding': 'gzip, deflate',
-    'Connection': 'keep-alive',
-    'Upgrade-Insecure-Requests': '1',
-}
-
-# Rexxar API 请求头 (移动端, 用于爬取电影评论)
-# 豆瓣 Rexxar API 是移动端内部接口, 返回 JSON 数据
-# 相比桌面端 HTML 页面, 反爬虫策略更宽松, 无需 Selenium
-REXXAR_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.6422.165 Mobile Safari/537.36',
-    'Accept': 'application/json, text/plain, */*',
-    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-    'Accept-Encoding': 'gzip, deflate',
-    'Connection': 'keep-alive',
-    'X-Requested-With': 'XMLHttpRequest',
-}
-
-# Rexxar API 基础 URL
-REXXAR_API_BASE_URL = "https://m.douban.com/rexxar/api/v2"
-# 请求配置
-REQUEST_DELAY = 5  # 请求延迟（秒，用于页面爬取）
-REXXAR_API_DELAY = 2  # Rexxar API 请求间隔（秒，JSON API 比 HTML 页面轻量）
-REQUEST_TIMEOUT = 15  # 请求超时（秒）
-MAX_RETRIES = 3  # 最大重试次数
-
-# 评论爬取配置
-COMMENTS_PER_MOVIE = 30  # 每部电影爬取的评论数量
-COMMENTS_PAGE_SIZE = 20  # 每页评论数量
-
-# 文件路径配置
-DATA_DIR = "data"
-IMAGES_DIR = "images"
-FONTS_DIR = "fonts"
-
-# 输出文件配置
-MOVIES_CSV_FILE = f"{DATA_DIR}/movies.csv"
-MOVIES_JSON_FILE = f"{DATA_DIR}/movies.json"
-TOP5_IMAGE_FILE = f"{IMAGES_DIR}/top5_movies.png"
-WORDCLOUD_IMAGE_FILE = f"{IMAGES_DIR}/wordcloud.png"
-WORD_STATISTICS_FILE = f"{DATA_DIR}/word_statistics.txt"
-
-# 词云配置
-WORDCLOUD_WIDTH = 800
-WORDCLOUD_HEIGHT = 400
-WORDCLOUD_FONT_PATH = "simhei.ttf"  # 中文字体路径，如果系统没有，需要下载
-WORDCLOUD_BACKGROUND_COLOR = "white"
-
-# 可视化配置
-TOP_N_MOVIES = 5  # 显示前N部电影
-CHART_TITLE = "想看人数Top 5电影"
-CHART_XLABEL = "电影名称"
-CHART_YLABEL = "想看人数"
-
-# 词频统计配置
-TOP_WORDS_COUNT = 20  # 统计高频词汇数量
-
+# -*- coding: utf-8 -*-
+"""
+配置文件
+包含项目的所有配置信息
+"""
+
+# Python 解释器路径
+PYTHON_INTERPRETER = r"D:\Program Files\python3.9\python.exe"
+
+# 城市配置
+CITY = "wuhan"  # 武汉
+
+# 豆瓣电影URL
+DOUBAN_MOVIE_BASE_URL = "https://movie.douban.com"
+DOUBAN_MOVIE_NOWPLAYING_URL = f"https://movie.douban.com/cinema/nowplaying/{CITY}/"
+DOUBAN_MOVIE_COMMENTS_URL = "https://movie.douban.com/subject/{movie_id}/comments"
+
+# 请求头配置 (桌面端, 用于爬取电影列表页面)
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Rexxar API 请求头 (移动端, 用于爬取电影评论)
+# 豆瓣 Rexxar API 是移动端内部接口, 返回 JSON 数据
+# 相比桌面端 HTML 页面, 反爬虫策略更宽松, 无需 Selenium
+REXXAR_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.6422.165 Mobile Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'X-Requested-With': 'XMLHttpRequest',
+}
+
+# Rexxar API 基础 URL
+REXXAR_API_BASE_URL = "https://m.douban.com/rexxar/api/v2"
+# 请求配置
+REQUEST_DELAY = 5  # 请求延迟（秒，用于页面爬取）
+REXXAR_API_DELAY = 2  # Rexxar API 请求间隔（秒，JSON API 比 HTML 页面轻量）
+REQUEST_TIMEOUT = 15  # 请求超时（秒）
+MAX_RETRIES = 3  # 最大重试次数
+
+# 日志配置
+LOG_QUEUE_ENABLED = True  # 日志放入队列由后台线程输出，终端输出速度不影响爬取
+LOG_REQUEST_SAMPLE_RATE = 10  # 每个请求一条的日志（douban.request）每 N 条输出 1 条，1 表示全部输出；警告及以上总是输出
+
+# 评论爬取配置
+COMMENTS_PER_MOVIE = 30  # 每部电影爬取的评论数量
+COMMENTS_PAGE_SIZE = 20  # 每页评论数量
+
+# 文件路径配置
+DATA_DIR = "data"
+IMAGES_DIR = "images"
+FONTS_DIR = "fonts"
+
+# 输出文件配置
+MOVIES_CSV_FILE = f"{DATA_DIR}/movies.csv"
+MOVIES_JSON_FILE = f"{DATA_DIR}/movies.json"
+TOP5_IMAGE_FILE = f"{IMAGES_DIR}/top5_movies.png"
+WORDCLOUD_IMAGE_FILE = f"{IMAGES_DIR}/wordcloud.png"
+WORD_STATISTICS_FILE = f"{DATA_DIR}/word_statistics.txt"
+
+# 评论页数预算配置（按价值为每部电影分配页数，启用后代替 COMMENTS_PER_MOVIE）
+COMMENT_BUDGET_ENABLED = False  # 默认关闭；开启后各电影的评论数不再相同，热门电影爬取更多页
+COMMENT_BUDGET_PAGES = 0  # 每次爬取的总请求数（含每部电影的第一页），0 表示 电影数 × 固定分配的页数
+COMMENT_BUDGET_MAX_PAGES = 10  # 单部电影最多爬取的页数
+COMMENT_BUDGET_WISH_EXPONENT = 0.5  # 权重中想看人数的指数
+COMMENT_BUDGET_NEW_EXPONENT = 0.5  # 权重中新评论数的指数
+COMMENT_BUDGET_STATE_FILE = f"{DATA_DIR}/comment_budget.json"  # 上次爬取时每部电影的评论总数
+
+# 快照归档配置（每次爬取按日期和城市分区压缩保存）
+ARCHIVE_ENABLED = False  # 默认关闭；开启后每次爬取都会在 ARCHIVE_DIR 下新增文件，需要自行清理旧分区
+ARCHIVE_DIR = f"{DATA_DIR}/archive"
+ARCHIVE_COMPRESSION = "auto"  # "zstd"、"gzip" 或 "auto"（已安装 zstandard 时用 zstd，否则 gzip）
+
+# 客户端身份池配置（每个身份独立的 User-Agent、Cookie 和可选代理，请求轮流分配）
+IDENTITY_DESKTOP_USER_AGENTS = [
+    HEADERS['User-Agent'],
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+]
+IDENTITY_MOBILE_USER_AGENTS = [
+    REXXAR_HEADERS['User-Agent'],
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 13; SM-S9180) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.179 Mobile Safari/537.36',
+]
+IDENTITY_PROXIES = []  # 可选的本地代理地址，如 ["http://127.0.0.1:7890"]，按顺序循环分配给各身份
+IDENTITY_COOKIE_DIR = f"{DATA_DIR}/identities"  # 每个身份的 Cookie 保存目录
+IDENTITY_REST_SECONDS = 600  # 身份被拦截后的休息时间（秒），连续被拦截时翻倍
+IDENTITY_MAX_REST_SECONDS = 3600  # 最长休息时间（秒）
+IDENTITY_MAX_FAILURES = 3  # 连续失败多少次后休息
+
+# 电影元数据补充配置（通过 Rexxar API 条目接口获取评分、类型、片长、导演）
+METADATA_ENABLED = False  # 默认关闭；开启后每部未缓存的电影多一次 API 请求
+METADATA_CACHE_FILE = f"{DATA_DIR}/subject_metadata.sqlite3"
+METADATA_CACHE_TTL = 7 * 24 * 3600  # 元数据缓存有效期（秒）
+METADATA_WORKERS = 0  # 并发请求数，0 表示移动端身份数量（每个身份的请求间隔不变）
+
+# 词云配置
+WORDCLOUD_WIDTH = 800
+WORDCLOUD_HEIGHT = 400
+WORDCLOUD_FONT_PATH = "simhei.ttf"  # 中文字体路径，如果系统没有，需要下载
+WORDCLOUD_BACKGROUND_COLOR = "white"
+
+# 批量词云配置（每部电影、每个城市各一张）
+WORDCLOUD_BATCH_ENABLED = False  # 是否生成每部电影和每个城市的词云
+WORDCLOUD_BATCH_DIR = f"{IMAGES_DIR}/wordclouds"
+WORDCLOUD_WORKERS = 0  # 渲染进程数，0 表示使用CPU核数
+WORDCLOUD_PREVIEW = False  # 低分辨率预览模式
+WORDCLOUD_PREVIEW_SCALE = 0.5  # 预览模式的尺寸比例
+
+# 可视化配置
+TOP_N_MOVIES = 5  # 显示前N部电影
+CHART_TITLE = "想看人数Top 5电影"
+CHART_XLABEL = "电影名称"
+CHART_YLABEL = "想看人数"
+CHART_FORMAT = "png"  # 图表输出格式: "png" 或 "svg"（矢量图，输出更快）
+CHART_DPI = 150  # PNG 分辨率
+CHART_PNG_COMPRESS_LEVEL = 1  # PNG 压缩级别 0-9，级别越低编码越快、文件越大
+CHART_WORKERS = 0  # 批量图表渲染进程数，0 表示CPU核数
+CHART_BATCH_ENABLED = False  # 是否生成每个城市的Top N、国家分布和上映周趋势图表
+CHART_BATCH_DIR = f"{IMAGES_DIR}/charts"
+CHART_TOP_COUNTRIES = 15  # 国家/地区分布图显示的数量
+
+# 词频统计配置
+TOP_WORDS_COUNT = 20  # 统计高频词汇数量
+
+# jieba 词典缓存文件名（位于数据目录中）
+JIEBA_CACHE_FILE = "jieba.cache"
+
+# 分词并行配置
+SEGMENT_WORKERS = 0  # 分词进程数，0 表示使用CPU核数，1 表示不启用进程池
+SEGMENT_BATCH_SIZE = 2000  # 每批分词的评论数量
+
+# 分词缓存配置
+SEGMENT_CACHE_ENABLED = True  # 是否按评论内容缓存分词结果
+SEGMENT_CACHE_FILE = f"{DATA_DIR}/segment_cache.sqlite3"
+SEGMENT_CACHE_MAX_ENTRIES = 500000  # 最大缓存条目数，超出时淘汰最久未使用的条目
+
+# 词表配置（词 -> 整数ID，只追加，跨运行保持ID稳定；删除后已有的词频快照需要重新生成）
+VOCABULARY_FILE = f"{DATA_DIR}/vocabulary.txt"
+
+# 电影关键词 (TF-IDF) 配置
+MOVIE_KEYWORDS_FILE = f"{DATA_DIR}/movie_keywords.json"
+KEYWORDS_TOP_K = 10  # 每部电影的关键词数量
+KEYWORDS_GROUP_BY = "movie"  # "movie" 合并各城市评论; "movie_city" 每个城市单独计算
+KEYWORDS_MAX_DF_RATIO = 0.5  # 出现在超过该比例电影中的词不作为关键词
+
+# 词频统计模式: "exact" 精确计数; "approximate" 固定内存的近似高频词计数 (Space-Saving)
+WORD_COUNT_MODE = "exact"
+# 近似模式下跟踪的词数量，误差上限为 总词频 / 该值；
+# 启用词频快照时每部电影的快照也只保留计数最高的这么多个词（关键词和批量词云基于截断后的快照）
+HEAVY_HITTER_CAPACITY = 5000
+
+# 词频快照配置
+WORD_FREQ_SNAPSHOTS_ENABLED = True  # 是否按电影保存可合并的词频快照
+WORD_FREQ_DIR = f"{DATA_DIR}/word_freq"
+
+# 评论去重 (MinHash + LSH) 配置
+DEDUP_ENABLED = False  # 分词前剔除近似重复评论（复制粘贴、水军刷评）；开启后词频只统计去重后的评论
+DEDUP_THRESHOLD = 0.8  # 估计 Jaccard 相似度不低于该值视为近似重复
+DEDUP_SHINGLE_SIZE = 3  # 字符 k-gram 长度
+DEDUP_NUM_PERM = 64  # MinHash 签名长度
+DEDUP_BANDS = 16  # LSH band 数量，需整除签名长度
+DEDUP_SPAM_CLUSTER_SIZE = 5  # 重复簇达到该大小时记为疑似刷评
+
+# 评论情感分析配置
+SENTIMENT_ENABLED = True  # 是否计算每部电影的评论情感得分（写入电影数据）
+SENTIMENT_LEXICON_FILE = f"{DATA_DIR}/sentiment_lexicon.txt"  # 每行 "词<Tab>权重"，不存在时使用内置词典
+
+# 评论倒排索引配置
+INVERTED_INDEX_ENABLED = True  # 每次分析后将新评论增量写入倒排索引
+INVERTED_INDEX_FILE = f"{DATA_DIR}/inverted_index.sqlite3"
+
+# 短语与共现统计配置
+COOCCURRENCE_ENABLED = True  # 是否统计相邻词组和评论内共现词对
+COOCCURRENCE_WINDOW = 5  # 同一评论内相距不超过该距离的两个词计为共现
+COOCCURRENCE_MAX_PAIRS = 2000000  # 最多保留的词对数量，超出时剪掉低频词对
+COOCCURRENCE_TOP_N = 200  # JSON 中保存的高频词对数量
+COOCCURRENCE_FILE = f"{DATA_DIR}/cooccurrence.json"
+COOCCURRENCE_MATRIX_FILE = f"{DATA_DIR}/cooccurrence_matrix.npz"
+
+# 流水线配置（阶段输入未变化时跳过该阶段）
+PIPELINE_STATE_FILE = f"{DATA_DIR}/pipeline_state.json"
+PIPELINE_CRAWL_MAX_AGE = 12 * 3600  # 已爬取数据的有效期（秒），超过后重新爬取；0 表示不过期
+
+# 性能剖析配置（main.py --profile）
+PROFILE_DIR = f"{DATA_DIR}/profiles"  # 每个阶段的 cProfile 统计输出目录
+PROFILE_TRACE_MEMORY = True  # --profile 时是否用 tracemalloc 记录峰值内存（分配密集的代码会变慢）
+
+# 本地查询服务配置（main.py --serve）
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_RELOAD_INTERVAL = 2  # 检查数据文件变化的间隔（秒）
+SERVICE_CACHE_SIZE = 1024  # 内存中缓存的响应数量
+SERVICE_MAX_ITEMS = 500  # 单次请求最多返回的电影/评论/词数量
+
+# 常驻爬取调度配置（python main.py --daemon）
+SCHEDULER_DB_FILE = f"{DATA_DIR}/crawl_store.sqlite3"
+SCHEDULER_LIST_INTERVAL = 30 * 60  # 电影列表（想看人数）刷新间隔（秒）
+SCHEDULER_MIN_INTERVAL = 15 * 60  # 评论最短刷新间隔（秒），最热门的电影
+SCHEDULER_MAX_INTERVAL = 12 * 3600  # 评论最长刷新间隔（秒），没有热度的电影
+SCHEDULER_WISH_VELOCITY_SCALE = 50  # 想看人数增速基准（人/小时），达到该值时刷新间隔减半
+SCHEDULER_COMMENT_RATE_SCALE = 5  # 新评论到达速率基准（条/小时），达到该值时刷新间隔减半
+SCHEDULER_VELOCITY_WINDOW = 24 * 3600  # 计算想看人数增速的时间窗口（秒）
+SCHEDULER_RATE_SMOOTHING = 0.5  # 新评论到达速率的指数加权系数
+SCHEDULER_EXPORT_INTERVAL = 10 * 60  # 有新数据时导出 CSV/JSON 的最短间隔（秒）
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+短语与共现统计模块
+一次遍历分词结果，统计相邻词组 (bigram) 和评论内窗口共现词对
+
+- 直接使用分词结果的词ID数组（共享词表的ID），词对编码为 (左词ID << 32) | 右词ID 的 int64 键
+- 相邻和窗口距离按未过滤的完整词序列计算，之后再去掉含停用词、单字符或纯数字的词对，
+  被停用词隔开的两个词不会被误计为相邻词组
+- 评论按块处理: 块内对每个窗口偏移量整体错位比较，词对键排序计数后
+  与累计结果合并（均为 NumPy 向量化操作），不需要两两嵌套循环
+- 词对数量超过上限时剪掉低频词对，内存占用有界；剪枝阈值累计值即为计数的最大低估量
+
+结果写入词频统计报告，并另存为 JSON（高频词对）和 .npz（完整稀疏共现矩阵）。
+"""
+
+import json
+import logging
+import numpy as np
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple
+import config
+from utils import ensure_dir
+from vocabulary import Vocabulary, get_vocabulary
+
+_SHIFT = np.int64(32)
+_LOW_MASK = np.int64(0xFFFFFFFF)
+
+
+class PairCounts:
+    """稀疏词对计数: 升序的词对键数组及对应计数数组，超过上限时剪枝"""
+
+    __slots__ = ('keys', 'counts', 'max_pairs', 'undercount', '_pending', '_pending_size')
+
+    def __init__(self, max_pairs: int):
+        """
+        初始化词对计数
+
+        Args:
+            max_pairs: 最多保留的词对数量
+        """
+        self.keys = np.array([], dtype=np.int64)
+        self.counts = np.array([], dtype=np.int64)
+        self.max_pairs = max_pairs
+        # 剪枝导致的计数最大低估量
+        self.undercount = 0
+        # 尚未合并的分块计数；累计到与已合并结果同等规模时再合并，避免每块都重排全部词对
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._pending_size = 0
+
+    def add(self, keys: np.ndarray):
+        """
+        累加一批词对键
+
+        Args:
+            keys: 词对键数组（可重复）
+        """
+        if not len(keys):
+            return
+        chunk_keys, chunk_counts = np.unique(keys, return_counts=True)
+        self._pending.append((chunk_keys, chunk_counts))
+        self._pending_size += len(chunk_keys)
+        if self._pending_size >= max(len(self.keys), self.max_pairs // 4):
+            self.compact()
+
+    def compact(self):
+        """合并尚未合并的分块计数，超过上限时剪枝"""
+        if not self._pending:
+            return
+        keys = np.concatenate([self.keys] + [k for k, _ in self._pending])
+        counts = np.concatenate([self.counts] + [c for _, c in self._pending])
+        self._pending = []
+        self._pending_size = 0
+
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse.reshape(-1), weights=counts,
+                                  minlength=len(self.keys)).astype(np.int64)
+        if len(self.keys) > self.max_pairs:
+            self._prune()
+
+    def _prune(self):
+        """剪掉低频词对，保留不超过上限一半的词对，为后续新词对留出空间"""
+        kth = len(self.counts) - self.max_pairs // 2 - 1
+        threshold = int(np.partition(self.counts, kth)[kth])
+        mask = self.counts > threshold
+        self.keys = self.keys[mask]
+        self.counts = self.counts[mask]
+        self.undercount += threshold
+        logging.debug("词对计数剪枝: 阈值 %s，保留 %s 个词对", threshold, len(self.keys))
+
+    def most_common(self, n: int) -> List[Tuple[int, int, int]]:
+        """
+        计数最高的词对
+
+        Args:
+            n: 数量
+
+        Returns:
+            (左词ID, 右词ID, 次数) 列表，按次数降序
+        """
+        if n <= 0 or not len(self.keys):
+            return []
+        n = min(n, len(self.keys))
+        top = np.argpartition(-self.counts, n - 1)[:n]
+        top = top[np.lexsort((self.keys[top], -self.counts[top]))]
+        keys = self.keys[top]
+        return list(zip((keys >> _SHIFT).tolist(), (keys & _LOW_MASK).tolist(),
+                        self.counts[top].tolist()))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class CooccurrenceCounter:
+    """相邻词组与窗口共现统计类"""
+
+    def __init__(self, window: int = None, max_pairs: int = None, chunk_size: int = None,
+                 vocabulary: Vocabulary = None, stopwords: Set[str] = None):
+        """
+        初始化统计器
+
+        Args:
+            window: 共现窗口大小（同一评论内相距不超过该距离的两个词计为共现一次）
+            max_pairs: 每种词对最多保留的数量，默认使用配置文件中的值
+            chunk_size: 每块处理的评论数
+            vocabulary: 评论词ID所属的词表，默认使用共享词表
+            stopwords: 不参与词对统计的停用词（单字符和纯数字总是不参与）
+        """
+        self.window = window or config.COOCCURRENCE_WINDOW
+        max_pairs = max_pairs or config.COOCCURRENCE_MAX_PAIRS
+        self.chunk_size = chunk_size or config.SEGMENT_BATCH_SIZE
+        self.vocabulary = get_vocabulary() if vocabulary is None else vocabulary
+        self.stopwords = set() if stopwords is None else stopwords
+        # 有序的相邻词组
+        self.bigrams = PairCounts(max_pairs)
+        # 无序的窗口共现词对（左词ID < 右词ID）
+        self.pairs = PairCounts(max_pairs)
+        self.comments = 0
+
+    def update(self, comment_ids: Iterable[array]):
+        """
+        流式统计评论分词结果
+
+        Args:
+            comment_ids: 每条评论未过滤停用词的完整词ID数组
+        """
+        chunk = []
+        for ids in comment_ids:
+            chunk.append(ids)
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk)
+        self.bigrams.compact()
+        self.pairs.compact()
+
+    def _process_chunk(self, chunk: List[array]):
+        """统计一块评论"""
+        self.comments += len(chunk)
+        token_ids = np.frombuffer(b''.join(chunk), dtype=np.uintc).astype(np.int64)
+        if len(token_ids) < 2:
+            return
+
+        valid = self.vocabulary.valid_mask(self.stopwords)[token_ids]
+        lengths = np.fromiter((len(ids) for ids in chunk), dtype=np.int64, count=len(chunk))
+        comment_index = np.repeat(np.arange(len(chunk)), lengths)
+
+        pair_keys = []
+        for offset in range(1, self.window + 1):
+            if offset >= len(token_ids):
+                break
+            left = token_ids[:-offset]
+            right = token_ids[offset:]
+            # 按完整词序列错位，再去掉跨评论、含无效词或两端相同的词对
+            keep = ((comment_index[:-offset] == comment_index[offset:])
+                    & valid[:-offset] & valid[offset:] & (left != right))
+            left = left[keep]
+            right = right[keep]
+            if offset == 1:
+                self.bigrams.add((left << _SHIFT) | right)
+            pair_keys.append((np.minimum(left, right) << _SHIFT) | np.maximum(left, right))
+        self.pairs.add(np.concatenate(pair_keys))
+
+    def _decode_pairs(self, pairs: List[Tuple[int, int, int]]) -> List[Tuple[str, str, int]]:
+        """将 (左词ID, 右词ID, 次数) 转换为 (左词, 右词, 次数)"""
+        words = self.vocabulary.decode([word_id for a, b, _ in pairs for word_id in (a, b)])
+        return [(words[2 * i], words[2 * i + 1], count) for i, (_, _, count) in enumerate(pairs)]
+
+    def top_bigrams(self, n: int = None) -> List[Tuple[str, str, int]]:
+        """
+        高频相邻词组
+
+        Args:
+            n: 数量，默认使用配置文件中的值
+
+        Returns:
+            (前词, 后词, 次数) 列表
+        """
+        n = config.COOCCURRENCE_TOP_N if n is None else n
+        return self._decode_pairs(self.bigrams.most_common(n))
+
+    def top_pairs(self, n: int = None) -> List[Tuple[str, str, int]]:
+        """
+        高频共现词对
+
+        Args:
+            n: 数量，默认使用配置文件中的值
+
+        Returns:
+            (词, 词, 次数) 列表
+        """
+        n = config.COOCCURRENCE_TOP_N if n is None else n
+        return self._decode_pairs(self.pairs.most_common(n))
+
+    def related(self, word: str, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        与某个词共现次数最多的词
+
+        Args:
+            word: 词
+            n: 数量
+
+        Returns:
+            (共现词, 次数) 列表
+        """
+        word_id = self.vocabulary.lookup(word)
+        if word_id is None or not len(self.pairs):
+            return []
+        left = self.pairs.keys >> _SHIFT
+        right = self.pairs.keys & _LOW_MASK
+        mask = (left == word_id) | (right == word_id)
+        others = np.where(left[mask] == word_id, right[mask], left[mask])
+        counts = self.pairs.counts[mask]
+        order = np.lexsort((others, -counts))[:n]
+        return list(zip(self.vocabulary.decode(others[order]), counts[order].tolist()))
+
+    def word_ids(self) -> np.ndarray:
+        """
+        出现在已统计词对中的词ID
+
+        Returns:
+            升序词ID数组
+        """
+        keys = np.concatenate([self.pairs.keys, self.bigrams.keys])
+        return np.unique(np.concatenate([keys >> _SHIFT, keys & _LOW_MASK]))
+
+    def to_dict(self, top_n: int = None) -> Dict:
+        """
+        转换为可序列化的统计摘要
+
+        Args:
+            top_n: 每类词对的数量，默认使用配置文件中的值
+
+        Returns:
+            统计摘要字典
+        """
+        return {
+            'comments': self.comments,
+            'window': self.window,
+            'vocabulary': len(self.word_ids()),
+            'bigram_undercount': self.bigrams.undercount,
+            'pair_undercount': self.pairs.undercount,
+            'bigrams': [{'words': [a, b], 'count': count} for a, b, count in self.top_bigrams(top_n)],
+            'pairs': [{'words': [a, b], 'count': count} for a, b, count in self.top_pairs(top_n)],
+        }
+
+    def save(self, filepath: str = None, matrix_filepath: str = None):
+        """
+        保存统计结果: JSON 摘要和 .npz 稀疏共现矩阵（COO 格式）
+
+        Args:
+            filepath: JSON 文件路径，默认使用配置文件中的路径
+            matrix_filepath: 矩阵文件路径，默认使用配置文件中的路径
+        """
+        if filepath is None:
+            filepath = config.COOCCURRENCE_FILE
+        if matrix_filepath is None:
+            matrix_filepath = config.COOCCURRENCE_MATRIX_FILE
+
+        ensure_dir(config.DATA_DIR)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+        # 矩阵的行列号为出现在词对中的词在 vocabulary 数组中的下标，文件不依赖词表文件
+        word_ids = self.word_ids()
+        np.savez_compressed(
+            matrix_filepath,
+            vocabulary=np.array(self.vocabulary.decode(word_ids), dtype=str),
+            rows=np.searchsorted(word_ids, self.pairs.keys >> _SHIFT).astype(np.int32),
+            cols=np.searchsorted(word_ids, self.pairs.keys & _LOW_MASK).astype(np.int32),
+            counts=self.pairs.counts,
+            bigram_rows=np.searchsorted(word_ids, self.bigrams.keys >> _SHIFT).astype(np.int32),
+            bigram_cols=np.searchsorted(word_ids, self.bigrams.keys & _LOW_MASK).astype(np.int32),
+            bigram_counts=self.bigrams.counts,
+        )
+        logging.info("共现统计已保存到: %s, %s", filepath, matrix_filepath)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+评论爬取预算模块
+在全局请求预算内按价值为每部电影分配评论页数，取代固定的 COMMENTS_PER_MOVIE
+
+- 每部电影先爬取第一页（每部电影 1 次请求），从 API 返回的 total 得到可爬取的评论总数
+- 权重 = (想看人数 + 1) ^ α × (1 + 自上次爬取以来的新评论数) ^ β
+  新评论数 = 本次 total - 上次 total（首次爬取时为 total，全部评论都是新的）
+- 剩余预算按边际价值贪心分配: 第 k 页的价值为 权重 / k（收益递减），
+  每部电影不超过可爬取页数和单部电影上限；等价于在上限约束下按权重比例分配
+- 每部电影的 total 保存在状态文件中，供下次计算新评论数
+"""
+
+import os
+import json
+import math
+import heapq
+import time
+import logging
+from typing import Dict, List, Sequence
+import config
+from utils import ensure_dir
+from models import Movie
+
+
+def movie_weight(wish_count: int, new_comments: int) -> float:
+    """
+    电影评论的爬取价值权重
+
+    Args:
+        wish_count: 想看人数
+        new_comments: 自上次爬取以来的新评论数
+
+    Returns:
+        权重
+    """
+    return ((max(wish_count, 0) + 1) ** config.COMMENT_BUDGET_WISH_EXPONENT
+            * (1 + max(new_comments, 0)) ** config.COMMENT_BUDGET_NEW_EXPONENT)
+
+
+def allocate_pages(weights: Sequence[float], caps: Sequence[int], budget: int,
+                   min_pages: int = 1) -> List[int]:
+    """
+    在总页数预算内按权重分配页数
+
+    先为每部电影分配 min_pages 页（预算不足时优先分配给权重高的电影），
+    剩余预算每次分给边际价值（权重 / 下一页页码）最高的电影。
+
+    Args:
+        weights: 每部电影的权重
+        caps: 每部电影最多可分配的页数
+        budget: 总页数预算
+        min_pages: 每部电影至少分配的页数
+
+    Returns:
+        与输入一一对应的页数
+    """
+    pages = [0] * len(weights)
+    order = sorted(range(len(weights)), key=lambda i: weights[i], reverse=True)
+    for i in order:
+        grant = min(min_pages, caps[i], budget)
+        pages[i] = grant
+        budget -= grant
+
+    # 最大堆: (-边际价值, 下标)
+    heap = [(-weights[i] / (pages[i] + 1), i) for i in order
+            if weights[i] > 0 and pages[i] < caps[i]]
+    heapq.heapify(heap)
+    while budget > 0 and heap:
+        _, i = heapq.heappop(heap)
+        pages[i] += 1
+        budget -= 1
+        if pages[i] < caps[i]:
+            heapq.heappush(heap, (-weights[i] / (pages[i] + 1), i))
+    return pages
+
+
+class CommentBudgetPlanner:
+    """评论页数预算规划器类"""
+
+    def __init__(self, budget: int = None, state_file: str = None):
+        """
+        初始化规划器
+
+        Args:
+            budget: 每次爬取的总请求数（含每部电影的第一页），默认使用配置文件中的值；
+                    0 表示 电影数 × 固定分配的页数，与原有总请求数相同
+            state_file: 状态文件路径，默认使用配置文件中的路径
+        """
+        self.budget = config.COMMENT_BUDGET_PAGES if budget is None else budget
+        self.state_file = state_file or config.COMMENT_BUDGET_STATE_FILE
+        self.state: Dict[str, Dict] = {}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning("读取评论预算状态失败: %s", e)
+
+    def total_budget(self, n_movies: int) -> int:
+        """本次爬取的总请求数"""
+        if self.budget:
+            return self.budget
+        pages_per_movie = math.ceil(config.COMMENTS_PER_MOVIE / config.COMMENTS_PAGE_SIZE)
+        return n_movies * pages_per_movie
+
+    def new_comments(self, movie_id: str, total: int) -> int:
+        """
+        自上次爬取以来的新评论数
+
+        Args:
+            movie_id: 电影ID
+            total: 本次 API 返回的评论总数
+
+        Returns:
+            新评论数，首次爬取时为 total
+        """
+        previous = self.state.get(movie_id)
+        if previous is None:
+            return total
+        return max(total - previous.get('total', 0), 0)
+
+    def plan(self, movies: Sequence[Movie], totals: Dict[str, int]) -> List[int]:
+        """
+        为每部电影分配评论页数（含已爬取的第一页）
+
+        Args:
+            movies: 电影列表
+            totals: 电影ID -> API 返回的评论总数（第一页失败的电影不在其中）
+
+        Returns:
+            与 movies 一一对应的页数，第一页失败的电影为0
+        """
+        page_size = config.COMMENTS_PAGE_SIZE
+        weights = []
+        caps = []
+        for movie in movies:
+            total = totals.get(movie.movie_id)
+            if total is None:
+                weights.append(0.0)
+                caps.append(0)
+                continue
+            weights.append(movie_weight(movie.wish_count, self.new_comments(movie.movie_id, total)))
+            caps.append(min(max(math.ceil(total / page_size), 1), config.COMMENT_BUDGET_MAX_PAGES))
+
+        # 第一页已经爬取，预算至少覆盖这些请求
+        budget = max(self.total_budget(len(movies)), sum(1 for cap in caps if cap))
+        pages = allocate_pages(weights, caps, budget)
+        logging.info("评论页数预算: 共 %s 页，已分配 %s 页，"
+                     "最多 %s 页/部，最少 %s 页/部", budget, sum(pages), max(pages, default=0), min(pages, default=0))
+        return pages
+
+    def save(self, totals: Dict[str, int]):
+        """
+        保存本次的评论总数
+
+        Args:
+            totals: 电影ID -> API 返回的评论总数
+        """
+        now = time.time()
+        for movie_id, total in totals.items():
+            self.state[movie_id] = {'total': total, 'time': now}
+        ensure_dir(os.path.dirname(self.state_file) or '.')
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
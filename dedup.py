@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+评论去重模块
+使用 MinHash 签名 + LSH 分桶检测近似重复评论（复制粘贴的评论、水军刷评）
+
+- 每条评论按字符 k-gram 切分（shingle），计算 MinHash 签名（批量向量化计算）
+- 签名按 band 分段后放入哈希桶，只有落入同一个桶的评论才比较签名，
+  整体复杂度约为线性，避免两两比较的 O(n²)
+- 桶中只保存每个重复簇的代表评论（簇内最早插入的评论），新评论只与代表比较，
+  找到第一个估计 Jaccard 相似度不低于阈值的代表即归入其簇；大量相同的刷评不会使比较次数平方增长
+- 文本完全相同的评论直接按文本查找所在簇，不计算 MinHash 签名
+- 支持增量插入，新评论到达时只需计算自身签名并查询桶
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Sequence
+import config
+from models import Movie
+
+# 大于 2^32 的素数，用于 MinHash 的全域哈希 (a * x + b) mod p
+_PRIME = np.uint64(4294967311)
+_MASK32 = np.uint64(0xFFFFFFFF)
+# k-gram 滚动哈希的基数
+_BASE = np.uint64(1000003)
+# 单次向量化计算的最大 shingle 数量（控制临时数组内存）
+_CHUNK_SHINGLES = 100000
+# band 哈希的基数（uint64 乘法自然溢出）
+_BAND_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+class MinHashLSH:
+    """MinHash 签名与 LSH 分桶索引"""
+
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None,
+                 shingle_size: int = None, seed: int = 1):
+        """
+        初始化索引
+
+        Args:
+            num_perm: 签名长度（哈希函数数量），默认使用配置文件中的值
+            bands: band 数量，需整除 num_perm，默认使用配置文件中的值
+            threshold: 判定为近似重复的估计 Jaccard 相似度阈值
+            shingle_size: 字符 k-gram 的长度
+            seed: 哈希函数随机种子（相同种子的签名可以互相比较）
+        """
+        self.num_perm = num_perm or config.DEDUP_NUM_PERM
+        self.bands = bands or config.DEDUP_BANDS
+        self.threshold = threshold if threshold is not None else config.DEDUP_THRESHOLD
+        self.shingle_size = shingle_size or config.DEDUP_SHINGLE_SIZE
+        if self.num_perm % self.bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=self.num_perm, dtype=np.uint64)
+
+        self._keys: List[Hashable] = []
+        self._signatures: List[np.ndarray] = []
+        # 并查集: 下标 -> 父节点下标，根节点（簇代表）为簇内最早插入的评论
+        self._parent: List[int] = []
+        # 每个 band 一个桶字典: band 哈希值 -> 簇代表下标列表
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        # 评论文本 -> 首次出现的下标（用于完全相同评论的快速判断）
+        self._texts: Dict[str, int] = {}
+
+    # ----------------------------------------------------------------
+    # 签名计算
+    # ----------------------------------------------------------------
+
+    def _shingle_hashes(self, texts: Sequence[str]):
+        """
+        计算所有评论的字符 k-gram 哈希
+
+        每条评论末尾补 k-1 个空字符后拼接，一次编码为码点数组，
+        用 k 次移位相加完成所有窗口的多项式哈希。
+
+        Returns:
+            (哈希数组, 每条评论的 shingle 数量)
+        """
+        k = self.shingle_size
+        padding = '\0' * (k - 1)
+        codes = np.frombuffer(''.join(text + padding for text in texts).encode('utf-32-le'),
+                              dtype=np.uint32).astype(np.uint64)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        if not len(codes):
+            return np.array([], dtype=np.uint64), lengths
+
+        n_windows = len(codes) - k + 1
+        hashes = np.zeros(n_windows, dtype=np.uint64)
+        for i in range(k):
+            hashes = (hashes * _BASE + codes[i:i + n_windows]) & _MASK32
+
+        # 只保留起点位于评论正文内的窗口
+        starts = np.concatenate(([0], np.cumsum(lengths + k - 1)[:-1]))
+        valid = np.zeros(len(codes), dtype=bool)
+        positions = np.repeat(starts, lengths) + (
+            np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        valid[positions] = True
+        return hashes[valid[:n_windows]], lengths
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        批量计算 MinHash 签名
+
+        Args:
+            texts: 评论文本列表
+
+        Returns:
+            形状为 (len(texts), num_perm) 的 uint32 签名矩阵，空文本的签名全为最大值
+        """
+        result = np.full((len(texts), self.num_perm), 0xFFFFFFFF, dtype=np.uint32)
+        hashes, lengths = self._shingle_hashes(texts)
+        if not len(hashes):
+            return result
+
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        doc = 0
+        while doc < len(texts):
+            # 按 shingle 数量分块，每块包含若干条完整评论
+            end = int(np.searchsorted(bounds, bounds[doc] + _CHUNK_SHINGLES, side='right')) - 1
+            end = max(end, doc + 1)
+            chunk_docs = np.arange(doc, end)
+            chunk_docs = chunk_docs[lengths[chunk_docs] > 0]
+            if len(chunk_docs):
+                lo, hi = bounds[chunk_docs[0]], bounds[chunk_docs[-1] + 1]
+                values = (self._a[:, None] * hashes[None, lo:hi] + self._b[:, None]) % _PRIME
+                mins = np.minimum.reduceat(values, bounds[chunk_docs] - lo, axis=1)
+                result[chunk_docs] = (mins & _MASK32).astype(np.uint32).T
+            doc = end
+        return result
+
+    # ----------------------------------------------------------------
+    # LSH 索引
+    # ----------------------------------------------------------------
+
+    def band_hashes(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        批量计算签名每个 band 的哈希值
+
+        Args:
+            signatures: 形状为 (n, num_perm) 的签名矩阵
+
+        Returns:
+            形状为 (n, bands) 的 uint64 哈希矩阵
+        """
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        hashes = np.zeros(rows.shape[:2], dtype=np.uint64)
+        for r in range(self.rows):
+            hashes = hashes * _BAND_BASE + rows[:, :, r]
+        return hashes
+
+    def _find(self, index: int) -> int:
+        """并查集查找（带路径压缩）"""
+        root = index
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[index] != root:
+            self._parent[index], index = root, self._parent[index]
+        return root
+
+    def insert(self, key: Hashable, signature: np.ndarray,
+               band_hashes: Sequence[int] = None) -> Optional[Hashable]:
+        """
+        插入一条评论的签名
+
+        与签名落入同一个桶的簇代表逐个比较，找到第一个相似度不低于阈值的代表即停止；
+        没有匹配的评论成为新簇的代表并放入各 band 的桶。
+
+        Args:
+            key: 评论标识
+            signature: MinHash 签名
+            band_hashes: 预先批量计算的 band 哈希值，默认根据签名计算
+
+        Returns:
+            若与已有评论近似重复，返回其所在簇最早评论的标识，否则返回None
+        """
+        if band_hashes is None:
+            band_hashes = self.band_hashes(signature[None, :])[0].tolist()
+        index = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._parent.append(index)
+
+        seen = set()
+        for band, band_hash in enumerate(band_hashes):
+            for root in self._buckets[band].get(band_hash, ()):
+                if root in seen:
+                    continue
+                seen.add(root)
+                similarity = np.count_nonzero(self._signatures[root] == signature) / self.num_perm
+                if similarity >= self.threshold:
+                    self._parent[index] = root
+                    return self._keys[root]
+
+        for band, band_hash in enumerate(band_hashes):
+            self._buckets[band].setdefault(band_hash, []).append(index)
+        return None
+
+    def _insert_exact(self, key: Hashable, first: int) -> Hashable:
+        """插入与已有评论文本完全相同的评论，返回其所在簇最早评论的标识"""
+        root = self._find(first)
+        self._keys.append(key)
+        self._signatures.append(self._signatures[root])
+        self._parent.append(root)
+        return self._keys[root]
+
+    def insert_texts(self, keys: Sequence[Hashable], texts: Sequence[str]) -> List[Optional[Hashable]]:
+        """
+        批量插入评论
+
+        只为未出现过的文本计算签名，文本完全相同的评论直接归入首次出现的评论所在的簇。
+
+        Args:
+            keys: 评论标识列表
+            texts: 评论文本列表
+
+        Returns:
+            与输入一一对应的重复来源标识（非重复为None）
+        """
+        new_texts = [text for text in dict.fromkeys(texts) if text not in self._texts]
+        signatures = self.signatures(new_texts)
+        band_hashes = self.band_hashes(signatures).tolist()
+        position = {text: i for i, text in enumerate(new_texts)}
+
+        results = []
+        for key, text in zip(keys, texts):
+            first = self._texts.get(text)
+            if first is not None:
+                results.append(self._insert_exact(key, first))
+                continue
+            i = position[text]
+            self._texts[text] = len(self._keys)
+            results.append(self.insert(key, signatures[i], band_hashes[i]))
+        return results
+
+    def clusters(self, min_size: int = 2) -> List[List[Hashable]]:
+        """
+        获取近似重复簇
+
+        Args:
+            min_size: 最小簇大小
+
+        Returns:
+            评论标识列表的列表，每个簇按插入顺序排列，簇按大小降序排列
+        """
+        groups: Dict[int, List[Hashable]] = {}
+        for index, key in enumerate(self._keys):
+            groups.setdefault(self._find(index), []).append(key)
+        result = [members for members in groups.values() if len(members) >= min_size]
+        return sorted(result, key=len, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CommentDeduplicator:
+    """评论去重器类: 在分词前剔除近似重复的评论"""
+
+    def __init__(self, lsh: MinHashLSH = None):
+        """
+        初始化去重器
+
+        Args:
+            lsh: MinHash LSH 索引，默认新建；传入已有索引可跨批次增量去重
+        """
+        self.lsh = lsh or MinHashLSH()
+
+    def deduplicate(self, movies: List[Movie]) -> List[Movie]:
+        """
+        剔除近似重复评论，每个重复簇只保留最早出现的一条
+
+        Args:
+            movies: 电影列表
+
+        Returns:
+            评论去重后的新电影列表（原列表不修改）
+        """
+        keys = []
+        texts = []
+        for movie_index, movie in enumerate(movies):
+            for comment_index, comment in enumerate(movie.comments):
+                keys.append((movie_index, comment_index))
+                texts.append(comment.text)
+
+        duplicate_of = self.lsh.insert_texts(keys, texts)
+        duplicates = {key for key, source in zip(keys, duplicate_of) if source is not None}
+
+        result = []
+        for movie_index, movie in enumerate(movies):
+            kept = [comment for comment_index, comment in enumerate(movie.comments)
+                    if (movie_index, comment_index) not in duplicates]
+            result.append(movie.replace(comments=kept))
+
+        spam_clusters = self.lsh.clusters(config.DEDUP_SPAM_CLUSTER_SIZE)
+        logging.info("评论去重: %s 条评论中剔除 %s 条近似重复，"
+                     "疑似刷评簇 %s 个（每簇至少 %s 条）",
+                     len(texts), len(duplicates), len(spam_clusters), config.DEDUP_SPAM_CLUSTER_SIZE)
+        return result
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+高频词近似计数模块
+使用 Space-Saving 算法在固定内存内统计高频词，适用于超大评论语料
+
+Space-Saving 最多保存 capacity 个词及其计数:
+- 已跟踪的词直接累加计数
+- 未跟踪的词在容量已满时替换当前计数最小的词，继承其计数作为误差
+- 每个词的真实频次位于 [count - error, count] 区间内，且 error <= 总词频 / capacity
+- 真实频次大于 总词频 / capacity 的词一定会被保留
+
+两个计数器可以合并（未跟踪某词的一方按其最小计数估计），
+因此可以在多个工作进程中分别计数后再合并。
+"""
+
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+
+class SpaceSavingCounter:
+    """Space-Saving 高频词计数器，接口与 collections.Counter 的常用部分一致"""
+
+    def __init__(self, capacity: int):
+        """
+        初始化计数器
+
+        Args:
+            capacity: 最多跟踪的词数量（决定内存上限和误差上限）
+        """
+        if capacity <= 0:
+            raise ValueError("capacity 必须为正数")
+        self.capacity = capacity
+        self.total = 0
+        # 词 -> [计数, 误差]
+        self._entries: Dict[str, List[int]] = {}
+        # (计数, 词) 小顶堆，计数变化后旧堆元素延迟删除
+        self._heap: List[Tuple[int, str]] = []
+
+    def _min_count(self) -> int:
+        """当前最小计数（容量未满时为0）"""
+        if len(self._entries) < self.capacity:
+            return 0
+        while True:
+            count, word = self._heap[0]
+            entry = self._entries.get(word)
+            if entry is not None and entry[0] == count:
+                return count
+            heapq.heappop(self._heap)
+
+    def _compact_heap(self):
+        """堆中过期元素过多时重建堆"""
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(entry[0], word) for word, entry in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, word: str, count: int = 1):
+        """
+        累加单个词的计数
+
+        Args:
+            word: 词
+            count: 增加的次数
+        """
+        self.total += count
+        entry = self._entries.get(word)
+        if entry is not None:
+            entry[0] += count
+        elif len(self._entries) < self.capacity:
+            entry = self._entries[word] = [count, 0]
+        else:
+            # 替换计数最小的词，新词继承其计数作为误差
+            min_count = self._min_count()
+            _, evicted = heapq.heappop(self._heap)
+            del self._entries[evicted]
+            entry = self._entries[word] = [min_count + count, min_count]
+        heapq.heappush(self._heap, (entry[0], word))
+        self._compact_heap()
+
+    def update(self, words: Iterable[str] = None):
+        """
+        累加计数，参数可以是词序列或 词 -> 次数 映射（与 Counter.update 一致）
+
+        Args:
+            words: 词序列或词频映射
+        """
+        if words is None:
+            return
+        if isinstance(words, Mapping):
+            items = words.items()
+        else:
+            # 先在批内合并重复词，减少堆操作
+            items = Counter(words).items()
+        for word, count in items:
+            if count > 0:
+                self.add(word, count)
+
+    def merge(self, other: 'SpaceSavingCounter') -> 'SpaceSavingCounter':
+        """
+        合并另一个计数器，返回新的计数器（容量取两者较大值）
+
+        Args:
+            other: 另一个 SpaceSavingCounter
+
+        Returns:
+            合并后的计数器
+        """
+        capacity = max(self.capacity, other.capacity)
+        self_min = self._min_count()
+        other_min = other._min_count()
+
+        merged = []
+        for word in self._entries.keys() | other._entries.keys():
+            a = self._entries.get(word, (self_min, self_min))
+            b = other._entries.get(word, (other_min, other_min))
+            merged.append((a[0] + b[0], a[1] + b[1], word))
+
+        result = SpaceSavingCounter(capacity)
+        result.total = self.total + other.total
+        for count, error, word in heapq.nlargest(capacity, merged):
+            result._entries[word] = [count, error]
+        result._heap = [(entry[0], word) for word, entry in result._entries.items()]
+        heapq.heapify(result._heap)
+        return result
+
+    def most_common(self, n: int = None) -> List[Tuple[str, int]]:
+        """
+        获取计数最高的词
+
+        Args:
+            n: 数量，默认全部
+
+        Returns:
+            (词汇, 估计频次)元组列表，按频次降序
+        """
+        items = ((word, entry[0]) for word, entry in self._entries.items())
+        if n is None:
+            return sorted(items, key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(n, items, key=lambda item: item[1])
+
+    def error(self, word: str) -> int:
+        """
+        某个词计数的最大高估量
+
+        Args:
+            word: 词
+
+        Returns:
+            误差，未跟踪的词返回当前最小计数
+        """
+        entry = self._entries.get(word)
+        return entry[1] if entry is not None else self._min_count()
+
+    @property
+    def error_bound(self) -> int:
+        """任意词计数误差的上限: 总词频 / 容量"""
+        return self.total // self.capacity
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return ((word, entry[0]) for word, entry in self._entries.items())
+
+    def keys(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def values(self) -> Iterator[int]:
+        return (entry[0] for entry in self._entries.values())
+
+    def __getitem__(self, word: str) -> int:
+        entry = self._entries.get(word)
+        return entry[0] if entry is not None else 0
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __repr__(self) -> str:
+        return f"SpaceSavingCounter(capacity={self.capacity}, tracked={len(self)}, total={self.total})"
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+客户端身份池模块
+每个身份是一个独立的会话（User-Agent、Cookie、可选的本地代理），请求轮流分配给当前可用的身份
+
+- 每个身份两次请求之间至少间隔 min_interval 秒，池中有 N 个身份时总吞吐约为单个身份的 N 倍，
+  单个身份的请求频率不变
+- 触发反爬判断（403/418/429、非 JSON 的拦截页面）的身份休息 IDENTITY_REST_SECONDS 秒，
+  连续被拦截时休息时间翻倍（不超过 IDENTITY_MAX_REST_SECONDS）；连续失败多次的身份同样休息
+- 每个身份的 Cookie 保存在 data/identities/<池名称>_<序号>.cookies，下次运行继续使用，
+  不会每次都以陌生客户端身份访问
+"""
+
+import os
+import time
+import logging
+import threading
+from http.cookiejar import LWPCookieJar
+from typing import Dict, List, Optional, Sequence
+import requests
+import config
+from utils import ensure_dir
+
+# 被判定为拦截的 HTTP 状态码
+BLOCK_STATUS_CODES = (403, 418, 429)
+
+
+class Identity:
+    """客户端身份: 会话及其健康状态"""
+
+    __slots__ = ('name', 'session', 'proxy', 'cookie_file', 'ready_at', 'strikes',
+                 'consecutive_failures', 'requests', 'failures', 'blocks')
+
+    def __init__(self, name: str, headers: Dict[str, str], proxy: Optional[str], cookie_file: str):
+        """
+        初始化身份
+
+        Args:
+            name: 身份名称
+            headers: 会话请求头（含 User-Agent）
+            proxy: 代理地址，如 "http://127.0.0.1:7890"，None 表示直连
+            cookie_file: Cookie 保存路径
+        """
+        self.name = name
+        self.proxy = proxy
+        self.cookie_file = cookie_file
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.cookies = LWPCookieJar(cookie_file)
+        if proxy:
+            self.session.proxies.update({'http': proxy, 'https': proxy})
+        if os.path.exists(cookie_file):
+            try:
+                self.session.cookies.load(ignore_discard=True, ignore_expires=True)
+            except (OSError, ValueError) as e:
+                logging.warning("读取身份 %s 的 Cookie 失败: %s", name, e)
+
+        # 下次可以发出请求的时间（time.monotonic）
+        self.ready_at = 0.0
+        # 连续被拦截的次数，决定休息时长
+        self.strikes = 0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.blocks = 0
+
+    def save_cookies(self):
+        """保存 Cookie 到磁盘"""
+        self.session.cookies.save(ignore_discard=True, ignore_expires=True)
+
+
+class IdentityPool:
+    """客户端身份池类"""
+
+    def __init__(self, name: str, headers: Dict[str, str], user_agents: Sequence[str],
+                 min_interval: float, proxies: Sequence[str] = None, cookie_dir: str = None):
+        """
+        初始化身份池
+
+        Args:
+            name: 池名称（用于 Cookie 文件名和日志），如 "mobile"
+            headers: 公共请求头
+            user_agents: 每个身份的 User-Agent，身份数量与其相同
+            min_interval: 每个身份两次请求之间的最小间隔（秒）
+            proxies: 代理地址列表，按顺序循环分配给各身份，默认使用配置文件中的值
+            cookie_dir: Cookie 保存目录，默认使用配置文件中的路径
+        """
+        proxies = list(config.IDENTITY_PROXIES if proxies is None else proxies)
+        cookie_dir = cookie_dir or config.IDENTITY_COOKIE_DIR
+        ensure_dir(cookie_dir)
+
+        self.name = name
+        self.min_interval = min_interval
+        self.identities: List[Identity] = []
+        for i, user_agent in enumerate(user_agents or [headers.get('User-Agent', '')]):
+            identity_headers = dict(headers)
+            if user_agent:
+                identity_headers['User-Agent'] = user_agent
+            self.identities.append(Identity(
+                f"{name}-{i}", identity_headers,
+                proxies[i % len(proxies)] if proxies else None,
+                os.path.join(cookie_dir, f"{name}_{i}.cookies")))
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Identity:
+        """
+        取出最早可用的身份，需要时等待到其可用为止
+
+        Returns:
+            身份对象，其下次可用时间已预留 min_interval
+        """
+        with self._lock:
+            identity = min(self.identities, key=lambda item: item.ready_at)
+            now = time.monotonic()
+            wait = identity.ready_at - now
+            identity.ready_at = max(identity.ready_at, now) + self.min_interval
+            identity.requests += 1
+        if wait > 0:
+            if wait > self.min_interval:
+                logging.info("%s 身份池全部在休息，等待 %.0fs", self.name, wait)
+            time.sleep(wait)
+        return identity
+
+    def report(self, identity: Identity, ok: bool, blocked: bool = False):
+        """
+        记录请求结果，被拦截或连续失败的身份进入休息
+
+        Args:
+            identity: 发出请求的身份
+            ok: 请求是否成功
+            blocked: 是否触发了反爬判断
+        """
+        with self._lock:
+            if ok:
+                identity.strikes = 0
+                identity.consecutive_failures = 0
+                return
+            identity.failures += 1
+            identity.consecutive_failures += 1
+            if blocked:
+                identity.blocks += 1
+                identity.strikes += 1
+            elif identity.consecutive_failures < config.IDENTITY_MAX_FAILURES:
+                return
+            else:
+                identity.strikes += 1
+                identity.consecutive_failures = 0
+            rest = min(config.IDENTITY_REST_SECONDS * 2 ** (identity.strikes - 1),
+                       config.IDENTITY_MAX_REST_SECONDS)
+            identity.ready_at = max(identity.ready_at, time.monotonic() + rest)
+        logging.warning("身份 %s %s，休息 %.0fs", identity.name, '被拦截' if blocked else '连续请求失败', rest)
+
+    def save_cookies(self):
+        """保存所有身份的 Cookie"""
+        for identity in self.identities:
+            try:
+                identity.save_cookies()
+            except OSError as e:
+                logging.warning("保存身份 %s 的 Cookie 失败: %s", identity.name, e)
+
+    def summary(self) -> str:
+        """各身份的请求、失败和拦截次数"""
+        return ', '.join(f"{identity.name}: {identity.requests} 次请求/{identity.failures} 次失败/"
+                         f"{identity.blocks} 次拦截" for identity in self.identities)
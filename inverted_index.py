@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+倒排索引模块
+基于分词结果为评论归档建立持久化倒排索引，支持按词查询哪些电影的评论提到了该词
+
+- 每条评论是一个文档，文档编号按加入顺序递增，对应 (电影, 评论ID)
+- 直接使用分词结果的词ID数组，按 (词ID, 文档编号) 向量化去重排序，
+  每个不同的词只转换回字符串一次
+- 每个词的倒排表为升序文档编号，差分后以 varint 编码保存为二进制
+- 新评论的文档编号总是大于已有编号，增量更新只需在倒排表末尾追加编码
+- 编码、解码、AND/OR 合并和按电影计数均为 NumPy 向量化操作
+
+索引保存在 SQLite 数据库中:
+
+    movies    (movie, movie_key, movie_id, movie_name, city)
+    documents (doc, movie, comment_key)
+    doc_blocks(first_doc, movies)           -- 每次更新一块，文档编号 -> 电影编号的 int32 数组
+    postings  (token, doc_count, last_doc, data)
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+import numpy as np
+from array import array
+from typing import Dict, List, Sequence, Tuple
+import config
+from utils import ensure_dir
+from models import Comment, Movie
+from vocabulary import Vocabulary, get_vocabulary
+from word_freq_store import movie_key
+
+# 单条 SQL 中 IN 查询的最大参数数量
+_QUERY_CHUNK = 500
+
+
+def encode_postings(docs: np.ndarray, previous: int = -1) -> bytes:
+    """
+    将升序文档编号差分后编码为 varint 字节串
+
+    每个编号保存与前一个编号的间隔减一，追加编码的多段字节串直接拼接即可解码。
+
+    Args:
+        docs: 升序文档编号数组
+        previous: 已有倒排表的最后一个文档编号（追加编码时使用），-1 表示从头编码
+
+    Returns:
+        编码后的字节串
+    """
+    if not len(docs):
+        return b''
+    deltas = (np.diff(np.asarray(docs, dtype=np.int64), prepend=previous) - 1).astype(np.uint64)
+    n_bytes = 1
+    while (deltas >> np.uint64(7 * n_bytes)).any():
+        n_bytes += 1
+
+    shifts = np.arange(n_bytes, dtype=np.uint64) * np.uint64(7)
+    groups = ((deltas[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8)
+    # 每个值实际需要的字节数（至少1个）
+    used = np.ones((len(deltas), n_bytes), dtype=bool)
+    used[:, 1:] = (deltas[:, None] >> shifts[1:]) > 0
+    # 除最后一个字节外设置延续位
+    more = np.zeros_like(used)
+    more[:, :-1] = used[:, 1:]
+    groups[more] |= 0x80
+    return groups[used].tobytes()
+
+
+def decode_postings(data: bytes) -> np.ndarray:
+    """
+    解码 varint 字节串为升序文档编号
+
+    Args:
+        data: encode_postings 生成的字节串（可以是多段追加编码的拼接）
+
+    Returns:
+        int64 文档编号数组
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.array([], dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    values = (raw & 0x7F).astype(np.int64) << (7 * position)
+    deltas = np.add.reduceat(values, starts)
+    return np.cumsum(deltas + 1) - 1
+
+
+def comment_key(comment: Comment) -> str:
+    """
+    评论在电影内的唯一标识: 豆瓣评论ID，没有ID时使用评论文本摘要
+
+    Args:
+        comment: 评论记录
+
+    Returns:
+        评论标识字符串
+    """
+    if comment.comment_id:
+        return comment.comment_id
+    return hashlib.blake2b(comment.text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class InvertedIndex:
+    """评论倒排索引类"""
+
+    def __init__(self, filepath: str = None, vocabulary: Vocabulary = None):
+        """
+        初始化倒排索引
+
+        Args:
+            filepath: 索引数据库路径，默认使用配置文件中的路径
+            vocabulary: 评论词ID所属的词表，默认使用共享词表
+        """
+        if filepath is None:
+            filepath = config.INVERTED_INDEX_FILE
+        self.filepath = filepath
+        self.vocabulary = get_vocabulary() if vocabulary is None else vocabulary
+
+        ensure_dir(os.path.dirname(filepath) or '.')
+        self._conn = sqlite3.connect(filepath)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS movies ("
+            "movie INTEGER PRIMARY KEY, movie_key TEXT UNIQUE NOT NULL, "
+            "movie_id TEXT, movie_name TEXT, city TEXT);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc INTEGER PRIMARY KEY, movie INTEGER NOT NULL, comment_key TEXT NOT NULL, "
+            "UNIQUE (movie, comment_key));"
+            "CREATE TABLE IF NOT EXISTS doc_blocks ("
+            "first_doc INTEGER PRIMARY KEY, movies BLOB NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "token TEXT PRIMARY KEY, doc_count INTEGER NOT NULL, "
+            "last_doc INTEGER NOT NULL, data BLOB NOT NULL);"
+        )
+        # 文档编号 -> 电影编号（首次按电影计数时加载）
+        self._doc_movies = None
+
+    def __len__(self) -> int:
+        """已索引的评论数量"""
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # ----------------------------------------------------------------
+    # 增量更新
+    # ----------------------------------------------------------------
+
+    def _movie_numbers(self, movies: List[Movie]) -> List[int]:
+        """获取电影编号，新电影登记到 movies 表"""
+        keys = [movie_key(movie) for movie in movies]
+        known = dict(self._conn.execute("SELECT movie_key, movie FROM movies"))
+        new_rows = []
+        for key, movie in zip(keys, movies):
+            if key not in known:
+                known[key] = len(known)
+                new_rows.append((known[key], key, movie.movie_id or '', movie.movie_name, movie.city))
+        self._conn.executemany(
+            "INSERT INTO movies (movie, movie_key, movie_id, movie_name, city) VALUES (?, ?, ?, ?, ?)",
+            new_rows)
+        return [known[key] for key in keys]
+
+    def _load_postings(self, tokens: List[str]) -> Dict[str, Tuple[int, int, bytes]]:
+        """批量读取已有倒排表: 词 -> (文档数, 最后文档编号, 编码数据)"""
+        found = {}
+        for i in range(0, len(tokens), _QUERY_CHUNK):
+            chunk = tokens[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT token, doc_count, last_doc, data FROM postings WHERE token IN ({placeholders})",
+                chunk)
+            for token, doc_count, last_doc, data in rows:
+                found[token] = (doc_count, last_doc, data)
+        return found
+
+    def _existing_documents(self, movie_numbers: List[int]) -> set:
+        """已索引的 (电影编号, 评论标识)，只查询本批涉及的电影"""
+        existing = set()
+        for i in range(0, len(movie_numbers), _QUERY_CHUNK):
+            chunk = movie_numbers[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(self._conn.execute(
+                f"SELECT movie, comment_key FROM documents WHERE movie IN ({placeholders})", chunk))
+        return existing
+
+    def add_movies(self, movies: List[Movie], comment_ids: Sequence[array]) -> int:
+        """
+        将电影评论加入索引，已索引的评论会被跳过
+
+        索引不过滤停用词，只去掉单字符和纯数字。
+
+        Args:
+            movies: 电影列表
+            comment_ids: 按电影顺序排列的所有评论词ID数组（与 movies 的评论一一对应）
+
+        Returns:
+            新加入的评论数量
+        """
+        movie_numbers = self._movie_numbers(movies)
+        existing = self._existing_documents(sorted(set(movie_numbers)))
+        next_doc = self._conn.execute("SELECT COALESCE(MAX(doc) + 1, 0) FROM documents").fetchone()[0]
+
+        ids_iter = iter(comment_ids)
+        documents = []
+        new_ids = []
+        for number, movie in zip(movie_numbers, movies):
+            for comment in movie.comments:
+                ids = next(ids_iter)
+                key = (number, comment_key(comment))
+                if key in existing:
+                    continue
+                existing.add(key)
+                documents.append((next_doc + len(documents), number, key[1]))
+                new_ids.append(ids)
+
+        if not documents:
+            return 0
+
+        # (词ID, 本批文档序号) 合成一个键，去重排序后按词ID分段即为每个词的升序文档列表
+        token_ids = np.frombuffer(b''.join(new_ids), dtype=np.uintc).astype(np.int64)
+        lengths = np.fromiter((len(ids) for ids in new_ids), dtype=np.int64, count=len(new_ids))
+        local_docs = np.repeat(np.arange(len(new_ids), dtype=np.int64), lengths)
+        keep = self.vocabulary.valid_mask(set())[token_ids]
+        keys = np.unique(token_ids[keep] * len(new_ids) + local_docs[keep])
+        key_tokens = keys // len(new_ids)
+        key_docs = keys % len(new_ids) + next_doc
+        starts = np.flatnonzero(np.diff(key_tokens, prepend=-1))
+        words = self.vocabulary.decode(key_tokens[starts])
+        token_docs: Dict[str, np.ndarray] = dict(zip(words, np.split(key_docs, starts[1:])))
+
+        previous = self._load_postings(list(token_docs))
+        rows = []
+        for token, docs in token_docs.items():
+            doc_count, last_doc, data = previous.get(token, (0, -1, b''))
+            rows.append((token, doc_count + len(docs), int(docs[-1]),
+                         data + encode_postings(docs, last_doc)))
+
+        block = np.array([number for _, number, _ in documents], dtype=np.int32)
+        self._conn.executemany(
+            "INSERT INTO documents (doc, movie, comment_key) VALUES (?, ?, ?)", documents)
+        self._conn.execute("INSERT INTO doc_blocks (first_doc, movies) VALUES (?, ?)",
+                           (documents[0][0], block.tobytes()))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO postings (token, doc_count, last_doc, data) VALUES (?, ?, ?, ?)",
+            rows)
+        self._conn.commit()
+
+        if self._doc_movies is not None:
+            self._doc_movies = np.concatenate((self._doc_movies, block))
+        logging.info("倒排索引新增 %s 条评论、%s 个词的倒排记录", len(documents), len(rows))
+        return len(documents)
+
+    # ----------------------------------------------------------------
+    # 查询
+    # ----------------------------------------------------------------
+
+    def postings(self, token: str) -> np.ndarray:
+        """
+        查询单个词的倒排表
+
+        Args:
+            token: 词
+
+        Returns:
+            包含该词的文档编号数组（升序）
+        """
+        row = self._conn.execute("SELECT data FROM postings WHERE token = ?", (token,)).fetchone()
+        return decode_postings(row[0]) if row else np.array([], dtype=np.int64)
+
+    def document_frequency(self, token: str) -> int:
+        """
+        包含某个词的评论数量（无需解码倒排表）
+
+        Args:
+            token: 词
+
+        Returns:
+            评论数量
+        """
+        row = self._conn.execute("SELECT doc_count FROM postings WHERE token = ?", (token,)).fetchone()
+        return row[0] if row else 0
+
+    def query(self, terms: Sequence[str], mode: str = 'or') -> np.ndarray:
+        """
+        多词查询
+
+        Args:
+            terms: 词列表
+            mode: 'and' 返回包含全部词的评论，'or' 返回包含任意词的评论
+
+        Returns:
+            文档编号数组（升序）
+        """
+        if mode not in ('and', 'or'):
+            raise ValueError("mode 只能为 'and' 或 'or'")
+        if not terms:
+            return np.array([], dtype=np.int64)
+
+        if mode == 'and':
+            # 从最短的倒排表开始求交集
+            terms = sorted(terms, key=self.document_frequency)
+            result = self.postings(terms[0])
+            for term in terms[1:]:
+                if not len(result):
+                    break
+                # 在文档编号位图上标记另一个倒排表，保留当前结果中被标记的文档
+                other = self.postings(term)
+                mask = np.zeros(int(result[-1]) + 1, dtype=bool)
+                mask[other[other <= result[-1]]] = True
+                result = result[mask[result]]
+            return result
+
+        # 并集: 在文档编号位图上标记后取出，避免对大数组排序
+        lists = [self.postings(term) for term in terms]
+        size = max((int(docs[-1]) + 1 for docs in lists if len(docs)), default=0)
+        mask = np.zeros(size, dtype=bool)
+        for docs in lists:
+            mask[docs] = True
+        return np.flatnonzero(mask)
+
+    def _load_doc_movies(self) -> np.ndarray:
+        """文档编号 -> 电影编号数组"""
+        if self._doc_movies is None:
+            blocks = [np.frombuffer(data, dtype=np.int32) for data, in
+                      self._conn.execute("SELECT movies FROM doc_blocks ORDER BY first_doc")]
+            self._doc_movies = np.concatenate(blocks) if blocks else np.array([], dtype=np.int32)
+        return self._doc_movies
+
+    def movie_counts(self, docs: np.ndarray) -> List[Dict]:
+        """
+        按电影统计文档数量
+
+        Args:
+            docs: 文档编号数组（如 query 的结果）
+
+        Returns:
+            电影信息及评论数列表，按评论数降序
+        """
+        if not len(docs):
+            return []
+        counts = np.bincount(self._load_doc_movies()[docs])
+        movies = {movie: (key, movie_id, name, city) for movie, key, movie_id, name, city
+                  in self._conn.execute("SELECT movie, movie_key, movie_id, movie_name, city FROM movies")}
+
+        result = []
+        for movie in np.flatnonzero(counts).tolist():
+            key, movie_id, name, city = movies[movie]
+            result.append({'movie_key': key, 'movie_id': movie_id, 'movie_name': name,
+                           'city': city, 'comments': int(counts[movie])})
+        return sorted(result, key=lambda item: item['comments'], reverse=True)
+
+    def search(self, terms: Sequence[str], mode: str = 'or') -> List[Dict]:
+        """
+        查询哪些电影的评论提到了这些词、各有多少条
+
+        Args:
+            terms: 词列表
+            mode: 'and' 或 'or'
+
+        Returns:
+            电影信息及评论数列表，按评论数降序
+        """
+        return self.movie_counts(self.query(terms, mode))
+
+    def documents(self, docs: np.ndarray) -> List[Tuple[str, str]]:
+        """
+        文档编号对应的 (电影键, 评论标识)
+
+        Args:
+            docs: 文档编号数组
+
+        Returns:
+            (电影键, 评论标识) 列表
+        """
+        result = []
+        docs = [int(doc) for doc in docs]
+        for i in range(0, len(docs), _QUERY_CHUNK):
+            chunk = docs[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            result.extend(self._conn.execute(
+                "SELECT m.movie_key, d.comment_key FROM documents d JOIN movies m ON d.movie = m.movie "
+                f"WHERE d.doc IN ({placeholders}) ORDER BY d.doc", chunk))
+        return result
+
+    def close(self):
+        """关闭索引"""
+        self._conn.close()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+关键词提取模块
+基于每部电影的词频快照构建稀疏文档-词矩阵，向量化计算 TF-IDF，
+提取每部电影区别于其他电影的关键词
+
+文档默认按电影ID合并各城市评论（KEYWORDS_GROUP_BY = "movie"），也可以是单部电影在某个城市的评论（"movie_city"）。
+矩阵以 COO 形式保存（文档下标、词下标、计数三个数组），词表为快照中的词ID，
+只有最终选出的关键词才转换为字符串。全部计算均为 NumPy 向量化操作，
+数千部电影可在秒级完成，无需对每部电影重新拼接文本调用 jieba.analyse.extract_tags。
+"""
+
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from word_freq_store import FrequencySnapshot
+from vocabulary import Vocabulary
+
+
+class DocumentTermMatrix:
+    """COO 格式的稀疏文档-词矩阵"""
+
+    __slots__ = ('doc_ids', 'vocabulary', 'doc_index', 'term_index', 'counts', 'lexicon')
+
+    def __init__(self, doc_ids: List[str], vocabulary: np.ndarray, doc_index: np.ndarray,
+                 term_index: np.ndarray, counts: np.ndarray, lexicon: Optional[Vocabulary] = None):
+        """
+        初始化文档-词矩阵
+
+        Args:
+            doc_ids: 文档ID列表
+            vocabulary: 排序后的词表（lexicon 不为空时为词ID数组）
+            doc_index: 每个非零元素所在的文档下标
+            term_index: 每个非零元素对应的词下标
+            counts: 每个非零元素的计数
+            lexicon: 将词ID转换为词的词表，vocabulary 为词数组时为None
+        """
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.doc_index = doc_index
+        self.term_index = term_index
+        self.counts = counts
+        self.lexicon = lexicon
+
+    @classmethod
+    def from_snapshots(cls, doc_ids: Sequence[str],
+                       snapshots: Sequence[FrequencySnapshot]) -> 'DocumentTermMatrix':
+        """
+        由词频快照构建矩阵，相同文档ID的快照会被合并
+
+        Args:
+            doc_ids: 与快照一一对应的文档ID
+            snapshots: 词频快照列表
+
+        Returns:
+            DocumentTermMatrix对象
+        """
+        unique_ids, doc_of_snapshot = np.unique(np.asarray(doc_ids, dtype=str), return_inverse=True)
+        lengths = np.fromiter((len(s) for s in snapshots), dtype=np.int64, count=len(snapshots))
+        if not lengths.sum():
+            empty = np.array([], dtype=np.int64)
+            return cls(unique_ids.tolist(), np.array([], dtype=str), empty, empty, empty)
+
+        lexicon = next(s.vocabulary for s in snapshots if len(s))
+        ids = np.concatenate([s.ids for s in snapshots if len(s)])
+        counts = np.concatenate([s.counts for s in snapshots if len(s)])
+        vocabulary, term_index = np.unique(ids, return_inverse=True)
+        doc_index = np.repeat(doc_of_snapshot.reshape(-1), lengths)
+
+        # 合并重复的 (文档, 词) 元素
+        n_terms = len(vocabulary)
+        flat, inverse = np.unique(doc_index * n_terms + term_index.reshape(-1), return_inverse=True)
+        merged_counts = np.bincount(inverse.reshape(-1), weights=counts,
+                                    minlength=len(flat)).astype(np.int64)
+        return cls(unique_ids.tolist(), vocabulary, flat // n_terms, flat % n_terms, merged_counts,
+                   lexicon)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(文档数, 词数)"""
+        return len(self.doc_ids), len(self.vocabulary)
+
+    @property
+    def nnz(self) -> int:
+        """非零元素数量"""
+        return len(self.counts)
+
+
+def tfidf_scores(matrix: DocumentTermMatrix, sublinear_tf: bool = True) -> np.ndarray:
+    """
+    计算每个非零元素的 TF-IDF 值
+
+    TF 为词在文档内的频率（可选对数缩放），IDF 采用平滑形式
+    log((1 + N) / (1 + df)) + 1，与常见实现一致。
+
+    Args:
+        matrix: 文档-词矩阵
+        sublinear_tf: 是否使用 1 + log(count) 作为词频
+
+    Returns:
+        与 matrix.counts 等长的 TF-IDF 数组
+    """
+    n_docs, n_terms = matrix.shape
+    counts = matrix.counts.astype(np.float64)
+    tf = 1.0 + np.log(counts) if sublinear_tf else counts
+    doc_totals = np.bincount(matrix.doc_index, weights=tf, minlength=n_docs)
+    tf = tf / doc_totals[matrix.doc_index]
+
+    df = np.bincount(matrix.term_index, minlength=n_terms)
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    return tf * idf[matrix.term_index]
+
+
+def top_keywords(matrix: DocumentTermMatrix, top_k: int = 10, min_count: int = 1,
+                 max_df_ratio: float = 1.0,
+                 sublinear_tf: bool = True) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    提取每个文档 TF-IDF 最高的关键词
+
+    Args:
+        matrix: 文档-词矩阵
+        top_k: 每个文档的关键词数量
+        min_count: 词在文档内的最少出现次数
+        max_df_ratio: 出现在超过该比例文档中的词不作为关键词（如 0.5）
+        sublinear_tf: 是否使用对数词频
+
+    Returns:
+        文档ID -> [(关键词, TF-IDF)] 列表（按得分降序）
+    """
+    n_docs, n_terms = matrix.shape
+    if not matrix.nnz or top_k <= 0:
+        return {doc_id: [] for doc_id in matrix.doc_ids}
+
+    scores = tfidf_scores(matrix, sublinear_tf)
+
+    df = np.bincount(matrix.term_index, minlength=n_terms)
+    keep = (matrix.counts >= min_count) & (df[matrix.term_index] <= max_df_ratio * n_docs)
+    doc_index = matrix.doc_index[keep]
+    term_index = matrix.term_index[keep]
+    scores = scores[keep]
+
+    # 按文档分组、组内按得分降序排序，取每组前 top_k 个
+    order = np.lexsort((term_index, -scores, doc_index))
+    doc_sorted = doc_index[order]
+    group_start = np.searchsorted(doc_sorted, np.arange(n_docs))
+    rank = np.arange(len(order)) - group_start[doc_sorted]
+    selected = order[rank < top_k]
+
+    result: Dict[str, List[Tuple[str, float]]] = {doc_id: [] for doc_id in matrix.doc_ids}
+    terms = matrix.vocabulary[term_index[selected]]
+    words = matrix.lexicon.decode(terms) if matrix.lexicon is not None else terms.tolist()
+    for doc, word, score in zip(doc_index[selected].tolist(), words, scores[selected].tolist()):
+        result[matrix.doc_ids[doc]].append((word, round(score, 6)))
+
+    logging.info("TF-IDF 关键词提取完成: %s 个文档, %s 个词, %s 个非零元素", n_docs, n_terms, matrix.nnz)
+    return result
@@ -1,96 +1,99 @@
-# -*- coding: utf-8 -*-
-"""
-豆瓣电影爬虫主程序
-"""
-
-import logging
-from utils import setup_logging, ensure_dir
-from spider import DoubanMovieSpider
-from data_processor import DataProcessor
-from visualizer import Visualizer
-from wordcloud_generator import WordCloudGenerator
-import config
-
-
-def main():
-    """主函数"""
-    # 设置日志
-    setup_logging(logging.INFO)
-    logging.info("=" * 60)
-    logging.info("豆瓣电影爬虫程序启动")
-    logging.info("=" * 60)
-    
-    # 确保目录存在
-    ensure_dir(config.DATA_DIR)
-    ensure_dir(config.IMAGES_DIR)
-    ensure_dir(config.FONTS_DIR)
-    
-    try:
-        # 1. 初始化各模块
-        logging.info("\n[步骤 1/6] 初始化模块...")
-        spider = DoubanMovieSpider()
-        processor = DataProcessor()
-        visualizer = Visualizer()
-        wordcloud_gen = WordCloudGenerator()
-        
-        # 2. 爬取电影列表
-        logging.info("\n[步骤 2/6] 爬取电影列表...")
-        movies = spider.crawl_movies()
-        
-        if not movies:
-            logging.error("未爬取到任何电影数据，程序退出")
-            return
-        
-        logging.info(f"成功爬取 {len(movies)} 部电影的基本信息")
-        
-        # 3. 爬取电影评论
-        logging.info("\n[步骤 3/6] 爬取电影评论...")
-        movies = spider.crawl_all_comments(movies)
-        
-        # 统计评论数量
-        total_comments = sum(len(movie.get('comments', [])) for movie in movies)
-        logging.info(f"共爬取 {total_comments} 条评论")
-        
-        # 4. 保存原始数据
-        logging.info("\n[步骤 4/6] 保存原始数据...")
-        processor.save_to_csv(movies)
-        processor.save_to_json(movies)
-        
-        # 5. 数据处理和可视化
-        logging.info("\n[步骤 5/6] 数据处理和可视化...")
-        sorted_movies = processor.sort_by_wish_count(movies)
-        top_movies = processor.get_top_movies(sorted_movies)
-        
-        # 显示Top 5电影信息
-        logging.info("\n想看人数Top 5电影:")
-        for i, movie in enumerate(top_movies, 1):
-            logging.info(f"  {i}. {movie.get('movie_name')}: {movie.get('wish_count')} 人想看")
-        
-        # 生成可视化图表
-        visualizer.plot_top_movies(sorted_movies)
-        
-        # 6. 评论分析和词云生成
-        logging.info("\n[步骤 6/6] 评论分析和词云生成...")
-        wordcloud_gen.process_comments(movies)
-        
-        # 输出统计信息
-        logging.info("\n" + "=" * 60)
-        logging.info("程序执行完成！")
-        logging.info("=" * 60)
-        logging.info(f"输出文件:")
-        logging.info(f"  - 数据文件: {config.MOVIES_CSV_FILE}, {config.MOVIES_JSON_FILE}")
-        logging.info(f"  - 可视化图表: {config.TOP5_IMAGE_FILE}")
-        logging.info(f"  - 词云图: {config.WORDCLOUD_IMAGE_FILE}")
-        logging.info(f"  - 词频统计: {config.WORD_STATISTICS_FILE}")
-        logging.info("=" * 60)
-        
-    except KeyboardInterrupt:
-        logging.warning("\n用户中断程序")
-    except Exception as e:
-        logging.error(f"\n程序执行出错: {str(e)}", exc_info=True)
-        raise
-
-
-if __name__ == "__main__":
-    main()
-
+# -*- coding: utf-8 -*-
+"""
+豆瓣电影爬虫主程序
+"""
+
+import argparse
+import logging
+from utils import setup_logging, ensure_dir, prewarm_jieba
+from pipeline import build_pipeline, PipelineContext
+from profiling import profiler
+import config
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description="豆瓣电影爬虫",
+        epilog="示例: python main.py analyze  # 只用已保存的数据重新分析，不访问网络")
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        help="要执行的阶段: crawl（爬取）、chart（图表）、analyze（评论分析和词云），"
+                             "默认全部；输入未变化的阶段会被跳过")
+    parser.add_argument('--force', action='store_true',
+                        help="忽略缓存状态，强制执行选中的阶段")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="只显示哪些阶段需要执行，不实际执行")
+    parser.add_argument('--crawl-only', action='store_true',
+                        help="只爬取并保存数据，等同于 crawl 阶段（不加载 matplotlib/jieba/wordcloud）")
+    parser.add_argument('--profile', action='store_true',
+                        help="记录各阶段和热点方法的耗时、峰值内存，并为每个阶段保存 cProfile 统计（可生成火焰图）")
+    parser.add_argument('--serve', action='store_true',
+                        help="启动本地只读查询服务，以 JSON 提供 Top N 电影、评论和词频")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常驻运行，按热度持续刷新电影评论并增量保存（Ctrl+C 平滑退出）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    stages = ['crawl'] if args.crawl_only else args.stages
+    
+    # 设置日志
+    setup_logging(logging.INFO)
+    logging.info("=" * 60)
+    logging.info("豆瓣电影爬虫程序启动")
+    logging.info("=" * 60)
+    
+    # 确保目录存在
+    ensure_dir(config.DATA_DIR)
+    ensure_dir(config.IMAGES_DIR)
+    ensure_dir(config.FONTS_DIR)
+    
+    if args.profile:
+        profiler.enable(trace_memory=config.PROFILE_TRACE_MEMORY, profile_dir=config.PROFILE_DIR)
+    
+    if args.daemon:
+        from scheduler import CrawlDaemon
+        CrawlDaemon().run()
+        return
+    
+    if args.serve:
+        from query_service import QueryService
+        QueryService().serve()
+        return
+    
+    try:
+        pipeline = build_pipeline()
+        ctx = PipelineContext()
+        
+        # 爬取期间在后台预热 jieba 词典，分析阶段无需再等待
+        if not stages or 'analyze' in stages:
+            ctx.shared['prewarm_thread'] = prewarm_jieba(background=True)
+        
+        results = pipeline.run(stages, force=args.force, dry_run=args.dry_run, ctx=ctx)
+        
+        # 输出统计信息
+        logging.info("\n" + "=" * 60)
+        logging.info("程序执行完成！")
+        logging.info("=" * 60)
+        logging.info("阶段结果: " + ", ".join(f"{name}={result}" for name, result in results.items()))
+        logging.info(f"输出文件:")
+        logging.info(f"  - 数据文件: {config.MOVIES_CSV_FILE}, {config.MOVIES_JSON_FILE}")
+        logging.info(f"  - 可视化图表: {config.TOP5_IMAGE_FILE}")
+        logging.info(f"  - 词云图: {config.WORDCLOUD_IMAGE_FILE}")
+        logging.info(f"  - 词频统计: {config.WORD_STATISTICS_FILE}")
+        logging.info("=" * 60)
+        
+    except KeyboardInterrupt:
+        logging.warning("\n用户中断程序")
+    except Exception as e:
+        logging.error(f"\n程序执行出错: {str(e)}", exc_info=True)
+        raise
+    finally:
+        if profiler.stats:
+            logging.info("\n性能统计:\n" + profiler.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型模块
+定义贯穿爬取、存储、分析流程的电影与评论记录类型
+
+Movie / Comment 使用 __slots__ 声明固定字段，不为每个实例分配 __dict__，
+在大量电影-城市观测数据驻留内存时比普通字典更省内存、属性访问更快。
+to_dict / from_dict 负责与原有字典/JSON 结构互相转换，保持文件格式兼容。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Union
+from utils import get_movie_id_from_url
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    """将可选数值字段（JSON 中的 null、CSV 中的空字符串）转换为浮点数"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Comment:
+    """评论记录"""
+
+    __slots__ = ('text', 'comment_id', 'rating', 'create_time')
+
+    def __init__(self, text: str, comment_id: str = '', rating: int = 0,
+                 create_time: str = ''):
+        """
+        初始化评论记录
+
+        Args:
+            text: 评论文本（已清理）
+            comment_id: 豆瓣评论ID，未知时为空字符串
+            rating: 评分（1-5 星），未评分为0
+            create_time: 评论时间字符串
+        """
+        self.text = text
+        self.comment_id = comment_id
+        self.rating = rating
+        self.create_time = create_time
+
+    @classmethod
+    def from_value(cls, value: Union[str, Dict, 'Comment']) -> 'Comment':
+        """
+        从原有的字符串或字典结构创建评论记录
+
+        Args:
+            value: 评论文本、评论字典或 Comment 对象
+
+        Returns:
+            Comment对象
+        """
+        if isinstance(value, Comment):
+            return value
+        if isinstance(value, dict):
+            return cls(
+                text=value.get('text', '') or '',
+                comment_id=str(value.get('comment_id', '') or ''),
+                rating=int(value.get('rating', 0) or 0),
+                create_time=value.get('create_time', '') or '',
+            )
+        return cls(str(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典
+
+        Returns:
+            评论信息字典
+        """
+        return {
+            'text': self.text,
+            'comment_id': self.comment_id,
+            'rating': self.rating,
+            'create_time': self.create_time,
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Comment):
+            return NotImplemented
+        return (self.text, self.comment_id, self.rating, self.create_time) == \
+               (other.text, other.comment_id, other.rating, other.create_time)
+
+    # 记录可变且按字段比较相等，不提供哈希（不能作为字典键或放入集合）
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Comment(text={self.text[:20]!r}, comment_id={self.comment_id!r})"
+
+
+class Movie:
+    """电影记录"""
+
+    __slots__ = ('movie_name', 'movie_url', 'release_date', 'country',
+                 'wish_count', 'city', 'rating', 'genres', 'duration', 'directors',
+                 'sentiment_score', 'positive_ratio', 'comments')
+
+    # 与原有字典结构对应的字段顺序（CSV 列顺序）
+    FIELDS = ('movie_name', 'movie_url', 'release_date', 'country',
+              'wish_count', 'city', 'rating', 'genres', 'duration', 'directors',
+              'sentiment_score', 'positive_ratio', 'comments')
+
+    # 分析阶段写回的派生字段（不属于爬取数据）
+    DERIVED_FIELDS = ('sentiment_score', 'positive_ratio')
+
+    def __init__(self, movie_name: str, movie_url: str = '', release_date: str = '',
+                 country: str = '', wish_count: int = 0, city: str = '',
+                 rating: Optional[float] = None, genres: str = '', duration: str = '',
+                 directors: str = '',
+                 sentiment_score: Optional[float] = None, positive_ratio: Optional[float] = None,
+                 comments: Optional[List[Comment]] = None):
+        """
+        初始化电影记录
+
+        Args:
+            movie_name: 电影名称
+            movie_url: 豆瓣电影URL
+            release_date: 上映时间
+            country: 国家/地区
+            wish_count: 想看人数
+            city: 爬取时的城市代码
+            rating: 豆瓣评分（0-10），暂无评分或未补充元数据时为None
+            genres: 类型，如 "剧情 / 喜剧"
+            duration: 片长，如 "118分钟"
+            directors: 导演，多位导演以 " / " 分隔
+            sentiment_score: 评论情感得分（-1 到 1），未分析时为None
+            positive_ratio: 有情感倾向的评论中正面评论的比例，未分析时为None
+            comments: 评论列表
+        """
+        self.movie_name = movie_name
+        self.movie_url = movie_url
+        self.release_date = release_date
+        self.country = country
+        self.wish_count = wish_count
+        self.city = city
+        self.rating = rating
+        self.genres = genres
+        self.duration = duration
+        self.directors = directors
+        self.sentiment_score = sentiment_score
+        self.positive_ratio = positive_ratio
+        self.comments = comments if comments is not None else []
+
+    @property
+    def movie_id(self) -> Optional[str]:
+        """从电影URL中提取的豆瓣电影ID"""
+        return get_movie_id_from_url(self.movie_url)
+
+    @property
+    def comment_texts(self) -> List[str]:
+        """评论文本列表"""
+        return [comment.text for comment in self.comments]
+
+    def replace(self, **changes) -> 'Movie':
+        """
+        复制电影记录并替换部分字段（原记录不修改）
+
+        Args:
+            **changes: 需要替换的字段
+
+        Returns:
+            新的Movie对象
+        """
+        values = {f: getattr(self, f) for f in self.__slots__}
+        values.update(changes)
+        return Movie(**values)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Movie':
+        """
+        从原有的电影字典结构创建电影记录
+
+        Args:
+            data: 电影信息字典（comments 可以是字符串列表或评论字典列表）
+
+        Returns:
+            Movie对象
+        """
+        wish_count = data.get('wish_count', 0)
+        try:
+            wish_count = int(wish_count or 0)
+        except (TypeError, ValueError):
+            wish_count = 0
+
+        return cls(
+            movie_name=data.get('movie_name', '') or '',
+            movie_url=data.get('movie_url', '') or '',
+            release_date=data.get('release_date', '') or '',
+            country=data.get('country', '') or '',
+            wish_count=wish_count,
+            city=data.get('city', '') or '',
+            rating=_optional_float(data.get('rating')),
+            genres=data.get('genres', '') or '',
+            duration=data.get('duration', '') or '',
+            directors=data.get('directors', '') or '',
+            sentiment_score=_optional_float(data.get('sentiment_score')),
+            positive_ratio=_optional_float(data.get('positive_ratio')),
+            comments=[Comment.from_value(c) for c in data.get('comments', None) or []],
+        )
+
+    def to_dict(self, comment_details: bool = False) -> Dict[str, Any]:
+        """
+        转换为原有的电影字典结构
+
+        Args:
+            comment_details: 为True时评论输出为字典（含ID、评分），
+                             默认输出为评论文本列表，与历史JSON格式一致
+
+        Returns:
+            电影信息字典
+        """
+        if comment_details:
+            comments = [comment.to_dict() for comment in self.comments]
+        else:
+            comments = self.comment_texts
+        return {
+            'movie_name': self.movie_name,
+            'movie_url': self.movie_url,
+            'release_date': self.release_date,
+            'country': self.country,
+            'wish_count': self.wish_count,
+            'city': self.city,
+            'rating': self.rating,
+            'genres': self.genres,
+            'duration': self.duration,
+            'directors': self.directors,
+            'sentiment_score': self.sentiment_score,
+            'positive_ratio': self.positive_ratio,
+            'comments': comments,
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Movie):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    # 记录可变且按字段比较相等，不提供哈希（不能作为字典键或放入集合）
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Movie(movie_name={self.movie_name!r}, wish_count={self.wish_count}, "
+                f"comments={len(self.comments)})")
+
+
+def movies_from_dicts(items: Iterable[Dict[str, Any]]) -> List[Movie]:
+    """
+    批量将电影字典转换为 Movie 对象
+
+    Args:
+        items: 电影信息字典序列
+
+    Returns:
+        Movie对象列表
+    """
+    return [item if isinstance(item, Movie) else Movie.from_dict(item) for item in items]
+
+
+def movies_to_dicts(movies: Iterable[Movie], comment_details: bool = False) -> List[Dict[str, Any]]:
+    """
+    批量将 Movie 对象转换为电影字典
+
+    Args:
+        movies: Movie对象序列
+        comment_details: 是否输出评论详细字段
+
+    Returns:
+        电影信息字典列表
+    """
+    return [movie.to_dict(comment_details) for movie in movies]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+电影元数据补充模块
+通过 Rexxar API 的条目接口 (/movie/{id}) 为电影补充评分、类型、片长和导演，
+不再逐个抓取 movie.douban.com/subject/{id} 的 HTML 页面
+
+- 元数据很少变化，按电影ID缓存在 SQLite 中，METADATA_CACHE_TTL 内不重复请求
+- 缓存批量查询、批量写入；未命中的电影由多个线程并发请求，
+  请求经过爬虫的移动端身份池，与评论请求共用每个身份的请求间隔
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+import config
+from utils import ensure_dir
+from profiling import profiled
+from models import Movie
+
+# 单条 SQL 中 IN 查询的最大参数数量
+_QUERY_CHUNK = 500
+
+
+def parse_subject(data: Dict) -> Dict:
+    """
+    从条目 JSON 中提取元数据字段
+
+    Args:
+        data: Rexxar API /movie/{id} 返回的字典
+
+    Returns:
+        Movie 字段名 -> 值（rating、genres、duration、directors）
+    """
+    rating = data.get('rating') or {}
+    value = rating.get('value')
+    durations = data.get('durations') or []
+    return {
+        # 评分人数不足时 value 为 0，视为暂无评分
+        'rating': float(value) if value else None,
+        'genres': ' / '.join(data.get('genres') or []),
+        'duration': durations[0] if durations else '',
+        'directors': ' / '.join(director.get('name', '') for director in data.get('directors') or []
+                                if director.get('name')),
+    }
+
+
+class MetadataCache:
+    """电影元数据持久化缓存类"""
+
+    def __init__(self, filepath: str = None, ttl: float = None):
+        """
+        初始化元数据缓存
+
+        Args:
+            filepath: 缓存数据库路径，默认使用配置文件中的路径
+            ttl: 缓存有效期（秒），默认使用配置文件中的值
+        """
+        self.filepath = filepath or config.METADATA_CACHE_FILE
+        self.ttl = config.METADATA_CACHE_TTL if ttl is None else ttl
+        ensure_dir(os.path.dirname(self.filepath) or '.')
+        self._conn = sqlite3.connect(self.filepath)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subjects ("
+            "movie_id TEXT PRIMARY KEY, data TEXT NOT NULL, fetched REAL NOT NULL)"
+        )
+
+    def get_many(self, movie_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        批量查询未过期的元数据
+
+        Args:
+            movie_ids: 电影ID序列
+
+        Returns:
+            命中的 电影ID -> 元数据
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        oldest = time.time() - self.ttl
+        found = {}
+        for i in range(0, len(movie_ids), _QUERY_CHUNK):
+            chunk = movie_ids[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT movie_id, data FROM subjects WHERE movie_id IN ({placeholders}) AND fetched >= ?",
+                chunk + [oldest])
+            for movie_id, data in rows:
+                found[movie_id] = json.loads(data)
+        return found
+
+    def put_many(self, items: Dict[str, Dict]):
+        """
+        批量写入元数据
+
+        Args:
+            items: 电影ID -> 元数据
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subjects (movie_id, data, fetched) VALUES (?, ?, ?)",
+                [(movie_id, json.dumps(metadata, ensure_ascii=False), now)
+                 for movie_id, metadata in items.items()])
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
+
+
+@profiled(items=lambda result, spider, movies, *args, **kwargs: len(movies))
+def enrich_movies(spider, movies: List[Movie], cache: MetadataCache = None,
+                  workers: int = None) -> int:
+    """
+    为电影补充评分、类型、片长和导演（原地修改）
+
+    Args:
+        spider: DoubanMovieSpider 对象（使用其 fetch_movie_subject 和身份池）
+        movies: 电影列表
+        cache: 元数据缓存，默认打开配置文件中的缓存
+        workers: 并发请求数，默认使用配置文件中的值；0 表示移动端身份数量
+
+    Returns:
+        本次通过 API 请求的电影数量
+    """
+    own_cache = cache is None
+    cache = cache or MetadataCache()
+    if workers is None:
+        workers = config.METADATA_WORKERS
+    if not workers:
+        workers = len(spider.mobile_pool.identities)
+
+    try:
+        movie_ids = [movie.movie_id for movie in movies if movie.movie_id]
+        metadata = cache.get_many(movie_ids)
+        missing = [movie_id for movie_id in dict.fromkeys(movie_ids) if movie_id not in metadata]
+        logging.info("电影元数据: 缓存命中 %d 部，需要请求 %d 部", len(metadata), len(missing))
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                results = list(executor.map(spider.fetch_movie_subject, missing))
+            fetched = {movie_id: parse_subject(data)
+                       for movie_id, data in zip(missing, results) if data}
+            cache.put_many(fetched)
+            metadata.update(fetched)
+            if len(fetched) < len(missing):
+                logging.warning("%d 部电影的元数据获取失败", len(missing) - len(fetched))
+
+        for movie in movies:
+            values: Optional[Dict] = metadata.get(movie.movie_id)
+            if values:
+                for field, value in values.items():
+                    setattr(movie, field, value)
+        return len(missing)
+    finally:
+        if own_cache:
+            cache.close()
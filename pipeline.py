@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+"""
+流水线模块
+将主程序的步骤描述为阶段依赖图，按内容哈希判断阶段是否需要重新执行（类似 make）
+
+- 阶段输入指纹 = 相关配置值 + 上游阶段输出指纹 + 输入文件内容 + 实现代码 + 额外输入（停用词、词典版本）
+- 阶段执行后记录输入指纹和输出文件的内容哈希；再次运行时输入指纹相同、
+  输出文件未被修改（且未超过有效期）则跳过该阶段
+- 数据快照的指纹只覆盖爬取字段，分析阶段写回的情感得分不会使数据快照失效
+- 只运行部分阶段时，未运行的上游阶段直接使用已保存的输出
+
+阶段:
+    crawl    爬取电影列表和评论，保存 CSV/JSON（唯一访问网络的阶段）
+    chart    排序并生成 Top N 图表（和批量图表）
+    analyze  评论去重、情感分析、分词、词频统计和词云
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import config
+from utils import ensure_dir
+from models import Movie
+from profiling import section
+
+# 流水线状态格式版本，格式变化后旧状态全部失效
+STATE_VERSION = 1
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_digest(filepath: str) -> Optional[str]:
+    """
+    计算文件内容哈希
+
+    Args:
+        filepath: 文件路径
+
+    Returns:
+        十六进制摘要，文件不存在时返回None
+    """
+    if not filepath or not os.path.isfile(filepath):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_values(names: Iterable[str]) -> Dict[str, str]:
+    """
+    获取相关配置值
+
+    Args:
+        names: 配置名或配置名前缀（以 '_' 结尾，如 'CHART_'）
+
+    Returns:
+        配置名 -> 配置值表示 的字典
+    """
+    values = {}
+    for name in names:
+        if name.endswith('_'):
+            matched = [key for key in dir(config) if key.startswith(name)]
+        else:
+            matched = [name]
+        for key in matched:
+            values[key] = repr(getattr(config, key, None))
+    return values
+
+
+def dataset_fingerprint(movies: Sequence[Movie]) -> str:
+    """
+    数据快照指纹（只覆盖爬取字段，不含分析阶段写回的派生字段）
+
+    Args:
+        movies: 电影列表
+
+    Returns:
+        十六进制摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for movie in movies:
+        record = movie.to_dict()
+        for field in Movie.DERIVED_FIELDS:
+            record.pop(field, None)
+        digest.update(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def _digest_values(values) -> str:
+    """可序列化对象的摘要"""
+    text = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Stage:
+    """流水线阶段"""
+
+    __slots__ = ('name', 'run', 'deps', 'config_keys', 'input_files', 'code',
+                 'extra_inputs', 'output_fingerprint', 'max_age')
+
+    def __init__(self, name: str, run: Callable[['PipelineContext'], Optional[List[str]]],
+                 deps: Sequence[str] = (), config_keys: Sequence[str] = (),
+                 input_files: Callable[[], List[str]] = None, code: Sequence[str] = (),
+                 extra_inputs: Callable[['PipelineContext'], Dict] = None,
+                 output_fingerprint: Callable[['PipelineContext'], Optional[str]] = None,
+                 max_age: float = 0):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称
+            run: 执行函数，返回输出文件路径列表；返回None表示没有结果，后续阶段不再执行
+            deps: 上游阶段名称
+            config_keys: 相关配置名或配置名前缀
+            input_files: 返回输入文件路径列表的函数（在检查时求值）
+            code: 实现该阶段的模块文件，代码变化后重新执行
+            extra_inputs: 返回其他输入值（如停用词）的函数
+            output_fingerprint: 计算当前输出指纹的函数，默认按记录的输出文件内容计算
+            max_age: 输出的有效期（秒），0 表示不过期
+        """
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.config_keys = tuple(config_keys)
+        self.input_files = input_files
+        self.code = tuple(code)
+        self.extra_inputs = extra_inputs
+        self.output_fingerprint = output_fingerprint
+        self.max_age = max_age
+
+
+class PipelineContext:
+    """阶段间共享的运行上下文: 电影数据在首次使用时从已保存的 JSON 加载"""
+
+    def __init__(self):
+        """初始化上下文"""
+        from data_processor import DataProcessor
+
+        self.processor = DataProcessor()
+        self._movies: Optional[List[Movie]] = None
+        self._fingerprint: Optional[str] = None
+        # 各阶段之间共享的对象（如词云生成器、后台预热线程）
+        self.shared: Dict = {}
+
+    @property
+    def movies(self) -> List[Movie]:
+        """电影数据（未爬取时从已保存的 JSON 加载）"""
+        if self._movies is None:
+            if os.path.exists(config.MOVIES_JSON_FILE):
+                self._movies = self.processor.load_from_json()
+            else:
+                self._movies = []
+        return self._movies
+
+    @movies.setter
+    def movies(self, movies: List[Movie]):
+        self._movies = movies
+        self._fingerprint = None
+
+    def dataset_fingerprint(self) -> Optional[str]:
+        """当前数据快照指纹，没有数据时返回None"""
+        if self._fingerprint is None and self.movies:
+            self._fingerprint = dataset_fingerprint(self.movies)
+        return self._fingerprint
+
+
+class Pipeline:
+    """按依赖顺序执行阶段，跳过输入未变化的阶段"""
+
+    def __init__(self, stages: Sequence[Stage], state_file: str = None):
+        """
+        初始化流水线
+
+        Args:
+            stages: 阶段列表（按依赖顺序排列）
+            state_file: 状态文件路径，默认使用配置文件中的路径
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"阶段 {stage.name} 依赖未知阶段 {dep}")
+        self.state_file = state_file or config.PIPELINE_STATE_FILE
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        """加载流水线状态"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get('version') != STATE_VERSION:
+            return {}
+        return state.get('stages', {})
+
+    def _save_state(self):
+        """保存流水线状态（先写临时文件再替换，中断时不会留下损坏的状态）"""
+        ensure_dir(os.path.dirname(self.state_file) or '.')
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'stages': self.state}, f,
+                      ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def output_fingerprint(self, stage: Stage, ctx: PipelineContext) -> Optional[str]:
+        """
+        阶段当前的输出指纹
+
+        Args:
+            stage: 阶段
+            ctx: 运行上下文
+
+        Returns:
+            十六进制摘要，阶段从未执行或输出缺失时返回None
+        """
+        if stage.output_fingerprint is not None:
+            return stage.output_fingerprint(ctx)
+        record = self.state.get(stage.name)
+        if record is None:
+            return None
+        digests = {path: file_digest(path) for path in record['outputs']}
+        if None in digests.values():
+            return None
+        return _digest_values(digests)
+
+    def input_fingerprint(self, stage: Stage, ctx: PipelineContext) -> str:
+        """
+        阶段的输入指纹
+
+        Args:
+            stage: 阶段
+            ctx: 运行上下文
+
+        Returns:
+            十六进制摘要
+        """
+        inputs = {
+            'config': config_values(stage.config_keys),
+            'deps': {dep: self.output_fingerprint(self.stages[dep], ctx) for dep in stage.deps},
+            'files': {path: file_digest(path)
+                      for path in (stage.input_files() if stage.input_files else [])},
+            'code': {name: file_digest(os.path.join(os.path.dirname(__file__), name))
+                     for name in stage.code},
+            'extra': stage.extra_inputs(ctx) if stage.extra_inputs else {},
+        }
+        return _digest_values(inputs)
+
+    def is_fresh(self, stage: Stage, ctx: PipelineContext, fingerprint: str) -> bool:
+        """
+        阶段输出是否仍然有效
+
+        Args:
+            stage: 阶段
+            ctx: 运行上下文
+            fingerprint: 当前输入指纹
+
+        Returns:
+            输入未变化、输出未被修改且未过期时返回True
+        """
+        record = self.state.get(stage.name)
+        if record is None or record['inputs'] != fingerprint:
+            return False
+        if stage.max_age and time.time() - record['time'] > stage.max_age:
+            return False
+        return record['output'] is not None and self.output_fingerprint(stage, ctx) == record['output']
+
+    def run(self, names: Sequence[str] = None, force: bool = False,
+            dry_run: bool = False, ctx: PipelineContext = None) -> Dict[str, str]:
+        """
+        执行阶段
+
+        Args:
+            names: 要执行的阶段名称，默认全部；未选中的上游阶段不执行，直接使用已保存的输出
+            force: 忽略状态，强制执行选中的阶段
+            dry_run: 只检查哪些阶段需要执行，不实际执行
+            ctx: 运行上下文，默认新建
+
+        Returns:
+            阶段名称 -> 结果（'run' 已执行、'skipped' 已跳过、'stale' 需要执行（dry_run）、
+            'failed' 没有结果）
+        """
+        if names:
+            unknown = [name for name in names if name not in self.stages]
+            if unknown:
+                raise ValueError(f"未知阶段: {', '.join(unknown)}，可选: {', '.join(self.stages)}")
+        selected = [name for name in self.stages if not names or name in names]
+        ctx = ctx or PipelineContext()
+        results = {}
+
+        for name in selected:
+            stage = self.stages[name]
+            fingerprint = self.input_fingerprint(stage, ctx)
+            if not force and self.is_fresh(stage, ctx, fingerprint):
+                logging.info("[%s] 输入未变化，跳过", name)
+                results[name] = 'skipped'
+                continue
+            if dry_run:
+                logging.info("[%s] 需要执行", name)
+                results[name] = 'stale'
+                continue
+
+            logging.info("\n[%s] 开始执行...", name)
+            start = time.perf_counter()
+            with section(f"[{name}]", stage=True):
+                outputs = stage.run(ctx)
+            if outputs is None:
+                logging.error("[%s] 没有产生结果，停止执行后续阶段", name)
+                results[name] = 'failed'
+                break
+
+            record = {'inputs': fingerprint, 'outputs': sorted(set(outputs)),
+                      'time': time.time(), 'output': None}
+            self.state[name] = record
+            record['output'] = self.output_fingerprint(stage, ctx)
+            self._save_state()
+            results[name] = 'run'
+            logging.info("[%s] 完成，耗时 %.2f 秒", name, time.perf_counter() - start)
+
+        return results
+
+
+# ----------------------------------------------------------------
+# 默认阶段
+# ----------------------------------------------------------------
+
+def _crawl(ctx: PipelineContext) -> Optional[List[str]]:
+    """爬取电影列表和评论并保存"""
+    from spider import DoubanMovieSpider
+
+    spider = DoubanMovieSpider()
+    try:
+        movies = spider.crawl_movies()
+        if not movies:
+            logging.error("未爬取到任何电影数据")
+            return None
+        logging.info("成功爬取 %d 部电影的基本信息", len(movies))
+
+        if config.METADATA_ENABLED:
+            from movie_metadata import enrich_movies
+            enrich_movies(spider, movies)
+
+        movies = spider.crawl_all_comments(movies)
+    finally:
+        spider.close()
+    total_comments = sum(len(movie.comments) for movie in movies)
+    logging.info("共爬取 %d 条评论", total_comments)
+
+    ctx.processor.save_to_csv(movies)
+    ctx.processor.save_to_json(movies)
+    if config.ARCHIVE_ENABLED:
+        ctx.processor.save_to_archive(movies)
+    ctx.movies = movies
+    return [config.MOVIES_CSV_FILE, config.MOVIES_JSON_FILE]
+
+
+def _chart(ctx: PipelineContext) -> Optional[List[str]]:
+    """排序并生成图表"""
+    from visualizer import Visualizer
+
+    if not ctx.movies:
+        logging.error("没有电影数据，请先执行 crawl 阶段")
+        return None
+    sorted_movies = ctx.processor.sort_by_wish_count(ctx.movies)
+    top_movies = ctx.processor.get_top_movies(sorted_movies)
+
+    # 显示Top 5电影信息
+    logging.info("\n想看人数Top 5电影:")
+    for i, movie in enumerate(top_movies, 1):
+        logging.info("  %d. %s: %s 人想看", i, movie.movie_name, movie.wish_count)
+
+    visualizer = Visualizer()
+    outputs = [visualizer.plot_top_movies(sorted_movies)]
+    if config.CHART_BATCH_ENABLED:
+        outputs.extend(visualizer.plot_dashboard(ctx.movies))
+    return [path for path in outputs if path]
+
+
+def _analysis_generator(ctx: PipelineContext):
+    """分析阶段共享的词云生成器"""
+    if 'wordcloud_gen' not in ctx.shared:
+        from wordcloud_generator import WordCloudGenerator
+        ctx.shared['wordcloud_gen'] = WordCloudGenerator()
+    return ctx.shared['wordcloud_gen']
+
+
+def _analysis_inputs(ctx: PipelineContext) -> Dict:
+    """分析阶段的额外输入: 停用词和 jieba 词典版本"""
+    from segment_cache import dictionary_version
+
+    wordcloud_gen = _analysis_generator(ctx)
+    prewarm_thread = ctx.shared.pop('prewarm_thread', None)
+    if prewarm_thread is not None:
+        prewarm_thread.join()
+    return {
+        'stopwords': sorted(wordcloud_gen.stopwords),
+        'phrase_stopwords': sorted(wordcloud_gen.phrase_stopwords),
+        'dictionary': dictionary_version(),
+    }
+
+
+def _analyze(ctx: PipelineContext) -> Optional[List[str]]:
+    """评论分析和词云生成"""
+    if not ctx.movies:
+        logging.error("没有电影数据，请先执行 crawl 阶段")
+        return None
+
+    wordcloud_gen = _analysis_generator(ctx)
+    try:
+        wordcloud_gen.process_comments(ctx.movies)
+    finally:
+        wordcloud_gen.close()
+
+    # 情感得分写回数据文件（派生字段，不改变数据快照指纹）
+    if config.SENTIMENT_ENABLED:
+        ctx.processor.save_to_csv(ctx.movies)
+        ctx.processor.save_to_json(ctx.movies)
+
+    outputs = [config.WORDCLOUD_IMAGE_FILE, config.WORD_STATISTICS_FILE]
+    if config.WORD_FREQ_SNAPSHOTS_ENABLED:
+        outputs.append(config.MOVIE_KEYWORDS_FILE)
+    if config.COOCCURRENCE_ENABLED:
+        outputs.extend([config.COOCCURRENCE_FILE, config.COOCCURRENCE_MATRIX_FILE])
+    return [path for path in outputs if os.path.exists(path)]
+
+
+def build_pipeline(state_file: str = None) -> Pipeline:
+    """
+    构建默认流水线: crawl -> chart, crawl -> analyze
+
+    Args:
+        state_file: 状态文件路径，默认使用配置文件中的路径
+
+    Returns:
+        流水线
+    """
+    from utils import resolve_font_path
+
+    def font_files():
+        return [resolve_font_path() or '']
+
+    stages = [
+        Stage('crawl', _crawl,
+              config_keys=('CITY', 'DOUBAN_MOVIE_', 'COMMENTS_', 'COMMENT_BUDGET_', 'METADATA_'),
+              output_fingerprint=PipelineContext.dataset_fingerprint,
+              max_age=config.PIPELINE_CRAWL_MAX_AGE),
+        Stage('chart', _chart, deps=('crawl',),
+              config_keys=('TOP_N_MOVIES', 'CHART_'),
+              input_files=font_files,
+              code=('visualizer.py', 'analytics.py')),
+        Stage('analyze', _analyze, deps=('crawl',),
+              config_keys=('WORDCLOUD_', 'TOP_WORDS_COUNT', 'KEYWORDS_', 'WORD_COUNT_MODE',
+                           'HEAVY_HITTER_', 'WORD_FREQ_', 'DEDUP_', 'SENTIMENT_',
+                           'INVERTED_INDEX_', 'COOCCURRENCE_'),
+              input_files=lambda: font_files() + [config.SENTIMENT_LEXICON_FILE],
+              code=('wordcloud_generator.py', 'dedup.py', 'sentiment.py', 'cooccurrence.py',
+                    'keyword_extractor.py', 'word_freq_store.py', 'vocabulary.py', 'heavy_hitters.py'),
+              extra_inputs=_analysis_inputs),
+    ]
+    return Pipeline(stages, state_file)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+性能剖析模块
+为流水线阶段和热点方法记录墙钟时间、CPU 时间、峰值内存和处理数量，运行结束后输出汇总表
+
+- section() 上下文管理器和 profiled() 装饰器记录到全局 profiler；只有启用剖析（main.py --profile）后
+  才记录，默认运行时直接执行被包装的代码，没有额外开销
+- 启用后记录墙钟时间和处理数量，并且:
+    - 使用 tracemalloc 记录每段代码的峰值内存（嵌套时各自独立计算）
+    - 每个阶段（stage=True 的 section）单独运行 cProfile，统计结果保存为 <剖析目录>/<阶段>.prof，
+      可用 snakeviz、gprof2dot、flameprof 等工具生成火焰图
+- CPU 时间和峰值内存是整个进程的数值: 主线程中的 section 包含同一时间其他线程（如元数据请求线程池）
+  的 CPU 和内存分配，不含子进程（如分词进程池）。tracemalloc 的峰值计数为全进程共享，
+  因此只在主线程中记录峰值内存；其他线程中的 section 只记录该线程自身的 CPU 时间，峰值内存显示为 "-"
+"""
+
+import os
+import time
+import cProfile
+import logging
+import functools
+import threading
+import tracemalloc
+import unicodedata
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from utils import ensure_dir
+
+
+# 汇总表各列: (标题, 显示宽度)，第一列左对齐，其余右对齐
+SUMMARY_COLUMNS = (('名称', 44), ('调用', 7), ('墙钟(s)', 11), ('CPU(s)', 10),
+                   ('峰值内存(MB)', 14), ('数量', 10), ('数量/秒', 11))
+
+
+def display_width(text: str) -> int:
+    """终端显示宽度: 全角和宽字符（如中文）占两列"""
+    return sum(2 if unicodedata.east_asian_width(char) in ('F', 'W') else 1 for char in text)
+
+
+def _format_row(cells: List[str]) -> str:
+    """按显示宽度对齐汇总表的一行"""
+    parts = []
+    for i, (cell, (_, width)) in enumerate(zip(cells, SUMMARY_COLUMNS)):
+        padding = ' ' * max(width - display_width(cell), 0)
+        parts.append(cell + padding if i == 0 else padding + cell)
+    return ''.join(parts)
+
+
+class SectionStats:
+    """一段代码的累计统计"""
+
+    __slots__ = ('name', 'calls', 'wall', 'cpu', 'peak', 'items')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        # 单次调用的最大峰值内存（字节），未跟踪内存时为None
+        self.peak: Optional[int] = None
+        self.items = 0
+
+
+class _Frame:
+    """正在执行的 section"""
+
+    __slots__ = ('name', 'items', 'start_memory', 'peak')
+
+    def __init__(self, name: str, start_memory: int):
+        self.name = name
+        self.items: Optional[int] = None
+        self.start_memory = start_memory
+        # 已结束的子 section 中观察到的最大绝对峰值
+        self.peak = start_memory
+
+
+class Profiler:
+    """全局剖析记录器"""
+
+    def __init__(self):
+        """初始化记录器"""
+        self.stats: Dict[str, SectionStats] = {}
+        self.enabled = False
+        self.trace_memory = False
+        self.profile_dir: Optional[str] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self, trace_memory: bool = True, profile_dir: str = None):
+        """
+        启用详细剖析
+
+        Args:
+            trace_memory: 是否用 tracemalloc 记录峰值内存
+            profile_dir: cProfile 统计输出目录，None 表示不运行 cProfile
+        """
+        self.enabled = True
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if profile_dir:
+            ensure_dir(profile_dir)
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.stats.clear()
+
+    def _stack(self) -> List[_Frame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def section(self, name: str, stage: bool = False):
+        """
+        记录一段代码
+
+        Args:
+            name: 名称
+            stage: 是否为流水线阶段（启用剖析时单独运行 cProfile）
+
+        Yields:
+            当前帧，可设置 items 属性记录处理数量
+        """
+        if not self.enabled:
+            yield _Frame(name, 0)
+            return
+
+        # tracemalloc 的峰值为全进程共享，只由主线程重置和读取；其他线程只计本线程的 CPU 时间
+        main_thread = threading.current_thread() is threading.main_thread()
+        tracing = main_thread and self.trace_memory and tracemalloc.is_tracing()
+        cpu_clock = time.process_time if main_thread else time.thread_time
+        stack = self._stack()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        frame = _Frame(name, tracemalloc.get_traced_memory()[0] if tracing else 0)
+        stack.append(frame)
+        with self._lock:
+            # 进入时登记，汇总表中外层在前
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = SectionStats(name)
+
+        profile = None
+        if stage and self.profile_dir:
+            profile = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = cpu_clock()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield frame
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = cpu_clock() - cpu_start
+            stack.pop()
+
+            peak = None
+            if tracing:
+                absolute_peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                peak = absolute_peak - frame.start_memory
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, absolute_peak)
+
+            with self._lock:
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.items += frame.items or 0
+                if peak is not None:
+                    stats.peak = peak if stats.peak is None else max(stats.peak, peak)
+
+            if profile is not None:
+                filepath = os.path.join(self.profile_dir, f"{name.strip('[]')}.prof")
+                profile.dump_stats(filepath)
+                logging.info("cProfile 统计已保存到: %s", filepath)
+
+    def summary(self) -> str:
+        """
+        汇总表
+
+        Returns:
+            多行文本，按首次进入的顺序排列；各列按终端显示宽度对齐（中文占两列）
+        """
+        lines = [_format_row([title for title, _ in SUMMARY_COLUMNS]),
+                 '-' * sum(width for _, width in SUMMARY_COLUMNS)]
+        for stats in list(self.stats.values()):
+            peak = f"{stats.peak / 1024 / 1024:.1f}" if stats.peak is not None else '-'
+            rate = f"{stats.items / stats.wall:.0f}" if stats.items and stats.wall > 0 else '-'
+            items = str(stats.items) if stats.items else '-'
+            lines.append(_format_row([stats.name, str(stats.calls), f"{stats.wall:.3f}", f"{stats.cpu:.3f}",
+                                      peak, items, rate]))
+        return '\n'.join(lines)
+
+
+# 全局记录器
+profiler = Profiler()
+
+
+def section(name: str, stage: bool = False):
+    """记录一段代码（使用全局记录器），见 Profiler.section"""
+    return profiler.section(name, stage)
+
+
+def profiled(name: str = None, items: Callable[..., int] = None):
+    """
+    记录函数调用的装饰器
+
+    Args:
+        name: 名称，默认为 类名.方法名
+        items: 计算处理数量的函数，参数为 (返回值, *调用参数, **调用关键字参数)
+
+    Returns:
+        装饰器
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.section(label) as frame:
+                result = func(*args, **kwargs)
+                if items is not None:
+                    try:
+                        frame.items = items(result, *args, **kwargs)
+                    except Exception:
+                        frame.items = None
+                return result
+        return wrapper
+    return decorator
+
+
+def count_result(result, *args, **kwargs) -> int:
+    """处理数量 = 返回值的长度"""
+    return len(result) if result is not None else 0
+
+
+def count_first_arg(result, self, values, *args, **kwargs) -> int:
+    """处理数量 = 第一个参数的长度"""
+    return len(values)
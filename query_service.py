@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+本地只读查询服务
+加载一次最新数据，以 JSON 提供 Top N 电影、单部电影评论和词频，响应缓存在内存中
+
+接口（GET）:
+    /health                                  数据版本和加载时间
+    /movies/top?n=10&city=wuhan              想看人数 Top N 电影（不含评论）
+    /movies/<电影ID>/comments?offset=0&limit=20
+    /words?n=50&city=wuhan&movie_id=<电影ID>   词频 Top N（来自最近一次的词频快照）
+
+- 后台线程定期检查 movies.json 和词频快照索引，变化后在请求路径之外构建新数据集，
+  再整体替换引用；读取失败（如文件正在写入）时保留旧数据集，下次再试
+- 响应按 (路径, 规范化后的参数) 缓存在数据集中，数据集替换后缓存随之失效
+- 每个响应带 ETag（响应内容摘要），客户端带 If-None-Match 请求未变化的内容时返回 304
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import config
+from utils import REQUEST_LOGGER
+from models import Movie, movies_from_dicts
+
+request_logger = logging.getLogger(REQUEST_LOGGER)
+
+# (状态码, ETag, 响应内容)
+Response = Tuple[int, str, bytes]
+
+
+class QueryError(Exception):
+    """请求错误（参数无效、资源不存在）"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int,
+               minimum: int = 0, maximum: int = None) -> int:
+    """读取整数参数并限制范围"""
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise QueryError(400, f"参数 {name} 应为整数: {values[0]}")
+    value = max(value, minimum)
+    return min(value, maximum) if maximum is not None else value
+
+
+def _str_param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    """读取字符串参数"""
+    values = params.get(name)
+    return values[0] if values else None
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _movie_summary(movie: Movie) -> Dict:
+    """电影信息（不含评论）"""
+    summary = movie.to_dict()
+    del summary['comments']
+    summary['movie_id'] = movie.movie_id
+    summary['comment_count'] = len(movie.comments)
+    return summary
+
+
+class Dataset:
+    """某一版本的只读数据集及其响应缓存"""
+
+    def __init__(self, version: str, movies: List[Movie], run_id: Optional[str]):
+        """
+        初始化数据集
+
+        Args:
+            version: 数据版本（源文件的修改时间和大小）
+            movies: 电影列表
+            run_id: 词频快照的运行ID，没有快照时为None
+        """
+        self.version = version
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.movies = sorted(movies, key=lambda movie: movie.wish_count, reverse=True)
+        self.by_id: Dict[str, Movie] = {movie.movie_id: movie for movie in self.movies if movie.movie_id}
+        self.run_id = run_id
+        self._store = None
+        self._cache: 'OrderedDict[Tuple, Tuple[str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, route: str, params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+        """
+        获取响应（ETag, 内容），命中缓存时直接返回
+
+        Args:
+            route: 请求路径
+            params: 查询参数
+
+        Returns:
+            (ETag, 响应内容)
+        """
+        handler, key = self._resolve(route, params)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        body = _encode(handler(*key[1:]))
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        with self._lock:
+            self._cache[key] = (etag, body)
+            if len(self._cache) > config.SERVICE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return etag, body
+
+    def _resolve(self, route: str, params: Dict[str, List[str]]):
+        """解析路径和参数，返回 (处理函数, 缓存键)"""
+        parts = [part for part in route.split('/') if part]
+        if parts == ['health']:
+            return self._health, ('health',)
+        if parts == ['movies', 'top']:
+            n = _int_param(params, 'n', config.TOP_N_MOVIES, 1, config.SERVICE_MAX_ITEMS)
+            return self._top_movies, ('top', n, _str_param(params, 'city'))
+        if len(parts) == 3 and parts[0] == 'movies' and parts[2] == 'comments':
+            offset = _int_param(params, 'offset', 0)
+            limit = _int_param(params, 'limit', 20, 1, config.SERVICE_MAX_ITEMS)
+            return self._comments, ('comments', parts[1], offset, limit)
+        if parts == ['words']:
+            n = _int_param(params, 'n', config.TOP_WORDS_COUNT, 1, config.SERVICE_MAX_ITEMS)
+            return self._words, ('words', n, _str_param(params, 'city'), _str_param(params, 'movie_id'))
+        raise QueryError(404, f"未知接口: {route}")
+
+    def _health(self) -> Dict:
+        return {'version': self.version, 'loaded_at': self.loaded_at,
+                'movies': len(self.movies), 'word_freq_run': self.run_id}
+
+    def _top_movies(self, n: int, city: Optional[str]) -> Dict:
+        movies = [movie for movie in self.movies if city is None or movie.city == city]
+        return {'version': self.version, 'movies': [_movie_summary(movie) for movie in movies[:n]]}
+
+    def _comments(self, movie_id: str, offset: int, limit: int) -> Dict:
+        movie = self.by_id.get(movie_id)
+        if movie is None:
+            raise QueryError(404, f"未找到电影: {movie_id}")
+        return {'version': self.version, 'movie_id': movie_id, 'movie_name': movie.movie_name,
+                'total': len(movie.comments),
+                'comments': [comment.to_dict() for comment in movie.comments[offset:offset + limit]]}
+
+    def _words(self, n: int, city: Optional[str], movie_id: Optional[str]) -> Dict:
+        if self.run_id is None:
+            raise QueryError(404, "没有词频快照，请先执行 analyze 阶段")
+        if self._store is None:
+            from word_freq_store import FrequencyStore
+            self._store = FrequencyStore()
+        snapshot = self._store.merged(self.run_id, city=city,
+                                      movie_ids=[movie_id] if movie_id else None)
+        return {'version': self.version, 'run_id': self.run_id, 'total': snapshot.total,
+                'words': [[word, count] for word, count in snapshot.most_common(n)]}
+
+
+class QueryService:
+    """查询服务: 持有当前数据集，并在源文件变化时重新加载"""
+
+    def __init__(self, movies_file: str = None):
+        """
+        初始化查询服务
+
+        Args:
+            movies_file: 电影数据 JSON 文件，默认使用配置文件中的路径
+        """
+        self.movies_file = movies_file or config.MOVIES_JSON_FILE
+        self.dataset: Optional[Dataset] = None
+        self._stop = threading.Event()
+
+    def _source_version(self) -> Tuple[str, Optional[str]]:
+        """源文件版本（movies.json 的修改时间和大小 + 最近一次词频快照）"""
+        run_id = None
+        if config.WORD_FREQ_SNAPSHOTS_ENABLED:
+            from word_freq_store import FrequencyStore
+            run_ids = FrequencyStore().run_ids()
+            run_id = run_ids[-1] if run_ids else None
+        try:
+            stat = os.stat(self.movies_file)
+            version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        except OSError:
+            version = 'missing'
+        if run_id:
+            version += f"-{run_id}"
+        return version, run_id
+
+    def reload(self) -> bool:
+        """
+        源文件变化时加载新数据集并整体替换
+
+        Returns:
+            是否替换了数据集
+        """
+        version, run_id = self._source_version()
+        if self.dataset is not None and self.dataset.version == version:
+            return False
+        try:
+            movies = []
+            if os.path.exists(self.movies_file):
+                with open(self.movies_file, 'r', encoding='utf-8') as f:
+                    movies = movies_from_dicts(json.load(f))
+        except (OSError, ValueError) as e:
+            logging.warning("加载数据失败，继续使用旧数据: %s", e)
+            return False
+        self.dataset = Dataset(version, movies, run_id)
+        logging.info("查询服务已加载数据版本 %s: %s 部电影", version, len(movies))
+        return True
+
+    def respond(self, path: str, if_none_match: str = None) -> Response:
+        """
+        处理一次请求
+
+        Args:
+            path: 请求路径（含查询字符串）
+            if_none_match: 请求头 If-None-Match
+
+        Returns:
+            (状态码, ETag, 响应内容)；处理过程中的意外错误返回 500
+        """
+        url = urlsplit(path)
+        try:
+            etag, body = self.dataset.get(url.path, parse_qs(url.query))
+        except QueryError as e:
+            return e.status, '', _encode({'error': str(e)})
+        except Exception as e:
+            # 快照与词表不匹配、快照文件已被清理等，返回 JSON 错误而不是断开连接
+            logging.exception("处理请求 %s 失败", path)
+            return 500, '', _encode({'error': f"服务器内部错误: {e}"})
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, etag, b''
+        return 200, etag, body
+
+    def _watch(self):
+        """后台检查源文件变化"""
+        while not self._stop.wait(config.SERVICE_RELOAD_INTERVAL):
+            try:
+                self.reload()
+            except Exception as e:
+                logging.warning("检查数据更新失败: %s", e)
+
+    def serve(self, host: str = None, port: int = None):
+        """
+        启动 HTTP 服务（阻塞，Ctrl+C 退出）
+
+        Args:
+            host: 监听地址，默认使用配置文件中的值
+            port: 监听端口，默认使用配置文件中的值
+        """
+        host = host or config.SERVICE_HOST
+        port = config.SERVICE_PORT if port is None else port
+        self.reload()
+        watcher = threading.Thread(target=self._watch, name='dataset-watcher', daemon=True)
+        watcher.start()
+
+        server = ThreadingHTTPServer((host, port), _make_handler(self))
+        server.daemon_threads = True
+        logging.info("查询服务已启动: http://%s:%s/health", host, server.server_address[1])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("查询服务已停止")
+        finally:
+            self._stop.set()
+            server.server_close()
+
+
+def _make_handler(service: QueryService):
+    """创建绑定到查询服务的请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            status, etag, body = service.respond(self.path, self.headers.get('If-None-Match'))
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            if status != 304:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            request_logger.info("%s - " + format, self.address_string(), *args)
+
+    return Handler
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+常驻爬取调度模块
+以守护进程方式持续运行爬虫，热门电影的评论比冷门电影刷新得更频繁
+
+- 电影列表（一次请求即可得到所有电影的想看人数）按固定间隔刷新，记录想看人数历史
+- 每部电影的评论刷新间隔由热度决定:
+      热度 = 想看人数增速 / 增速基准 + 新评论到达速率 / 速率基准
+      间隔 = 最长间隔 / (1 + 热度)，并限制在 [最短间隔, 最长间隔] 之间
+- 待刷新的电影放在按到期时间排序的优先队列（堆）中，每次只爬取最早到期的一部
+- 电影、想看人数历史、评论和调度状态增量写入 SQLite，重启后继续之前的调度；
+  定期把在映电影导出为 movies.csv/movies.json，供 main.py 的 chart/analyze 阶段使用
+- 收到 SIGINT/SIGTERM 后完成当前电影的爬取，导出数据并关闭存储后退出
+"""
+
+import os
+import json
+import time
+import heapq
+import signal
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import config
+from utils import ensure_dir
+from models import Movie, Comment
+from inverted_index import comment_key
+
+
+def refresh_interval(wish_velocity: float, comment_rate: float) -> float:
+    """
+    根据热度计算评论刷新间隔
+
+    Args:
+        wish_velocity: 想看人数增速（人/小时）
+        comment_rate: 新评论到达速率（条/小时）
+
+    Returns:
+        刷新间隔（秒）
+    """
+    hotness = (max(wish_velocity, 0.0) / config.SCHEDULER_WISH_VELOCITY_SCALE
+               + max(comment_rate, 0.0) / config.SCHEDULER_COMMENT_RATE_SCALE)
+    interval = config.SCHEDULER_MAX_INTERVAL / (1.0 + hotness)
+    return min(max(interval, config.SCHEDULER_MIN_INTERVAL), config.SCHEDULER_MAX_INTERVAL)
+
+
+class CrawlStore:
+    """爬取结果的增量存储类（SQLite）"""
+
+    def __init__(self, filepath: str = None):
+        """
+        初始化存储
+
+        Args:
+            filepath: 数据库路径，默认使用配置文件中的路径
+        """
+        if filepath is None:
+            filepath = config.SCHEDULER_DB_FILE
+        self.filepath = filepath
+
+        ensure_dir(os.path.dirname(filepath) or '.')
+        self._conn = sqlite3.connect(filepath)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS movies ("
+            "movie_id TEXT PRIMARY KEY, data TEXT NOT NULL, active INTEGER NOT NULL, "
+            "last_seen REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS wish_history ("
+            "movie_id TEXT NOT NULL, time REAL NOT NULL, wish_count INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_wish_history ON wish_history(movie_id, time);"
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "movie_id TEXT NOT NULL, comment_key TEXT NOT NULL, text TEXT NOT NULL, "
+            "comment_id TEXT, rating INTEGER, create_time TEXT, fetched REAL NOT NULL, "
+            "PRIMARY KEY (movie_id, comment_key));"
+            "CREATE TABLE IF NOT EXISTS schedule ("
+            "movie_id TEXT PRIMARY KEY, next_due REAL NOT NULL, last_crawled REAL, "
+            "comment_rate REAL NOT NULL DEFAULT 0);"
+        )
+
+    def update_movies(self, movies: Sequence[Movie], now: float) -> List[str]:
+        """
+        写入最新的电影列表，记录想看人数，不在列表中的电影标记为下映
+
+        Args:
+            movies: 电影列表（评论不写入）
+            now: 当前时间戳
+
+        Returns:
+            新出现的电影ID列表
+        """
+        known = {movie_id for movie_id, in self._conn.execute("SELECT movie_id FROM movies")}
+        movies = [movie for movie in movies if movie.movie_id]
+        rows = []
+        for movie in movies:
+            data = movie.to_dict()
+            data.pop('comments')
+            rows.append((movie.movie_id, json.dumps(data, ensure_ascii=False), now))
+
+        self._conn.execute("UPDATE movies SET active = 0")
+        self._conn.executemany(
+            "INSERT INTO movies (movie_id, data, active, last_seen) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(movie_id) DO UPDATE SET data = excluded.data, active = 1, "
+            "last_seen = excluded.last_seen", rows)
+        self._conn.executemany(
+            "INSERT INTO wish_history (movie_id, time, wish_count) VALUES (?, ?, ?)",
+            [(movie.movie_id, now, movie.wish_count) for movie in movies])
+        self._conn.commit()
+        return [movie.movie_id for movie in movies if movie.movie_id not in known]
+
+    def active_movie_ids(self) -> List[str]:
+        """在映（最近一次列表中出现）的电影ID，按想看人数降序"""
+        return [movie_id for movie_id, in self._conn.execute(
+            "SELECT movie_id FROM movies WHERE active = 1 "
+            "ORDER BY json_extract(data, '$.wish_count') DESC, movie_id")]
+
+    def movie(self, movie_id: str) -> Optional[Movie]:
+        """
+        读取电影记录（不含评论）
+
+        Args:
+            movie_id: 电影ID
+
+        Returns:
+            Movie对象，不存在时返回None
+        """
+        row = self._conn.execute("SELECT data FROM movies WHERE movie_id = ?", (movie_id,)).fetchone()
+        return Movie.from_dict(json.loads(row[0])) if row else None
+
+    def wish_velocity(self, movie_id: str, window: float) -> float:
+        """
+        想看人数增速
+
+        Args:
+            movie_id: 电影ID
+            window: 统计窗口（秒），使用窗口内最早和最新的记录
+
+        Returns:
+            增速（人/小时），记录不足时为0
+        """
+        latest = self._conn.execute(
+            "SELECT time, wish_count FROM wish_history WHERE movie_id = ? "
+            "ORDER BY time DESC LIMIT 1", (movie_id,)).fetchone()
+        if latest is None:
+            return 0.0
+        earliest = self._conn.execute(
+            "SELECT time, wish_count FROM wish_history WHERE movie_id = ? AND time >= ? "
+            "ORDER BY time LIMIT 1", (movie_id, latest[0] - window)).fetchone()
+        hours = (latest[0] - earliest[0]) / 3600
+        if hours <= 0:
+            return 0.0
+        return (latest[1] - earliest[1]) / hours
+
+    def add_comments(self, movie_id: str, comments: Sequence[Comment], now: float) -> int:
+        """
+        写入评论，已保存的评论忽略
+
+        Args:
+            movie_id: 电影ID
+            comments: 评论列表
+            now: 当前时间戳
+
+        Returns:
+            新评论数量
+        """
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO comments "
+            "(movie_id, comment_key, text, comment_id, rating, create_time, fetched) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(movie_id, comment_key(comment), comment.text, comment.comment_id, comment.rating,
+              comment.create_time, now) for comment in comments])
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def load_schedule(self) -> Dict[str, Tuple[float, Optional[float], float]]:
+        """
+        读取调度状态
+
+        Returns:
+            电影ID -> (下次到期时间, 上次爬取时间, 新评论到达速率)
+        """
+        return {movie_id: (next_due, last_crawled, rate) for movie_id, next_due, last_crawled, rate
+                in self._conn.execute(
+                    "SELECT movie_id, next_due, last_crawled, comment_rate FROM schedule")}
+
+    def save_schedule(self, movie_id: str, next_due: float, last_crawled: Optional[float],
+                      comment_rate: float):
+        """
+        保存一部电影的调度状态
+
+        Args:
+            movie_id: 电影ID
+            next_due: 下次到期时间
+            last_crawled: 上次爬取时间
+            comment_rate: 新评论到达速率（条/小时）
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO schedule (movie_id, next_due, last_crawled, comment_rate) "
+            "VALUES (?, ?, ?, ?)", (movie_id, next_due, last_crawled, comment_rate))
+        self._conn.commit()
+
+    def export_movies(self) -> List[Movie]:
+        """
+        导出在映电影及其全部已保存评论
+
+        Returns:
+            电影列表，按想看人数降序
+        """
+        comments: Dict[str, List[Comment]] = {}
+        for movie_id, text, comment_id, rating, create_time in self._conn.execute(
+                "SELECT c.movie_id, c.text, c.comment_id, c.rating, c.create_time "
+                "FROM comments c JOIN movies m ON m.movie_id = c.movie_id "
+                "WHERE m.active = 1 ORDER BY c.rowid"):
+            comments.setdefault(movie_id, []).append(
+                Comment(text, comment_id or '', rating or 0, create_time or ''))
+
+        movies = []
+        for movie_id, data in self._conn.execute("SELECT movie_id, data FROM movies WHERE active = 1"):
+            movie = Movie.from_dict(json.loads(data))
+            movie.comments = comments.get(movie_id, [])
+            movies.append(movie)
+        movies.sort(key=lambda movie: movie.wish_count, reverse=True)
+        return movies
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
+
+
+class CrawlScheduler:
+    """评论刷新优先队列: 按到期时间排序，到期时间由电影热度决定"""
+
+    def __init__(self):
+        """初始化调度器"""
+        # (到期时间, 序号, 电影ID)；电影重新调度后旧条目失效，出队时跳过
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._counter = 0
+
+    def schedule(self, movie_id: str, due: float):
+        """
+        设置电影的下次到期时间
+
+        Args:
+            movie_id: 电影ID
+            due: 到期时间戳
+        """
+        self._due[movie_id] = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, movie_id))
+
+    def remove(self, movie_id: str):
+        """移出调度（如电影已下映）"""
+        self._due.pop(movie_id, None)
+
+    def _discard_stale(self):
+        """丢弃堆顶的失效条目"""
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        """最早的到期时间，队列为空时返回None"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> Optional[str]:
+        """
+        取出一部已到期的电影
+
+        Args:
+            now: 当前时间戳
+
+        Returns:
+            电影ID，没有到期的电影时返回None
+        """
+        self._discard_stale()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, _, movie_id = heapq.heappop(self._heap)
+        del self._due[movie_id]
+        return movie_id
+
+    def __contains__(self, movie_id: str) -> bool:
+        return movie_id in self._due
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+
+class CrawlDaemon:
+    """常驻爬取守护进程类"""
+
+    def __init__(self, spider=None, store: CrawlStore = None, processor=None):
+        """
+        初始化守护进程
+
+        Args:
+            spider: 爬虫对象，默认新建 DoubanMovieSpider
+            store: 增量存储，默认使用配置文件中的路径
+            processor: 数据处理器，用于导出 CSV/JSON
+        """
+        if spider is None:
+            from spider import DoubanMovieSpider
+            spider = DoubanMovieSpider()
+        if processor is None:
+            from data_processor import DataProcessor
+            processor = DataProcessor()
+        self.spider = spider
+        self.store = store or CrawlStore()
+        self.processor = processor
+        self.scheduler = CrawlScheduler()
+        self._stop = threading.Event()
+        # 电影ID -> (上次爬取时间, 新评论到达速率)
+        self._stats: Dict[str, Tuple[Optional[float], float]] = {}
+        self._dirty = False
+
+    def stop(self):
+        """请求停止（当前电影爬取完成后退出）"""
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        """SIGINT/SIGTERM 触发平滑退出（仅主线程可设置）"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle(signum, frame):
+            logging.info("收到信号 %s，完成当前任务后退出...", signum)
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, handle)
+
+    def _restore(self, now: float):
+        """从存储恢复调度状态"""
+        saved = self.store.load_schedule()
+        for movie_id in self.store.active_movie_ids():
+            next_due, last_crawled, rate = saved.get(movie_id, (now, None, 0.0))
+            self._stats[movie_id] = (last_crawled, rate)
+            self.scheduler.schedule(movie_id, next_due)
+        if len(self.scheduler):
+            logging.info("恢复 %s 部电影的调度状态", len(self.scheduler))
+
+    def refresh_movie_list(self, now: float):
+        """刷新电影列表: 新电影立即调度，下映电影移出调度"""
+        movies = self.spider.crawl_movies()
+        if not movies:
+            logging.warning("电影列表为空，保留现有调度")
+            return
+        if config.METADATA_ENABLED:
+            from movie_metadata import enrich_movies
+            enrich_movies(self.spider, movies)
+        new_ids = self.store.update_movies(movies, now)
+        active_ids = self.store.active_movie_ids()
+        active = set(active_ids)
+        for movie_id in list(self._stats):
+            if movie_id not in active:
+                self.scheduler.remove(movie_id)
+                del self._stats[movie_id]
+        # 同时到期的电影按调度顺序出队，按想看人数降序调度使首轮爬取也先爬热门电影
+        for movie_id in active_ids:
+            if movie_id not in self.scheduler:
+                self._stats.setdefault(movie_id, (None, 0.0))
+                self.scheduler.schedule(movie_id, now)
+        self._dirty = True
+        logging.info("电影列表已刷新: 在映 %s 部，新增 %s 部", len(active), len(new_ids))
+
+    def refresh_comments(self, movie_id: str, now: float):
+        """爬取一部电影的评论，并根据热度重新调度"""
+        movie = self.store.movie(movie_id)
+        if movie is None:
+            return
+        comments = self.spider.fetch_movie_comments(movie)
+        finished = time.time()
+        new_count = self.store.add_comments(movie_id, comments, finished)
+
+        last_crawled, rate = self._stats.get(movie_id, (None, 0.0))
+        if last_crawled is not None and finished > last_crawled:
+            # 新评论到达速率取指数加权平均，平滑单次波动
+            observed = new_count / ((finished - last_crawled) / 3600)
+            alpha = config.SCHEDULER_RATE_SMOOTHING
+            rate = alpha * observed + (1 - alpha) * rate
+        velocity = self.store.wish_velocity(movie_id, config.SCHEDULER_VELOCITY_WINDOW)
+        interval = refresh_interval(velocity, rate)
+
+        self._stats[movie_id] = (finished, rate)
+        self.scheduler.schedule(movie_id, finished + interval)
+        self.store.save_schedule(movie_id, finished + interval, finished, rate)
+        self._dirty = self._dirty or new_count > 0
+        logging.info("电影 %s: 新评论 %s 条，想看增速 %.1f/小时，"
+                     "评论速率 %.1f/小时，%.0f 分钟后再次刷新", movie.movie_name, new_count, velocity, rate, interval / 60)
+
+    def export(self):
+        """导出在映电影到 CSV/JSON"""
+        movies = self.store.export_movies()
+        if movies:
+            self.processor.save_to_csv(movies)
+            self.processor.save_to_json(movies)
+        self._dirty = False
+
+    def run(self, max_cycles: int = None):
+        """
+        运行调度循环，直到收到停止信号
+
+        Args:
+            max_cycles: 最多爬取的电影次数（用于测试），默认不限
+        """
+        self._install_signal_handlers()
+        now = time.time()
+        self._restore(now)
+        next_list_refresh = now
+        last_export = now
+        cycles = 0
+        logging.info("爬取守护进程启动")
+
+        try:
+            while not self._stop.is_set():
+                now = time.time()
+                if now >= next_list_refresh:
+                    self.refresh_movie_list(now)
+                    next_list_refresh = now + config.SCHEDULER_LIST_INTERVAL
+
+                movie_id = self.scheduler.pop_due(now)
+                if movie_id is not None:
+                    self.refresh_comments(movie_id, now)
+                    cycles += 1
+                    if max_cycles is not None and cycles >= max_cycles:
+                        break
+
+                if self._dirty and time.time() - last_export >= config.SCHEDULER_EXPORT_INTERVAL:
+                    self.export()
+                    last_export = time.time()
+
+                # 等待到下一部电影到期或下次列表刷新；两次请求之间至少间隔 REQUEST_DELAY
+                wake = min(next_list_refresh, self.scheduler.next_due() or next_list_refresh)
+                delay = max(wake - time.time(), config.REQUEST_DELAY if movie_id else 0)
+                self._stop.wait(delay)
+        finally:
+            if self._dirty:
+                self.export()
+            self.store.close()
+            self.spider.close()
+            logging.info("爬取守护进程已退出")
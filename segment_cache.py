@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+分词缓存模块
+按评论内容哈希持久化保存分词结果，未变化的评论无需重复分词
+
+缓存保存未过滤停用词的完整词列表（词频统计再过滤停用词，情感分析使用完整词序列）。
+缓存键 = 哈希(命名空间 + 评论文本)，命名空间由 jieba 词典版本决定，
+词典变化后旧条目自然失效，并在容量超限时按最近使用顺序淘汰。
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import config
+from utils import ensure_dir, load_jieba
+
+# 分词结果中词与词之间的分隔符（jieba 分词结果经过 strip，不含该字符）
+TOKEN_SEPARATOR = '\x1f'
+
+# 单条 SQL 中 IN 查询的最大参数数量
+_QUERY_CHUNK = 500
+
+
+def dictionary_version() -> str:
+    """
+    获取当前 jieba 词典版本标识
+
+    包含 jieba 版本、词典路径、词频总数和词条数量，
+    加载自定义词典（load_userdict/add_word）后标识会随之变化。
+
+    Returns:
+        词典版本字符串
+    """
+    jieba = load_jieba()
+    jieba.initialize()
+    dt = jieba.dt
+    return f"{jieba.__version__}:{dt.dictionary}:{dt.total}:{len(dt.FREQ)}"
+
+
+def make_namespace(stopwords: Set[str], dict_version: str) -> bytes:
+    """
+    根据停用词集合和词典版本生成缓存命名空间
+
+    Args:
+        stopwords: 停用词集合
+        dict_version: 词典版本标识
+
+    Returns:
+        命名空间摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(dict_version.encode('utf-8'))
+    for word in sorted(stopwords):
+        digest.update(b'\x00')
+        digest.update(word.encode('utf-8'))
+    return digest.digest()
+
+
+class SegmentCache:
+    """分词结果持久化缓存类"""
+
+    def __init__(self, filepath: str = None, max_entries: int = None):
+        """
+        初始化分词缓存
+
+        Args:
+            filepath: 缓存数据库路径，默认使用配置文件中的路径
+            max_entries: 最大缓存条目数，默认使用配置文件中的值
+        """
+        if filepath is None:
+            filepath = config.SEGMENT_CACHE_FILE
+        if max_entries is None:
+            max_entries = config.SEGMENT_CACHE_MAX_ENTRIES
+
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # 本次运行的时间戳，命中和写入的条目都标记为该时间，用于淘汰
+        self._now = int(time.time())
+
+        ensure_dir(os.path.dirname(filepath) or '.')
+        self._conn = sqlite3.connect(filepath)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "key BLOB PRIMARY KEY, tokens TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON segments(last_used)")
+
+    @staticmethod
+    def make_key(namespace: bytes, text: str) -> bytes:
+        """
+        计算评论的缓存键
+
+        Args:
+            namespace: 命名空间摘要
+            text: 评论文本
+
+        Returns:
+            缓存键
+        """
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16, key=namespace).digest()
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, List[str]]:
+        """
+        批量查询分词结果
+
+        Args:
+            keys: 缓存键序列
+
+        Returns:
+            命中的 缓存键 -> 词列表
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[i:i + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, tokens FROM segments WHERE key IN ({placeholders})", chunk)
+            for key, tokens in rows:
+                found[key] = tokens.split(TOKEN_SEPARATOR) if tokens else []
+
+        if found:
+            self._conn.executemany("UPDATE segments SET last_used = ? WHERE key = ?",
+                                   [(self._now, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[bytes, List[str]]]):
+        """
+        批量写入分词结果
+
+        Args:
+            items: (缓存键, 词列表) 序列
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO segments (key, tokens, last_used) VALUES (?, ?, ?)",
+            [(key, TOKEN_SEPARATOR.join(tokens), self._now) for key, tokens in items]
+        )
+
+    def get(self, key: bytes) -> Optional[List[str]]:
+        """
+        查询单条分词结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            词列表，未命中返回None
+        """
+        return self.get_many([key]).get(key)
+
+    def put(self, key: bytes, tokens: List[str]):
+        """
+        写入单条分词结果
+
+        Args:
+            key: 缓存键
+            tokens: 词列表
+        """
+        self.put_many([(key, tokens)])
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        淘汰最久未使用的条目，使缓存不超过最大条目数
+
+        Returns:
+            淘汰的条目数
+        """
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM segments WHERE key IN ("
+            "SELECT key FROM segments ORDER BY last_used ASC LIMIT ?)", (overflow,))
+        logging.info("分词缓存淘汰 %s 条最久未使用的条目", overflow)
+        return overflow
+
+    def flush(self):
+        """淘汰超限条目并提交到磁盘"""
+        self.evict()
+        self._conn.commit()
+
+    def close(self):
+        """提交并关闭缓存"""
+        self.flush()
+        self._conn.close()
+        logging.info("分词缓存已保存: 命中 %s 条，未命中 %s 条", self.hits, self.misses)
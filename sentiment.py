@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+情感分析模块
+基于本地情感词典为评论打分，并按电影汇总正负面倾向
+
+- 直接使用分词结果的词ID数组（未过滤停用词的完整词序列），不重复分词、不转换回字符串
+- 权重、否定词和程度系数保存为与词表ID对齐的数组，词表增长后只计算新增的词；
+  权重查表、修饰和按评论（np.add.reduceat）、按电影求和均为 NumPy 向量化操作
+- 词典文件每行一个 "词<Tab>权重"（正数为正面，负数为负面），未配置时使用内置词典
+"""
+
+import os
+import logging
+import numpy as np
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import config
+from models import Movie
+from vocabulary import Vocabulary, get_vocabulary
+
+# 否定词: 修饰紧随其后的情感词，权重取反
+NEGATORS = {'不', '没', '没有', '别', '无', '并不', '从不', '毫不', '不太', '不是', '不算'}
+
+# 程度副词: 放大紧随其后的情感词
+DEGREE_WORDS = {
+    '很': 1.5, '非常': 1.8, '特别': 1.8, '十分': 1.8, '太': 1.8, '超': 1.8, '超级': 2.0,
+    '真': 1.3, '真的': 1.3, '挺': 1.2, '比较': 1.1, '有点': 0.8, '有些': 0.8, '稍微': 0.7,
+    '极其': 2.0, '相当': 1.5, '最': 2.0,
+}
+
+# 内置情感词典（词 -> 权重）
+DEFAULT_LEXICON = {
+    # 正面
+    '好看': 1.0, '精彩': 1.0, '不错': 0.8, '喜欢': 0.8, '推荐': 0.8, '强烈推荐': 1.2,
+    '值得': 0.8, '值得一看': 1.0,
+    '感动': 0.8, '震撼': 1.0, '惊艳': 1.0, '优秀': 1.0, '出色': 1.0, '经典': 1.0, '神作': 1.5,
+    '完美': 1.2, '好片': 1.0, '佳作': 1.2, '过瘾': 0.8, '燃': 0.8, '爽': 0.6, '有趣': 0.6,
+    '幽默': 0.6, '温暖': 0.6, '治愈': 0.8, '细腻': 0.6, '用心': 0.6, '真实': 0.4, '期待': 0.6,
+    '满意': 0.8, '良心': 0.8, '惊喜': 0.8, '泪目': 0.6, '好笑': 0.6, '扎实': 0.6, '动人': 0.8,
+    '还行': 0.3, '可以': 0.2, '好': 0.5, '棒': 1.0, '赞': 1.0, '爱': 0.6,
+    # 负面
+    '难看': -1.0, '烂片': -1.5, '垃圾': -1.5, '无聊': -1.0, '失望': -1.0, '尴尬': -0.8,
+    '拖沓': -0.8, '狗血': -0.8, '老套': -0.6, '无语': -0.8, '难受': -0.6, '恶心': -1.2,
+    '糟糕': -1.2, '敷衍': -1.0, '烂': -1.2, '差': -0.8, '浪费': -1.0, '后悔': -1.0,
+    '睡着': -0.8, '困': -0.5, '乏味': -1.0, '混乱': -0.6, '生硬': -0.8, '做作': -0.8,
+    '圈钱': -1.2, '智障': -1.2, '弱智': -1.2, '崩': -0.8, '烂尾': -1.2, '一般': -0.3,
+    '不好看': -1.0, '不推荐': -1.0, '不好': -0.8, '不行': -0.8, '失败': -0.8, '辣眼睛': -1.0,
+}
+
+
+def load_lexicon(filepath: str) -> Dict[str, float]:
+    """
+    从文件加载情感词典
+
+    Args:
+        filepath: 词典文件路径，每行 "词<Tab>权重"
+
+    Returns:
+        词 -> 权重 字典
+    """
+    lexicon = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split('\t')
+            if len(parts) != 2:
+                continue
+            try:
+                lexicon[parts[0]] = float(parts[1])
+            except ValueError:
+                continue
+    logging.info("从文件加载 %s 个情感词", len(lexicon))
+    return lexicon
+
+
+class SentimentScorer:
+    """基于词典的评论情感评分器类"""
+
+    def __init__(self, lexicon: Dict[str, float] = None, vocabulary: Vocabulary = None):
+        """
+        初始化评分器
+
+        Args:
+            lexicon: 词 -> 权重 字典，默认从配置的词典文件加载，文件不存在时使用内置词典
+            vocabulary: 评论词ID所属的词表，默认使用共享词表
+        """
+        if lexicon is None:
+            lexicon_file = config.SENTIMENT_LEXICON_FILE
+            if lexicon_file and os.path.exists(lexicon_file):
+                lexicon = load_lexicon(lexicon_file)
+            else:
+                lexicon = DEFAULT_LEXICON
+        self.lexicon = lexicon
+        self.vocabulary = get_vocabulary() if vocabulary is None else vocabulary
+
+        # 与词表ID对齐的权重、否定词标记和程度系数，词表增长后只计算新增的词
+        self._weights = np.zeros(0, dtype=np.float64)
+        self._negator = np.zeros(0, dtype=bool)
+        self._degree = np.ones(0, dtype=np.float64)
+
+    def _tables(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """获取与当前词表大小一致的 (权重, 否定词标记, 程度系数) 数组"""
+        start = len(self._weights)
+        if start < len(self.vocabulary):
+            new_words = self.vocabulary.decode(range(start, len(self.vocabulary)))
+            count = len(new_words)
+            get = self.lexicon.get
+            self._weights = np.concatenate([
+                self._weights,
+                np.fromiter((get(word, 0.0) for word in new_words), dtype=np.float64, count=count)])
+            self._negator = np.concatenate([
+                self._negator,
+                np.fromiter((word in NEGATORS for word in new_words), dtype=bool, count=count)])
+            self._degree = np.concatenate([
+                self._degree,
+                np.fromiter((DEGREE_WORDS.get(word, 1.0) for word in new_words),
+                            dtype=np.float64, count=count)])
+        return self._weights, self._negator, self._degree
+
+    def score_comments(self, comment_ids: Sequence[array]) -> np.ndarray:
+        """
+        计算每条评论的情感得分
+
+        情感词权重受前一个词修饰（否定词取反、程度副词放大），
+        评论得分 = 修饰后权重之和 / 权重绝对值之和，取值 -1 到 1，不含情感词的评论为0。
+
+        Args:
+            comment_ids: 每条评论未过滤停用词的完整词ID数组
+
+        Returns:
+            与输入一一对应的得分数组
+        """
+        n = len(comment_ids)
+        lengths = np.fromiter((len(ids) for ids in comment_ids), dtype=np.int64, count=n)
+        ids = np.frombuffer(b''.join(comment_ids), dtype=np.uintc)
+        if not len(ids):
+            return np.zeros(n, dtype=np.float64)
+        weights, negator, degree = self._tables()
+
+        # 前一个词的修饰系数，评论的第一个词不受上一条评论影响
+        modifier = np.ones(len(ids), dtype=np.float64)
+        prev = ids[:-1]
+        modifier[1:] = np.where(negator[prev], -1.0, degree[prev])
+        nonempty = lengths > 0
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        modifier[starts] = 1.0
+
+        values = weights[ids] * modifier
+        total = np.zeros(n, dtype=np.float64)
+        magnitude = np.zeros(n, dtype=np.float64)
+        total[nonempty] = np.add.reduceat(values, starts)
+        magnitude[nonempty] = np.add.reduceat(np.abs(values), starts)
+        return np.divide(total, magnitude, out=np.zeros(n), where=magnitude > 0)
+
+    def score_movies(self, movies: List[Movie], comment_ids: Sequence[array]
+                     ) -> List[Tuple[Optional[float], Optional[float]]]:
+        """
+        按电影汇总评论情感
+
+        Args:
+            movies: 电影列表
+            comment_ids: 按电影顺序排列的所有评论词ID数组（与 movies 的评论一一对应）
+
+        Returns:
+            与 movies 一一对应的 (情感得分, 正面比例)，没有情感倾向评论的电影为 (None, None)
+        """
+        scores = self.score_comments(comment_ids)
+        counts = np.fromiter((len(movie.comments) for movie in movies), dtype=np.int64,
+                             count=len(movies))
+        movie_index = np.repeat(np.arange(len(movies)), counts)
+
+        opinionated = scores != 0
+        n_opinionated = np.bincount(movie_index, weights=opinionated, minlength=len(movies))
+        n_positive = np.bincount(movie_index, weights=scores > 0, minlength=len(movies))
+        score_sum = np.bincount(movie_index, weights=scores, minlength=len(movies))
+
+        results = []
+        for total, positive, score in zip(n_opinionated.tolist(), n_positive.tolist(),
+                                          score_sum.tolist()):
+            if total:
+                results.append((round(score / total, 4), round(positive / total, 4)))
+            else:
+                results.append((None, None))
+
+        logging.info("情感分析完成: %s 部电影, %s 条评论, "
+                     "%s 条评论有情感倾向", len(movies), len(scores), int(opinionated.sum()))
+        return results
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+快照归档模块
+每次运行的电影数据按日期和城市分区压缩保存，清单文件记录每个分区的元数据，
+按时间段、城市或想看人数查询时先用清单筛选分区，不打开无关的分区文件
+
+    data/archive/manifest.json
+    data/archive/<日期>/<城市>/<运行ID>.json.zst   (未安装 zstandard 时为 .json.gz)
+
+分区内容为紧凑 JSON（含评论ID、评分、时间等详细字段），清单条目包括
+行数、评论数、归档时间、评论时间范围、想看人数最小/最大值和压缩前后大小。
+"""
+
+import os
+import gzip
+import json
+import time
+import logging
+from typing import Dict, List, Optional
+import config
+from utils import ensure_dir
+from models import Movie, movies_from_dicts, movies_to_dicts
+
+MANIFEST_FILENAME = 'manifest.json'
+
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 12
+
+
+def _zstandard():
+    """延迟导入 zstandard（可选依赖），未安装时返回None"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def resolve_compression(compression: str = None) -> str:
+    """
+    确定压缩格式
+
+    Args:
+        compression: "zstd"、"gzip" 或 "auto"（已安装 zstandard 时用 zstd），默认使用配置文件中的值
+
+    Returns:
+        "zstd" 或 "gzip"
+    """
+    compression = compression or config.ARCHIVE_COMPRESSION
+    if compression not in ('auto', 'zstd', 'gzip'):
+        raise ValueError(f"未知压缩格式: {compression}，可选: auto, zstd, gzip")
+    if compression == 'gzip':
+        return 'gzip'
+    if _zstandard() is not None:
+        return 'zstd'
+    if compression == 'zstd':
+        logging.warning("未安装 zstandard，归档改用 gzip 压缩")
+    return 'gzip'
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    """压缩数据"""
+    if compression == 'zstd':
+        return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    """解压数据"""
+    if compression == 'zstd':
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError("读取 .zst 分区需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotArchive:
+    """按日期和城市分区的压缩快照归档类"""
+
+    EXTENSIONS = {'zstd': '.json.zst', 'gzip': '.json.gz'}
+
+    def __init__(self, root: str = None, compression: str = None):
+        """
+        初始化归档
+
+        Args:
+            root: 归档根目录，默认使用配置文件中的路径
+            compression: 写入时的压缩格式，见 resolve_compression
+        """
+        self.root = root or config.ARCHIVE_DIR
+        self.compression = resolve_compression(compression)
+        self._manifest: Optional[List[Dict]] = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILENAME)
+
+    def manifest(self) -> List[Dict]:
+        """
+        加载分区清单
+
+        Returns:
+            分区条目列表，按归档时间升序
+        """
+        if self._manifest is None:
+            self._manifest = []
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                # 同一路径只对应一个分区文件，重复条目保留最后写入的那条
+                by_path = {entry['path']: entry for entry in entries}
+                if len(by_path) < len(entries):
+                    logging.warning("归档清单中有 %d 个重复的分区路径，已忽略较早的条目",
+                                    len(entries) - len(by_path))
+                    entries = sorted(by_path.values(), key=lambda entry: entry['time'])
+                self._manifest = entries
+        return self._manifest
+
+    def _save_manifest(self):
+        """写入分区清单"""
+        ensure_dir(self.root)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _relpath(self, date: str, city: str, run_id: str) -> str:
+        """分区文件相对于归档根目录的路径"""
+        return f"{date}/{city}/{run_id}{self.EXTENSIONS[self.compression]}"
+
+    def append(self, movies: List[Movie], timestamp: float = None) -> List[Dict]:
+        """
+        归档一次运行的电影数据，每个城市一个分区
+
+        Args:
+            movies: 电影列表
+            timestamp: 归档时间（Unix 时间戳），默认当前时间
+
+        Returns:
+            新增的分区条目列表
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        local = time.localtime(timestamp)
+        date = time.strftime('%Y-%m-%d', local)
+        base_id = f"{time.strftime('%Y%m%d-%H%M%S', local)}-{int(timestamp * 1000) % 1000:03d}"
+
+        by_city: Dict[str, List[Movie]] = {}
+        for movie in movies:
+            by_city.setdefault(movie.city or 'unknown', []).append(movie)
+
+        # 同一毫秒内的多次归档追加序号，保证分区路径不与清单或已有文件重复
+        taken = {entry['path'] for entry in self.manifest()}
+        run_id, suffix = base_id, 0
+        while any(self._relpath(date, city, run_id) in taken or
+                  os.path.exists(os.path.join(self.root, self._relpath(date, city, run_id)))
+                  for city in by_city):
+            suffix += 1
+            run_id = f"{base_id}-{suffix}"
+
+        entries = []
+        for city, city_movies in by_city.items():
+            raw = json.dumps(movies_to_dicts(city_movies, comment_details=True),
+                             ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            data = compress(raw, self.compression)
+            relpath = self._relpath(date, city, run_id)
+            path = os.path.join(self.root, relpath)
+            ensure_dir(os.path.dirname(path))
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            wishes = [movie.wish_count for movie in city_movies]
+            comment_times = [comment.create_time for movie in city_movies
+                             for comment in movie.comments if comment.create_time]
+            entries.append({
+                'path': relpath,
+                'compression': self.compression,
+                'date': date,
+                'city': city,
+                'run_id': run_id,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S', local),
+                'rows': len(city_movies),
+                'comments': sum(len(movie.comments) for movie in city_movies),
+                'comment_time_min': min(comment_times, default=''),
+                'comment_time_max': max(comment_times, default=''),
+                'wish_min': min(wishes),
+                'wish_max': max(wishes),
+                'raw_bytes': len(raw),
+                'bytes': len(data),
+            })
+
+        manifest = self.manifest()
+        manifest.extend(entries)
+        manifest.sort(key=lambda entry: entry['time'])
+        self._save_manifest()
+        for entry in entries:
+            logging.info("已归档 %s 部电影到 %s (%.1fKB -> %.1fKB)",
+                         entry['rows'], entry['path'], entry['raw_bytes'] / 1024, entry['bytes'] / 1024)
+        return entries
+
+    def partitions(self, since: str = None, until: str = None, city: str = None,
+                   min_wish: int = None, max_wish: int = None) -> List[Dict]:
+        """
+        根据清单筛选分区（不打开分区文件）
+
+        Args:
+            since: 起始时间（含），ISO 格式前缀，如 "2026-05-01" 或 "2026-05-01T12:00"
+            until: 结束时间（不含），格式同 since
+            city: 只选该城市
+            min_wish: 只选可能包含想看人数 >= min_wish 的电影的分区
+            max_wish: 只选可能包含想看人数 <= max_wish 的电影的分区
+
+        Returns:
+            分区条目列表，按归档时间升序
+        """
+        return [entry for entry in self.manifest()
+                if (since is None or entry['time'] >= since) and
+                (until is None or entry['time'] < until) and
+                (city is None or entry['city'] == city) and
+                (min_wish is None or entry['wish_max'] >= min_wish) and
+                (max_wish is None or entry['wish_min'] <= max_wish)]
+
+    def read_partition(self, entry: Dict) -> List[Movie]:
+        """
+        读取单个分区
+
+        Args:
+            entry: 分区条目
+
+        Returns:
+            电影列表
+        """
+        with open(os.path.join(self.root, entry['path']), 'rb') as f:
+            raw = decompress(f.read(), entry['compression'])
+        return movies_from_dicts(json.loads(raw))
+
+    def load(self, since: str = None, until: str = None, city: str = None,
+             min_wish: int = None, max_wish: int = None) -> List[Movie]:
+        """
+        读取符合条件的电影记录，只打开清单筛选出的分区
+
+        Args:
+            since: 起始时间（含），见 partitions
+            until: 结束时间（不含）
+            city: 只读取该城市
+            min_wish: 想看人数下限（含）
+            max_wish: 想看人数上限（含）
+
+        Returns:
+            电影列表，按归档时间升序；同一电影在多次运行中各出现一次
+        """
+        entries = self.partitions(since, until, city, min_wish, max_wish)
+        movies = []
+        for entry in entries:
+            movies.extend(movie for movie in self.read_partition(entry)
+                          if (min_wish is None or movie.wish_count >= min_wish) and
+                          (max_wish is None or movie.wish_count <= max_wish))
+        logging.info("从归档的 %s/%s 个分区中读取 %s 条电影记录", len(entries), len(self.manifest()), len(movies))
+        return movies
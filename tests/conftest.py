@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+项目模块位于仓库根目录（非包结构），测试前将其加入导入路径；
+所有写入数据目录的路径配置重定向到临时目录，测试不会修改 data/ 下的文件
+"""
+
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+from models import Comment, Movie  # noqa: E402
+
+
+def make_movie(movie_id, city: str = '', wish_count: int = 0, comments=(), **fields) -> Movie:
+    """
+    构造测试用电影记录，电影ID由豆瓣条目地址派生
+
+    Args:
+        movie_id: 豆瓣电影ID
+        city: 城市
+        wish_count: 想看人数
+        comments: 评论条数（生成 "评论<i>"，评论ID为 i），或 Comment/评论文本列表
+        **fields: 其他 Movie 字段，如 country、release_date
+    """
+    if isinstance(comments, int):
+        comments = [Comment(f"评论{i}", str(i)) for i in range(comments)]
+    return Movie(movie_name=f"电影{movie_id}", movie_url=f"https://movie.douban.com/subject/{movie_id}/",
+                 city=city, wish_count=wish_count,
+                 comments=[c if isinstance(c, Comment) else Comment(c) for c in comments], **fields)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """将数据目录及其下的文件路径配置指向临时目录"""
+    root = str(tmp_path)
+    data_dir = config.DATA_DIR
+    for name in dir(config):
+        value = getattr(config, name)
+        if name.isupper() and isinstance(value, str) and value.startswith(data_dir):
+            monkeypatch.setattr(config, name, root + value[len(data_dir):])
+    return root
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""analytics 模块测试: 国家/上映周/评论数聚合、跨城市差异与快照缓存"""
+
+import pandas as pd
+import pytest
+from analytics import MovieAnalytics
+from data_processor import DataProcessor
+from conftest import make_movie
+
+
+@pytest.fixture
+def beijing():
+    return [make_movie(1, 'beijing', 100, 2, country='中国大陆 / 美国', release_date='2026-05-01(中国大陆)'),
+            make_movie(2, 'beijing', 50, 1, country='美国', release_date='2026-05-06'),
+            make_movie(3, 'beijing', 10, release_date='待定')]
+
+
+@pytest.fixture
+def wuhan():
+    return [make_movie(1, 'wuhan', 40, 5, country='中国大陆 / 美国', release_date='2026-05-01(中国大陆)')]
+
+
+def test_wish_by_country(beijing):
+    analytics = MovieAnalytics()
+    primary = analytics.wish_by_country(beijing)
+    assert list(zip(primary['country'], primary['wish_count'])) == \
+        [('中国大陆', 100), ('美国', 50), ('未知', 10)]
+    every = analytics.wish_by_country(beijing, all_countries=True)
+    assert dict(zip(every['country'], every['wish_count'])) == {'美国': 150, '中国大陆': 100, '未知': 10}
+
+
+def test_wish_by_release_week_skips_unparsed_dates(beijing):
+    result = MovieAnalytics().wish_by_release_week(beijing)
+    # 2026-05-01 为周五，2026-05-06 为下一周的周三
+    assert result['release_week'].tolist() == [pd.Timestamp('2026-04-27'), pd.Timestamp('2026-05-04')]
+    assert result['wish_count'].tolist() == [100, 50]
+
+
+def test_comment_counts_and_city_spread(beijing, wuhan):
+    analytics = MovieAnalytics()
+    counts = analytics.comment_counts(beijing + wuhan)
+    assert counts.iloc[0][['movie_id', 'comment_count']].tolist() == ['1', 7]
+
+    spread = analytics.city_spread([beijing, wuhan])
+    first = spread.iloc[0]
+    assert (first['movie_id'], first['cities'], first['wish_min'], first['wish_max'], first['wish_spread']) == \
+        ('1', 2, 40, 100, 60)
+    assert spread.set_index('movie_id').loc['2', 'wish_std'] == 0.0
+
+
+def test_file_snapshots_are_cached_until_modified(tmp_path, beijing):
+    path = str(tmp_path / 'movies.json')
+    DataProcessor().save_to_json(beijing, path)
+    analytics = MovieAnalytics()
+    first = analytics.load(path)
+    assert analytics.load(path) is first
+    assert analytics.comment_counts(path) is analytics.comment_counts(path)
+
+    # 文件被替换后（大小变化）重新加载
+    DataProcessor().save_to_json(beijing[:1], path)
+    assert len(analytics.load(path)) == 1
+
+
+def test_dashboard_keys(beijing, wuhan):
+    result = MovieAnalytics().dashboard([beijing, wuhan])
+    assert set(result) >= {'wish_by_country', 'wish_by_release_week', 'comment_counts', 'city_spread'}
+    assert result['comment_counts']['comment_count'].tolist() == [5]
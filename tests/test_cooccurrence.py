@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""cooccurrence 模块测试: 相邻词组、窗口共现、停用词过滤与剪枝"""
+
+import numpy as np
+import pytest
+import config
+from cooccurrence import CooccurrenceCounter
+from vocabulary import Vocabulary
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+def count(vocabulary, comments, **kwargs):
+    counter = CooccurrenceCounter(vocabulary=vocabulary, **kwargs)
+    counter.update(vocabulary.encode(tokens) for tokens in comments)
+    return counter
+
+
+def test_stopwords_do_not_create_false_bigrams(vocabulary):
+    counter = count(vocabulary, [['剧情', '的', '节奏'], ['剧情', '节奏']], window=2,
+                    stopwords={'的'})
+    # 第一条评论中“剧情”和“节奏”被停用词隔开，不是相邻词组，但仍在共现窗口内
+    assert counter.top_bigrams(10) == [('剧情', '节奏', 1)]
+    assert counter.top_pairs(10) == [('剧情', '节奏', 2)]
+
+
+def test_window_is_measured_on_full_sequence(vocabulary):
+    counter = count(vocabulary, [['演员', '的', '的', '的', '演技']], window=3, stopwords={'的'})
+    assert counter.top_pairs(10) == []
+    counter = count(vocabulary, [['演员', '的', '的', '的', '演技']], window=4, stopwords={'的'})
+    assert counter.top_pairs(10) == [('演员', '演技', 1)]
+
+
+def test_pairs_do_not_cross_comments(vocabulary):
+    counter = count(vocabulary, [['特效'], ['画面'], ['特效', '画面']], chunk_size=2)
+    assert counter.comments == 3
+    assert counter.top_bigrams(10) == [('特效', '画面', 1)]
+    assert counter.related('特效') == [('画面', 1)]
+    assert counter.related('不存在') == []
+
+
+def test_single_characters_and_numbers_are_dropped(vocabulary):
+    counter = count(vocabulary, [['好', '电影', '2024', '推荐']])
+    assert counter.top_bigrams(10) == []
+    # 无序词对按词ID排列，“电影”先进入词表
+    assert counter.top_pairs(10) == [('电影', '推荐', 1)]
+
+
+def test_save_writes_self_contained_matrix(vocabulary, tmp_path):
+    vocabulary.encode(['无关', '词语'])
+    counter = count(vocabulary, [['剧情', '节奏', '剧情']], window=2)
+    counter.save(str(tmp_path / 'cooccurrence.json'), str(tmp_path / 'matrix.npz'))
+    data = np.load(str(tmp_path / 'matrix.npz'))
+    words = data['vocabulary'].tolist()
+    assert sorted(words) == ['剧情', '节奏']
+    bigrams = {(words[a], words[b]): c for a, b, c in
+               zip(data['bigram_rows'], data['bigram_cols'], data['bigram_counts'])}
+    assert bigrams == {('剧情', '节奏'): 1, ('节奏', '剧情'): 1}
+    assert data['counts'].tolist() == [2]
+
+
+def test_pruning_records_undercount(vocabulary, monkeypatch):
+    monkeypatch.setattr(config, 'COOCCURRENCE_TOP_N', 5)
+    comments = [['常见', '搭配']] * 20 + [[f'词{i}a', f'词{i}b'] for i in range(50)]
+    counter = count(vocabulary, comments, max_pairs=8, chunk_size=10)
+    assert len(counter.pairs) <= 8
+    assert counter.top_pairs()[0] == ('常见', '搭配', 20)
+    assert counter.pairs.undercount >= 1
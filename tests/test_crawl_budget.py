@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""crawl_budget 模块测试: 页数分配、新评论数与状态保存"""
+
+import pytest
+import config
+from crawl_budget import CommentBudgetPlanner, allocate_pages, movie_weight
+from conftest import make_movie
+
+
+def test_allocate_pages_respects_budget_and_caps():
+    pages = allocate_pages([4.0, 1.0, 1.0], [10, 10, 2], budget=12)
+    assert sum(pages) == 12
+    assert pages[2] <= 2
+    assert pages[0] > pages[1]
+
+
+def test_allocate_pages_prefers_heavy_movies_when_short():
+    assert allocate_pages([1.0, 3.0, 2.0], [5, 5, 5], budget=2) == [0, 1, 1]
+
+
+def test_allocate_pages_with_zero_weight_gets_minimum_only():
+    assert allocate_pages([0.0, 1.0], [5, 5], budget=10) == [1, 5]
+
+
+def test_movie_weight_grows_with_wish_and_new_comments():
+    assert movie_weight(0, 0) == 1.0
+    assert movie_weight(99, 0) > movie_weight(9, 0)
+    assert movie_weight(9, 100) > movie_weight(9, 10)
+
+
+def test_plan_uses_new_comments_since_last_crawl(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'COMMENT_BUDGET_MAX_PAGES', 10)
+    state_file = str(tmp_path / 'budget.json')
+    movies = [make_movie('101', wish_count=100), make_movie('102', wish_count=100), make_movie('103', wish_count=100)]
+
+    planner = CommentBudgetPlanner(budget=12, state_file=state_file)
+    planner.save({'101': 1000, '102': 1000})
+
+    planner = CommentBudgetPlanner(budget=12, state_file=state_file)
+    assert planner.new_comments('101', 1000) == 0
+    assert planner.new_comments('103', 50) == 50
+    pages = planner.plan(movies, {'101': 1000, '102': 1500, '103': 30})
+    # 第三部电影只有两页评论
+    assert pages[2] == 2
+    assert pages[1] > pages[0] >= 1
+    assert sum(pages) == 12
+
+
+def test_plan_skips_movies_without_first_page(tmp_path):
+    planner = CommentBudgetPlanner(budget=0, state_file=str(tmp_path / 'budget.json'))
+    pages = planner.plan([make_movie('101', wish_count=10), make_movie('102', wish_count=10)], {'102': 200})
+    assert pages[0] == 0
+    assert pages[1] >= 1
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""dedup 模块测试: MinHash LSH 近似重复检测、簇归并与规模"""
+
+import time
+from models import Comment, Movie
+from dedup import CommentDeduplicator, MinHashLSH
+
+SPAM = '这部电影真的太好看了强烈推荐大家去电影院看一看绝对不会后悔的'
+
+
+def make_lsh():
+    return MinHashLSH(num_perm=128, bands=32, threshold=0.8, shingle_size=3)
+
+
+def test_near_duplicates_join_earliest_comment():
+    lsh = make_lsh()
+    result = lsh.insert_texts(['a', 'b', 'c', 'd'],
+                              [SPAM, SPAM + '！', '剧情拖沓，演员表演也很一般，不推荐', SPAM])
+    assert result == [None, 'a', None, 'a']
+    assert lsh.clusters() == [['a', 'b', 'd']]
+
+
+def test_incremental_batches_share_clusters():
+    lsh = make_lsh()
+    lsh.insert_texts(['a'], [SPAM])
+    assert lsh.insert_texts(['b', 'c'], [SPAM, '完全不同的一条评论内容，讲的是配乐']) == ['a', None]
+    assert len(lsh) == 3
+
+
+def test_identical_spam_cluster_scales_linearly():
+    lsh = make_lsh()
+    start = time.perf_counter()
+    result = lsh.insert_texts(list(range(20000)), [SPAM] * 20000)
+    assert time.perf_counter() - start < 2.0
+    assert result[0] is None and set(result[1:]) == {0}
+
+
+def test_near_duplicate_spam_compares_against_cluster_roots_only():
+    lsh = make_lsh()
+    texts = [f"{SPAM}{i}" for i in range(4000)]
+    start = time.perf_counter()
+    result = lsh.insert_texts(list(range(len(texts))), texts)
+    assert time.perf_counter() - start < 2.0
+    roots = [i for i, source in enumerate(result) if source is None]
+    assert len(roots) < len(texts) * 0.05
+    assert sum(len(cluster) for cluster in lsh.clusters()) > len(texts) * 0.95
+
+
+def test_deduplicator_keeps_first_comment_of_each_cluster():
+    movies = [Movie(movie_name='a', comments=[Comment(SPAM), Comment('配乐很棒，画面也好')]),
+              Movie(movie_name='b', comments=[Comment(SPAM + '。')])]
+    result = CommentDeduplicator(make_lsh()).deduplicate(movies)
+    assert [m.comment_texts for m in result] == [[SPAM, '配乐很棒，画面也好'], []]
+    assert len(movies[1].comments) == 1
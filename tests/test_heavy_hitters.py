@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""heavy_hitters 模块测试: Space-Saving 误差上限与合并"""
+
+import random
+from collections import Counter
+import pytest
+from heavy_hitters import SpaceSavingCounter
+
+
+def zipf_words(n, vocabulary=2000, seed=7):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+    return [f"w{i}" for i in rng.choices(range(vocabulary), weights=weights, k=n)]
+
+
+def assert_within_bounds(counter, exact):
+    assert counter.total == sum(exact.values())
+    assert len(counter) <= counter.capacity
+    for word, count in counter.items():
+        # 真实频次位于 [count - error, count] 区间内
+        assert count - counter.error(word) <= exact[word] <= count
+        assert counter.error(word) <= counter.error_bound
+    # 真实频次大于 总词频 / capacity 的词一定被保留
+    for word, count in exact.items():
+        if count > counter.total / counter.capacity:
+            assert word in counter
+
+
+def test_counts_are_exact_below_capacity():
+    counter = SpaceSavingCounter(100)
+    counter.update(['a', 'b', 'a'])
+    counter.update({'c': 3})
+    assert counter.most_common() == [('c', 3), ('a', 2), ('b', 1)]
+    assert counter.error_bound == 0
+
+
+def test_error_bounds_hold_over_capacity():
+    words = zipf_words(20000)
+    counter = SpaceSavingCounter(50)
+    counter.update(words)
+    assert_within_bounds(counter, Counter(words))
+
+
+def test_merged_counters_keep_error_bounds():
+    words = zipf_words(20000)
+    left, right = SpaceSavingCounter(50), SpaceSavingCounter(50)
+    left.update(words[:12000])
+    right.update(words[12000:])
+    assert_within_bounds(left.merge(right), Counter(words))
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpaceSavingCounter(0)
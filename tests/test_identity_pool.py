@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""identity_pool 模块测试: 身份轮换、拦截休息与指数退避，以及爬虫对拦截响应的上报"""
+
+import time
+import pytest
+import config
+from identity_pool import IdentityPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    return IdentityPool('test', {'User-Agent': 'base'}, ['ua-0', 'ua-1'], min_interval=0,
+                        proxies=[], cookie_dir=str(tmp_path / 'identities'))
+
+
+def test_identities_get_own_user_agent(pool):
+    assert [identity.session.headers['User-Agent'] for identity in pool.identities] == ['ua-0', 'ua-1']
+
+
+def test_blocked_identity_rests_and_backs_off(pool, monkeypatch):
+    monkeypatch.setattr(config, 'IDENTITY_REST_SECONDS', 100)
+    monkeypatch.setattr(config, 'IDENTITY_MAX_REST_SECONDS', 300)
+    identity = pool.identities[0]
+
+    rests = []
+    for _ in range(4):
+        identity.ready_at = 0.0
+        start = time.monotonic()
+        pool.report(identity, ok=False, blocked=True)
+        rests.append(round(identity.ready_at - start, -1))
+    # 连续被拦截时休息时间翻倍，不超过上限
+    assert rests == [100, 200, 300, 300]
+    assert identity.blocks == 4
+
+    # 休息期间由其他身份继续请求
+    assert pool.acquire() is pool.identities[1]
+
+    pool.report(identity, ok=True)
+    assert identity.strikes == 0
+
+
+def test_identity_rests_after_consecutive_failures(pool, monkeypatch):
+    monkeypatch.setattr(config, 'IDENTITY_MAX_FAILURES', 3)
+    monkeypatch.setattr(config, 'IDENTITY_REST_SECONDS', 100)
+    identity = pool.identities[0]
+    pool.report(identity, ok=False)
+    pool.report(identity, ok=False)
+    assert identity.ready_at == 0.0
+    pool.report(identity, ok=False)
+    assert identity.ready_at > time.monotonic() + 90
+    assert (identity.failures, identity.blocks, identity.strikes) == (3, 0, 1)
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+        self.encoding = 'utf-8'
+        self.url = 'https://movie.douban.com/'
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+def test_blocked_page_is_reported_once(tmp_path, monkeypatch):
+    from spider import DoubanMovieSpider
+
+    spider = DoubanMovieSpider()
+    reports = []
+    monkeypatch.setattr(spider.desktop_pool, 'report',
+                        lambda identity, ok, blocked=False: reports.append((ok, blocked)))
+    monkeypatch.chdir(tmp_path)
+    for identity in spider.desktop_pool.identities:
+        monkeypatch.setattr(identity.session, 'get', lambda *args, **kwargs: FakeResponse(429))
+
+    assert spider.fetch_page('https://movie.douban.com/cinema/later/beijing/') is None
+    assert reports == [(False, True)]
+    # 不再为每次请求写调试文件
+    assert not (tmp_path / 'debug_page.html').exists()
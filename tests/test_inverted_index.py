@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""inverted_index 模块测试: varint 差分编码、增量索引、JSON 重新加载后不重复索引与查询"""
+
+import numpy as np
+import pytest
+from data_processor import DataProcessor
+from inverted_index import InvertedIndex, comment_key, decode_postings, encode_postings
+from conftest import make_movie
+from models import Comment
+from vocabulary import Vocabulary
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+@pytest.fixture
+def index(tmp_path, vocabulary):
+    index = InvertedIndex(str(tmp_path / 'index.sqlite3'), vocabulary)
+    yield index
+    index.close()
+
+
+def test_varint_round_trip():
+    rng = np.random.default_rng(0)
+    docs = np.unique(rng.integers(0, 2 ** 40, 5000))
+    data = encode_postings(docs)
+    assert decode_postings(data).tolist() == docs.tolist()
+    assert encode_postings(np.array([], dtype=np.int64)) == b''
+    assert len(decode_postings(b'')) == 0
+    # 相邻文档编号每个只需一个字节
+    assert len(encode_postings(np.arange(1000))) == 1000
+
+
+def test_varint_appended_segments_concatenate():
+    first, second = np.array([0, 3, 200]), np.array([201, 70000, 70001])
+    data = encode_postings(first) + encode_postings(second, previous=200)
+    assert decode_postings(data).tolist() == [0, 3, 200, 201, 70000, 70001]
+
+
+def test_comment_key_falls_back_to_text_hash():
+    assert comment_key(Comment('好看', comment_id='123')) == '123'
+    assert comment_key(Comment('好看')) == comment_key(Comment('好看'))
+    assert comment_key(Comment('好看')) != comment_key(Comment('难看'))
+
+
+def test_add_and_query(index, vocabulary):
+    movies = [make_movie(1, '北京', comments=[Comment('a', '1'), Comment('b', '2')]),
+              make_movie(2, '北京', comments=[Comment('c', '3')])]
+    tokens = [['剧情', '的', '特效'], ['剧情', '1'], ['特效', '演员']]
+    assert index.add_movies(movies, [vocabulary.encode(t) for t in tokens]) == 3
+    assert len(index) == 3
+    assert index.postings('剧情').tolist() == [0, 1]
+    # 单字符和纯数字不进入索引
+    assert index.document_frequency('的') == 0
+    assert index.document_frequency('1') == 0
+    assert index.query(['剧情', '特效'], 'and').tolist() == [0]
+    assert index.query(['剧情', '演员'], 'or').tolist() == [0, 1, 2]
+    assert [(item['movie_name'], item['comments']) for item in index.search(['特效'])] == \
+        [('电影1', 1), ('电影2', 1)]
+    with pytest.raises(ValueError):
+        index.query(['剧情'], 'xor')
+
+
+def test_incremental_update_appends_postings(index, vocabulary):
+    movie = make_movie(1, '北京', comments=[Comment('a', '1')])
+    index.add_movies([movie], [vocabulary.encode(['剧情'])])
+    index.search(['剧情'])
+    movie.comments.append(Comment('b', '2'))
+    ids = [vocabulary.encode(['剧情']), vocabulary.encode(['剧情', '特效'])]
+    assert index.add_movies([movie], ids) == 1
+    assert index.postings('剧情').tolist() == [0, 1]
+    assert index.search(['剧情'])[0]['comments'] == 2
+
+
+def test_reloaded_json_is_not_indexed_twice(tmp_path, index, vocabulary):
+    movies = [make_movie(1, '北京', comments=[Comment('好看', '1'), Comment('好看', '2'), Comment('无聊')])]
+    ids = [vocabulary.encode(['好看']), vocabulary.encode(['好看']), vocabulary.encode(['无聊'])]
+    assert index.add_movies(movies, ids) == 3
+
+    processor = DataProcessor()
+    path = str(tmp_path / 'movies.json')
+    processor.save_to_json(movies, path)
+    reloaded = processor.load_from_json(path)
+    assert [c.comment_id for c in reloaded[0].comments] == ['1', '2', '']
+    assert index.add_movies(reloaded, ids) == 0
+    assert len(index) == 3
+    assert index.document_frequency('好看') == 2
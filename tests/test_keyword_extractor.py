@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""keyword_extractor 模块测试: 文档-词矩阵构建、TF-IDF 与每个文档的关键词"""
+
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from keyword_extractor import DocumentTermMatrix, tfidf_scores, top_keywords
+from vocabulary import Vocabulary
+from word_freq_store import FrequencySnapshot
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+def build(vocabulary, docs):
+    doc_ids = [doc_id for doc_id, _ in docs]
+    snapshots = [FrequencySnapshot.from_counter(Counter(counts), vocabulary) for _, counts in docs]
+    return DocumentTermMatrix.from_snapshots(doc_ids, snapshots)
+
+
+def test_snapshots_with_same_doc_id_are_merged(vocabulary):
+    matrix = build(vocabulary, [('b', {'剧情': 1}), ('a', {'特效': 2}), ('b', {'剧情': 3, '演员': 1})])
+    assert matrix.doc_ids == ['a', 'b']
+    assert matrix.shape == (2, 3)
+    cells = {(matrix.doc_ids[d], vocabulary.decode([matrix.vocabulary[t]])[0]): c
+             for d, t, c in zip(matrix.doc_index, matrix.term_index, matrix.counts)}
+    assert cells == {('a', '特效'): 2, ('b', '剧情'): 4, ('b', '演员'): 1}
+
+
+def test_tfidf_matches_formula(vocabulary):
+    matrix = build(vocabulary, [('a', {'剧情': 2, '特效': 1}), ('b', {'剧情': 1})])
+    scores = tfidf_scores(matrix, sublinear_tf=False)
+    expected = {}
+    for doc, counts in (('a', {'剧情': 2, '特效': 1}), ('b', {'剧情': 1})):
+        total = sum(counts.values())
+        for word, count in counts.items():
+            df = 2 if word == '剧情' else 1
+            expected[(doc, word)] = count / total * (math.log(3 / (1 + df)) + 1)
+    actual = {(matrix.doc_ids[d], vocabulary.decode([matrix.vocabulary[t]])[0]): s
+              for d, t, s in zip(matrix.doc_index, matrix.term_index, scores)}
+    assert actual == pytest.approx(expected)
+
+
+def test_top_keywords_prefers_distinctive_words(vocabulary):
+    matrix = build(vocabulary, [('a', {'电影': 10, '特效': 3, '画面': 1}),
+                                ('b', {'电影': 10, '剧情': 2}),
+                                ('c', {'电影': 5})])
+    keywords = top_keywords(matrix, top_k=2)
+    assert [word for word, _ in keywords['a']] == ['特效', '电影']
+    assert keywords['a'][0][1] > keywords['a'][1][1]
+
+    keywords = top_keywords(matrix, top_k=5, min_count=2, max_df_ratio=0.5)
+    assert keywords == {'a': [('特效', pytest.approx(keywords['a'][0][1]))],
+                        'b': [('剧情', pytest.approx(keywords['b'][0][1]))], 'c': []}
+
+
+def test_empty_matrix(vocabulary):
+    matrix = DocumentTermMatrix.from_snapshots(['a'], [FrequencySnapshot.empty(vocabulary)])
+    assert matrix.nnz == 0
+    assert top_keywords(matrix) == {'a': []}
+    # 只有一个文档时 IDF 仍为正数
+    scores = tfidf_scores(build(vocabulary, [('a', {'剧情': 1})]))
+    assert len(scores) == 1 and np.isfinite(scores).all() and scores[0] > 0
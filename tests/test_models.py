@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""models 模块测试: 字典互转与相等性"""
+
+import pytest
+from conftest import make_movie
+from models import Comment, Movie, movies_from_dicts
+
+
+def detailed_movie(**fields):
+    comments = [Comment('好看', comment_id='42', rating=5, create_time='2026-05-02 10:00:00')]
+    return make_movie(1234567, 'wuhan', 100, comments, release_date='2026-05-01', country='中国大陆', **fields)
+
+
+def test_to_dict_round_trip_keeps_comment_details():
+    movie = detailed_movie(rating=7.5, genres='剧情')
+    assert Movie.from_dict(movie.to_dict(comment_details=True)) == movie
+
+
+def test_to_dict_default_keeps_only_comment_texts():
+    restored = Movie.from_dict(detailed_movie().to_dict())
+    assert restored.comment_texts == ['好看']
+    assert restored.comments[0].comment_id == ''
+
+
+def test_movies_from_dicts_accepts_mixed_comment_values():
+    movies = movies_from_dicts([{'movie_name': 'a', 'comments': ['文本', {'text': '字典', 'rating': '4'}]}])
+    assert [c.text for c in movies[0].comments] == ['文本', '字典']
+    assert movies[0].comments[1].rating == 4
+
+
+def test_records_are_unhashable():
+    with pytest.raises(TypeError):
+        hash(detailed_movie())
+    with pytest.raises(TypeError):
+        hash(Comment('好看'))
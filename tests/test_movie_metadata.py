@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""movie_metadata 模块测试: 条目解析、缓存有效期与补充元数据"""
+
+import threading
+from types import SimpleNamespace
+import pytest
+from conftest import make_movie
+from movie_metadata import MetadataCache, enrich_movies, parse_subject
+
+SUBJECT = {
+    'rating': {'value': 8.2, 'count': 1000},
+    'genres': ['剧情', '喜剧'],
+    'durations': ['118分钟', '120分钟(导演剪辑版)'],
+    'directors': [{'name': '导演甲'}, {'name': ''}, {'name': '导演乙'}],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MetadataCache(str(tmp_path / 'metadata.sqlite3'), ttl=3600)
+    yield cache
+    cache.close()
+
+
+class FakeSpider:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+        self.mobile_pool = SimpleNamespace(identities=[None, None])
+        self._lock = threading.Lock()
+
+    def fetch_movie_subject(self, movie_id):
+        with self._lock:
+            self.requested.append(movie_id)
+        return self.responses.get(movie_id)
+
+
+def test_parse_subject():
+    assert parse_subject(SUBJECT) == {'rating': 8.2, 'genres': '剧情 / 喜剧', 'duration': '118分钟',
+                                      'directors': '导演甲 / 导演乙'}
+    # 评分人数不足时 value 为 0
+    assert parse_subject({'rating': {'value': 0}}) == {'rating': None, 'genres': '', 'duration': '',
+                                                       'directors': ''}
+
+
+def test_cache_respects_ttl(tmp_path):
+    path = str(tmp_path / 'metadata.sqlite3')
+    cache = MetadataCache(path, ttl=3600)
+    cache.put_many({'101': {'rating': 7.0}})
+    assert cache.get_many(['101', '102', '101']) == {'101': {'rating': 7.0}}
+    cache.close()
+
+    expired = MetadataCache(path, ttl=-1)
+    assert expired.get_many(['101']) == {}
+    expired.close()
+
+
+def test_enrich_requests_only_missing_movies(cache):
+    cache.put_many({'101': parse_subject({'rating': {'value': 6.5}})})
+    spider = FakeSpider({'102': SUBJECT})
+    movies = [make_movie('101'), make_movie('102'), make_movie('103'), make_movie('102')]
+
+    assert enrich_movies(spider, movies, cache) == 2
+    assert sorted(spider.requested) == ['102', '103']
+    assert [movie.rating for movie in movies] == [6.5, 8.2, None, 8.2]
+    assert movies[1].directors == '导演甲 / 导演乙'
+
+    # 失败的电影不写入缓存，下次重新请求
+    spider.requested.clear()
+    assert enrich_movies(spider, movies, cache) == 1
+    assert spider.requested == ['103']
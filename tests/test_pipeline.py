@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""pipeline 模块测试: 按输入指纹跳过阶段、输出被修改或过期时重新执行"""
+
+import pytest
+import config
+from models import Movie
+from pipeline import Pipeline, Stage, dataset_fingerprint
+
+
+class Recorder:
+    """按顺序记录阶段执行，并把输入文件内容（可变换后）写入输出文件"""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.calls = []
+        self.source = tmp_path / 'source.txt'
+        self.source.write_text('v1', encoding='utf-8')
+        self.transform = str.upper
+
+    def stage(self, name, source, **kwargs):
+        output = self.tmp_path / f"{name}.txt"
+
+        def run(ctx):
+            self.calls.append(name)
+            output.write_text(self.transform(source.read_text(encoding='utf-8')), encoding='utf-8')
+            return [str(output)]
+        return Stage(name, run, input_files=lambda: [str(source)], **kwargs), output
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    return Recorder(tmp_path)
+
+
+def make_pipeline(recorder, tmp_path, **kwargs):
+    first, first_output = recorder.stage('first', recorder.source, config_keys=('CHART_TITLE',), **kwargs)
+    second, second_output = recorder.stage('second', first_output, deps=('first',))
+    return Pipeline([first, second], str(tmp_path / 'state.json')), first_output, second_output
+
+
+def test_second_run_skips_unchanged_stages(recorder, tmp_path):
+    pipeline, _, _ = make_pipeline(recorder, tmp_path)
+    assert pipeline.run() == {'first': 'run', 'second': 'run'}
+    # 状态保存在文件中，新的流水线对象同样跳过
+    pipeline, _, _ = make_pipeline(recorder, tmp_path)
+    assert pipeline.run() == {'first': 'skipped', 'second': 'skipped'}
+    assert recorder.calls == ['first', 'second']
+
+
+def test_changed_input_reruns_downstream_only_if_output_changed(recorder, tmp_path):
+    pipeline, _, _ = make_pipeline(recorder, tmp_path)
+    pipeline.run()
+
+    recorder.source.write_text('v2', encoding='utf-8')
+    assert pipeline.run() == {'first': 'run', 'second': 'run'}
+
+    # 上游重新执行但输出内容不变时，下游跳过
+    recorder.source.write_text('V2', encoding='utf-8')
+    assert pipeline.run() == {'first': 'run', 'second': 'skipped'}
+
+
+def test_modified_output_and_config_trigger_rerun(recorder, tmp_path, monkeypatch):
+    pipeline, first_output, second_output = make_pipeline(recorder, tmp_path)
+    pipeline.run()
+
+    second_output.write_text('edited', encoding='utf-8')
+    assert pipeline.run() == {'first': 'skipped', 'second': 'run'}
+
+    monkeypatch.setattr(config, 'CHART_TITLE', 'another title')
+    assert pipeline.run() == {'first': 'run', 'second': 'skipped'}
+
+    assert pipeline.run(force=True) == {'first': 'run', 'second': 'run'}
+
+
+def test_expired_output_reruns(recorder, tmp_path):
+    pipeline, _, _ = make_pipeline(recorder, tmp_path, max_age=-1)
+    pipeline.run()
+    assert pipeline.run() == {'first': 'run', 'second': 'skipped'}
+
+
+def test_dry_run_and_selected_stages(recorder, tmp_path):
+    pipeline, _, _ = make_pipeline(recorder, tmp_path)
+    assert pipeline.run(dry_run=True) == {'first': 'stale', 'second': 'stale'}
+    assert recorder.calls == []
+    assert pipeline.run(['first']) == {'first': 'run'}
+    assert pipeline.run(['second']) == {'second': 'run'}
+    with pytest.raises(ValueError):
+        pipeline.run(['unknown'])
+
+
+def test_failed_stage_stops_pipeline(recorder, tmp_path):
+    failing = Stage('first', lambda ctx: None)
+    second, _ = recorder.stage('second', recorder.source, deps=('first',))
+    pipeline = Pipeline([failing, second], str(tmp_path / 'state.json'))
+    assert pipeline.run() == {'first': 'failed'}
+    assert recorder.calls == []
+
+
+def test_unknown_dependency_is_rejected(recorder, tmp_path):
+    second, _ = recorder.stage('second', recorder.source, deps=('missing',))
+    with pytest.raises(ValueError):
+        Pipeline([second], str(tmp_path / 'state.json'))
+
+
+def test_dataset_fingerprint_ignores_derived_fields():
+    movie = Movie(movie_name='电影', movie_url='https://movie.douban.com/subject/1/', wish_count=10)
+    before = dataset_fingerprint([movie])
+    movie.sentiment_score = 0.5
+    movie.positive_ratio = 0.8
+    assert dataset_fingerprint([movie]) == before
+    movie.wish_count = 11
+    assert dataset_fingerprint([movie]) != before
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""profiling 模块测试: 未启用时不记录、嵌套 section 的峰值内存、工作线程中的 section 与汇总表对齐"""
+
+import threading
+import tracemalloc
+import pytest
+import profiling
+from profiling import Profiler, count_result, display_width, profiled
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    profiler = Profiler()
+    monkeypatch.setattr(profiling, 'profiler', profiler)
+    yield profiler
+    if profiler.trace_memory:
+        tracemalloc.stop()
+
+
+def test_disabled_profiler_records_nothing(profiler):
+    @profiled(items=count_result)
+    def work():
+        return [1, 2, 3]
+
+    assert work() == [1, 2, 3]
+    with profiler.section('stage', stage=True) as frame:
+        frame.items = 5
+    assert profiler.stats == {}
+
+
+def test_enabled_profiler_records_calls_and_items(profiler):
+    profiler.enable(trace_memory=False)
+
+    @profiled(name='work', items=count_result)
+    def work(n):
+        return list(range(n))
+
+    work(3)
+    work(4)
+    stats = profiler.stats['work']
+    assert (stats.calls, stats.items, stats.peak) == (2, 7, None)
+    assert 'work' in profiler.summary()
+
+
+def test_nested_peaks_are_measured_separately(profiler):
+    profiler.enable(trace_memory=True)
+    with profiler.section('outer'):
+        with profiler.section('inner'):
+            data = bytearray(4 * 1024 * 1024)
+            del data
+        small = bytearray(1024)
+    del small
+    assert profiler.stats['inner'].peak >= 4 * 1024 * 1024
+    assert profiler.stats['outer'].peak >= profiler.stats['inner'].peak
+    assert list(profiler.stats) == ['outer', 'inner']
+
+
+def test_worker_thread_sections_do_not_touch_memory_peak(profiler):
+    profiler.enable(trace_memory=True)
+
+    def worker():
+        with profiler.section('worker'):
+            bytearray(1024)
+
+    with profiler.section('stage'):
+        data = bytearray(4 * 1024 * 1024)
+        del data
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    # 工作线程不重置全进程峰值，主线程 section 的峰值不受影响
+    assert profiler.stats['stage'].peak >= 4 * 1024 * 1024
+    assert profiler.stats['worker'].peak is None
+    assert profiler.stats['worker'].calls == 1
+
+
+def test_summary_columns_align_with_chinese_names(profiler):
+    profiler.enable(trace_memory=False)
+    with profiler.section('[分词]', stage=False) as frame:
+        frame.items = 10
+    with profiler.section('WordCloudGenerator.segment_comments'):
+        pass
+    lines = profiler.summary().splitlines()
+    assert display_width('分词a') == 5
+    # 表头、分隔线和各行（均以右对齐的列结尾）显示宽度相同
+    assert len({display_width(line) for line in lines}) == 1
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""query_service 模块测试: 路由、参数校验、ETag/304 与数据重新加载"""
+
+import json
+import os
+import pytest
+from data_processor import DataProcessor
+from conftest import make_movie
+from query_service import QueryService
+
+
+@pytest.fixture
+def movies_file(tmp_path):
+    path = str(tmp_path / 'movies.json')
+    DataProcessor().save_to_json([make_movie(101, 'beijing', 10, 3), make_movie(102, 'wuhan', 50),
+                                  make_movie(103, 'beijing', 30)], path)
+    return path
+
+
+@pytest.fixture
+def service(movies_file):
+    service = QueryService(movies_file)
+    assert service.reload()
+    return service
+
+
+def get_json(service, path):
+    status, etag, body = service.respond(path)
+    return status, json.loads(body)
+
+
+def test_top_movies_sorted_and_filtered(service):
+    status, data = get_json(service, '/movies/top?n=2')
+    assert status == 200
+    assert [movie['movie_id'] for movie in data['movies']] == ['102', '103']
+    assert 'comments' not in data['movies'][0]
+    _, data = get_json(service, '/movies/top?city=beijing')
+    assert [movie['movie_id'] for movie in data['movies']] == ['103', '101']
+
+
+def test_comments_are_paginated(service):
+    status, data = get_json(service, '/movies/101/comments?offset=1&limit=1')
+    assert status == 200
+    assert data['total'] == 3
+    assert data['comments'] == [{'text': '评论1', 'comment_id': '1', 'rating': 0, 'create_time': ''}]
+
+
+def test_errors(service):
+    assert service.respond('/unknown')[0] == 404
+    assert service.respond('/movies/999/comments')[0] == 404
+    status, data = get_json(service, '/movies/top?n=abc')
+    assert status == 400 and 'n' in data['error']
+    # 没有词频快照
+    assert service.respond('/words')[0] == 404
+
+
+def test_unexpected_errors_return_json_500(service, monkeypatch, caplog):
+    def broken(path, params):
+        raise ValueError("快照与当前词表不匹配")
+    monkeypatch.setattr(service.dataset, 'get', broken)
+    status, data = get_json(service, '/words')
+    assert status == 500 and '不匹配' in data['error']
+    assert any(record.levelname == 'ERROR' and '/words' in record.getMessage() for record in caplog.records)
+
+
+def test_etag_and_not_modified(service):
+    status, etag, body = service.respond('/movies/top?n=2')
+    assert status == 200 and etag.startswith('"')
+    assert service.respond('/movies/top?n=2', if_none_match=etag) == (304, etag, b'')
+    assert service.respond('/movies/top?n=2', if_none_match=f'"other", {etag}')[0] == 304
+    assert service.respond('/movies/top?n=3', if_none_match=etag)[0] == 200
+
+
+def test_reload_replaces_dataset_when_file_changes(service, movies_file):
+    _, etag, _ = service.respond('/movies/top')
+    assert not service.reload()
+
+    DataProcessor().save_to_json([make_movie(104, 'beijing', 99)], movies_file)
+    stat = os.stat(movies_file)
+    os.utime(movies_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert service.reload()
+    status, new_etag, body = service.respond('/movies/top', if_none_match=etag)
+    assert status == 200 and new_etag != etag
+    assert [movie['movie_id'] for movie in json.loads(body)['movies']] == ['104']
+
+
+def test_invalid_file_keeps_old_dataset(service, movies_file):
+    with open(movies_file, 'w', encoding='utf-8') as f:
+        f.write('[{"movie_name"')
+    assert not service.reload()
+    assert get_json(service, '/health')[1]['movies'] == 3
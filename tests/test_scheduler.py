@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""scheduler 模块测试: 刷新间隔、到期队列、增量存储与守护进程一次调度循环"""
+
+import pytest
+import config
+from conftest import make_movie
+from models import Comment
+from scheduler import CrawlDaemon, CrawlScheduler, CrawlStore, refresh_interval
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CrawlStore(str(tmp_path / 'crawl_store.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_refresh_interval_shrinks_with_hotness(monkeypatch):
+    monkeypatch.setattr(config, 'SCHEDULER_MIN_INTERVAL', 60)
+    monkeypatch.setattr(config, 'SCHEDULER_MAX_INTERVAL', 3600)
+    monkeypatch.setattr(config, 'SCHEDULER_WISH_VELOCITY_SCALE', 10)
+    monkeypatch.setattr(config, 'SCHEDULER_COMMENT_RATE_SCALE', 10)
+    assert refresh_interval(0, 0) == 3600
+    assert refresh_interval(-5, -5) == 3600
+    assert refresh_interval(10, 0) == 1800
+    assert refresh_interval(10, 10) == 1200
+    assert refresh_interval(1e6, 0) == 60
+
+
+def test_scheduler_pops_earliest_due_and_skips_stale_entries():
+    scheduler = CrawlScheduler()
+    scheduler.schedule('a', 30)
+    scheduler.schedule('b', 10)
+    scheduler.schedule('c', 20)
+    scheduler.schedule('b', 40)
+    scheduler.remove('c')
+    assert len(scheduler) == 2 and 'c' not in scheduler
+    assert scheduler.next_due() == 30
+    assert scheduler.pop_due(25) is None
+    assert scheduler.pop_due(100) == 'a'
+    assert scheduler.pop_due(100) == 'b'
+    assert scheduler.pop_due(100) is None and scheduler.next_due() is None
+
+
+def test_store_tracks_movies_wishes_and_comments(store):
+    assert store.update_movies([make_movie(1, wish_count=100), make_movie(2, wish_count=10)], now=0) == ['1', '2']
+    assert store.update_movies([make_movie(1, wish_count=160)], now=3 * 3600) == []
+    assert store.active_movie_ids() == ['1']
+    assert store.wish_velocity('1', window=24 * 3600) == pytest.approx(20.0)
+    assert store.wish_velocity('2', window=24 * 3600) == 0.0
+
+    comments = [Comment('好看', '11'), Comment('无聊')]
+    assert store.add_comments('1', comments, now=1) == 2
+    assert store.add_comments('1', comments + [Comment('还行', '12')], now=2) == 1
+
+    exported = store.export_movies()
+    assert [(movie.movie_id, movie.wish_count) for movie in exported] == [('1', 160)]
+    assert [comment.text for comment in exported[0].comments] == ['好看', '无聊', '还行']
+    assert exported[0].comments[0].comment_id == '11'
+
+
+class FakeSpider:
+    def __init__(self, movies, comments):
+        self.movies = movies
+        self.comments = comments
+        self.fetched = []
+        self.closed = False
+
+    def crawl_movies(self):
+        return self.movies
+
+    def fetch_movie_comments(self, movie):
+        self.fetched.append(movie.movie_id)
+        return self.comments.get(movie.movie_id, [])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.saved = []
+
+    def save_to_csv(self, movies):
+        pass
+
+    def save_to_json(self, movies):
+        self.saved.append(movies)
+
+
+def test_daemon_cycle_crawls_hottest_new_movie_first_and_exports(store, monkeypatch):
+    monkeypatch.setattr(config, 'METADATA_ENABLED', False)
+    spider = FakeSpider([make_movie(2, wish_count=50), make_movie(1, wish_count=200000)],
+                        {'1': [Comment('好看', '11')], '2': [Comment('无聊', '21')]})
+    processor = FakeProcessor()
+    daemon = CrawlDaemon(spider, store, processor)
+    monkeypatch.setattr(daemon, '_install_signal_handlers', lambda: None)
+
+    daemon.run(max_cycles=1)
+    assert spider.closed
+    assert len(processor.saved) == 1
+    exported = {movie.movie_id: movie for movie in processor.saved[0]}
+    # 新电影同时到期，一次循环只爬取想看人数最多的一部
+    assert spider.fetched == ['1']
+    assert [comment.text for comment in exported['1'].comments] == ['好看']
+    assert exported['2'].comments == []
+
+
+def test_new_movies_are_scheduled_by_wish_count(store, monkeypatch):
+    monkeypatch.setattr(config, 'METADATA_ENABLED', False)
+    wishes = [5, 200000, 80, 3000, 80]
+    spider = FakeSpider([make_movie(i, wish_count=wish) for i, wish in enumerate(wishes, 1)], {})
+    daemon = CrawlDaemon(spider, store, FakeProcessor())
+    daemon.refresh_movie_list(now=0)
+    order = [daemon.scheduler.pop_due(0) for _ in wishes]
+    assert order == ['2', '4', '3', '5', '1']
+
+
+def test_daemon_restores_schedule(tmp_path):
+    path = str(tmp_path / 'crawl_store.sqlite3')
+    store = CrawlStore(path)
+    store.update_movies([make_movie(1, wish_count=100), make_movie(2, wish_count=50)], now=0)
+    store.save_schedule('1', next_due=500.0, last_crawled=100.0, comment_rate=2.0)
+    store.close()
+
+    daemon = CrawlDaemon(FakeSpider([], {}), CrawlStore(path), FakeProcessor())
+    daemon._restore(now=0)
+    assert daemon.scheduler.pop_due(0) == '2'
+    assert daemon.scheduler.next_due() == 500.0
+    assert daemon._stats['1'] == (100.0, 2.0)
+    daemon.store.close()
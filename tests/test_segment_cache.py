@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""segment_cache 模块测试: 缓存键命名空间、读写往返与按最近使用淘汰"""
+
+import pytest
+from segment_cache import SegmentCache, make_namespace
+
+NAMESPACE = make_namespace(set(), 'dict-v1')
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'segments.sqlite3')
+
+
+def test_namespace_depends_on_dictionary_and_stopwords():
+    assert make_namespace({'的', '了'}, 'v1') == make_namespace({'了', '的'}, 'v1')
+    assert make_namespace(set(), 'v1') != make_namespace(set(), 'v2')
+    assert make_namespace(set(), 'v1') != make_namespace({'的'}, 'v1')
+    assert SegmentCache.make_key(make_namespace(set(), 'v1'), '好看') != \
+        SegmentCache.make_key(make_namespace(set(), 'v2'), '好看')
+
+
+def test_round_trip_persists_across_connections(path):
+    cache = SegmentCache(path, max_entries=100)
+    good = SegmentCache.make_key(NAMESPACE, '很好看')
+    empty = SegmentCache.make_key(NAMESPACE, '')
+    cache.put_many([(good, ['很', '好看']), (empty, [])])
+    cache.close()
+
+    cache = SegmentCache(path, max_entries=100)
+    missing = SegmentCache.make_key(NAMESPACE, '无聊')
+    assert cache.get_many([good, empty, missing, good]) == {good: ['很', '好看'], empty: []}
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get(missing) is None
+    cache.close()
+
+
+def test_evicts_least_recently_used(path):
+    cache = SegmentCache(path, max_entries=2)
+    cache._now = 1
+    keys = [SegmentCache.make_key(NAMESPACE, text) for text in ('一', '二', '三')]
+    cache.put_many([(keys[0], ['一']), (keys[1], ['二'])])
+    cache._now = 2
+    cache.get(keys[0])
+    cache.put(keys[2], ['三'])
+    assert cache.evict() == 1
+    assert set(cache.get_many(keys)) == {keys[0], keys[2]}
+    assert cache.evict() == 0
+    cache.close()
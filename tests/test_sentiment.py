@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""sentiment 模块测试: 词ID评分、否定词/程度副词修饰与词表增长"""
+
+import numpy as np
+import pytest
+from models import Comment, Movie
+from sentiment import SentimentScorer
+from vocabulary import Vocabulary
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+def test_scores_follow_modifiers(vocabulary):
+    scorer = SentimentScorer({'好看': 1.0, '无聊': -1.0}, vocabulary)
+    comments = [['很', '好看'], ['不', '好看'], ['剧情', '无聊', '好看'], [], ['剧情']]
+    scores = scorer.score_comments([vocabulary.encode(tokens) for tokens in comments])
+    assert scores.tolist() == [1.0, -1.0, 0.0, 0.0, 0.0]
+
+
+def test_modifier_does_not_cross_comments(vocabulary):
+    scorer = SentimentScorer({'好看': 1.0}, vocabulary)
+    comment_ids = [vocabulary.encode(['不']), vocabulary.encode(['好看'])]
+    assert scorer.score_comments(comment_ids).tolist() == [0.0, 1.0]
+
+
+def test_tables_grow_with_vocabulary(vocabulary):
+    scorer = SentimentScorer({'好看': 1.0, '失望': -1.0}, vocabulary)
+    assert scorer.score_comments([vocabulary.encode(['好看'])]).tolist() == [1.0]
+    # 评分后词表新增的词同样参与评分
+    assert scorer.score_comments([vocabulary.encode(['失望'])]).tolist() == [-1.0]
+    assert len(scorer._weights) == len(vocabulary)
+
+
+def test_score_movies(vocabulary):
+    scorer = SentimentScorer({'好看': 1.0, '无聊': -1.0}, vocabulary)
+    movies = [Movie(movie_name='甲', movie_url='u1', city='北京',
+                    comments=[Comment('a'), Comment('b'), Comment('c')]),
+              Movie(movie_name='乙', movie_url='u2', city='北京', comments=[Comment('d')])]
+    comments = [['好看'], ['无聊'], ['好看'], ['剧情']]
+    results = scorer.score_movies(movies, [vocabulary.encode(tokens) for tokens in comments])
+    assert results[0] == (round(1 / 3, 4), round(2 / 3, 4))
+    assert results[1] == (None, None)
+
+
+def test_matches_reference_on_many_comments(vocabulary):
+    rng = np.random.default_rng(0)
+    words = ['好看', '无聊', '不', '很', '剧情', '有点', '特效']
+    lexicon = {'好看': 1.0, '无聊': -0.8}
+    scorer = SentimentScorer(lexicon, vocabulary)
+    comments = [[words[i] for i in rng.integers(0, len(words), rng.integers(0, 8))]
+                for _ in range(500)]
+    scores = scorer.score_comments([vocabulary.encode(tokens) for tokens in comments])
+
+    for tokens, score in zip(comments, scores):
+        values = []
+        for i, word in enumerate(tokens):
+            modifier = 1.0
+            if i:
+                modifier = -1.0 if tokens[i - 1] == '不' else {'很': 1.5, '有点': 0.8}.get(tokens[i - 1], 1.0)
+            values.append(lexicon.get(word, 0.0) * modifier)
+        magnitude = sum(abs(value) for value in values)
+        assert score == pytest.approx(sum(values) / magnitude if magnitude else 0.0)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""snapshot_archive 模块测试: 分区写入、清单元数据与按清单裁剪分区"""
+
+import os
+import time
+import pytest
+from conftest import make_movie
+from models import Comment
+from snapshot_archive import SnapshotArchive, compress, decompress, resolve_compression
+
+
+def timestamp(text):
+    return time.mktime(time.strptime(text, '%Y-%m-%d %H:%M'))
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / 'archive'), compression='gzip')
+    archive.append([make_movie(1, 'beijing', 100, [Comment('好看', '11', 5, '2026-05-01 10:00:00')]),
+                    make_movie(2, 'wuhan', 5000)], timestamp('2026-05-01 12:00'))
+    archive.append([make_movie(1, 'beijing', 300), make_movie(3, 'beijing', 20)],
+                   timestamp('2026-05-03 12:00'))
+    return archive
+
+
+def test_gzip_round_trip():
+    assert resolve_compression('gzip') == 'gzip'
+    assert decompress(compress(b'data' * 100, 'gzip'), 'gzip') == b'data' * 100
+    with pytest.raises(ValueError):
+        resolve_compression('lz4')
+
+
+def test_manifest_records_partition_metadata(archive):
+    manifest = SnapshotArchive(archive.root).manifest()
+    assert [(entry['date'], entry['city'], entry['rows']) for entry in manifest] == \
+        [('2026-05-01', 'beijing', 1), ('2026-05-01', 'wuhan', 1), ('2026-05-03', 'beijing', 2)]
+    first = manifest[0]
+    assert first['path'].startswith('2026-05-01/beijing/') and first['path'].endswith('.json.gz')
+    assert (first['comments'], first['comment_time_min'], first['wish_min'], first['wish_max']) == \
+        (1, '2026-05-01 10:00:00', 100, 100)
+    assert manifest[2]['wish_min'] == 20 and manifest[2]['wish_max'] == 300
+
+
+def test_partitions_are_pruned_by_manifest(archive):
+    assert [entry['city'] for entry in archive.partitions(city='wuhan')] == ['wuhan']
+    assert len(archive.partitions(since='2026-05-02')) == 1
+    assert len(archive.partitions(until='2026-05-02')) == 2
+    assert [entry['city'] for entry in archive.partitions(min_wish=1000)] == ['wuhan']
+    assert [entry['date'] for entry in archive.partitions(max_wish=50)] == ['2026-05-03']
+
+
+def test_load_does_not_open_pruned_partitions(archive):
+    # 删除会被清单裁剪掉的分区，按条件读取仍然成功
+    for entry in archive.partitions(city='wuhan'):
+        os.remove(os.path.join(archive.root, entry['path']))
+    movies = archive.load(city='beijing', min_wish=50)
+    assert [(movie.movie_name, movie.wish_count) for movie in movies] == [('电影1', 100), ('电影1', 300)]
+    assert movies[0].comments == [Comment('好看', '11', 5, '2026-05-01 10:00:00')]
+
+
+def test_appends_in_the_same_second_get_distinct_partitions(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / 'archive'), compression='gzip')
+    base = timestamp('2026-05-01 12:00')
+    archive.append([make_movie(1, 'beijing', 100)], base)
+    archive.append([make_movie(2, 'beijing', 200)], base + 0.4)
+    archive.append([make_movie(3, 'beijing', 300)], base + 0.4)
+    manifest = SnapshotArchive(archive.root).manifest()
+    assert len({entry['path'] for entry in manifest}) == 3
+    assert [movie.movie_name for movie in archive.load()] == ['电影1', '电影2', '电影3']
+
+
+def test_duplicate_manifest_paths_are_dropped(archive):
+    manifest = archive.manifest()
+    manifest.append(dict(manifest[0], rows=99))
+    archive._save_manifest()
+    reloaded = SnapshotArchive(archive.root).manifest()
+    assert len(reloaded) == 3
+    assert [entry['rows'] for entry in reloaded if entry['path'] == manifest[0]['path']] == [99]
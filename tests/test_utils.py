@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""utils 模块测试: 请求日志抽样过滤与后台队列日志输出"""
+
+import logging
+import logging.handlers
+import pytest
+import utils
+from utils import REQUEST_LOGGER, SamplingFilter, setup_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """测试结束后停止后台日志线程，恢复根记录器和请求记录器的配置"""
+    root = logging.getLogger()
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    handlers, level, filters = root.handlers[:], root.level, request_logger.filters[:]
+    yield
+    utils._stop_log_listener()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    request_logger.filters[:] = filters
+
+
+def make_record(level, msg='请求 %s', args=('url',)):
+    return logging.LogRecord(REQUEST_LOGGER, level, __file__, 1, msg, args, None)
+
+
+def test_sampling_filter_passes_one_in_n_and_all_warnings():
+    sampler = SamplingFilter(3)
+    passed = [sampler.filter(make_record(logging.INFO)) for _ in range(7)]
+    assert passed == [True, False, False, True, False, False, True]
+    assert all(sampler.filter(make_record(logging.WARNING)) for _ in range(3))
+    assert SamplingFilter(0).rate == 1
+
+
+def test_dropped_records_are_never_formatted():
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("被丢弃的记录不应格式化")
+
+    sampler = SamplingFilter(2)
+    sampler.filter(make_record(logging.INFO))
+    assert not sampler.filter(make_record(logging.INFO, args=(Exploding(),)))
+
+
+def test_queue_logging_writes_through_listener(restore_logging, capsys):
+    listener = setup_logging(logging.INFO, use_queue=True, request_sample_rate=3)
+    assert listener is not None
+    root = logging.getLogger()
+    assert [type(handler) for handler in root.handlers] == [logging.handlers.QueueHandler]
+
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    for i in range(7):
+        request_logger.info("请求第 %d 页", i)
+    request_logger.warning("请求被限流")
+    logging.debug("不会输出的调试信息")
+    logging.info("爬取完成")
+    # 停止监听线程时输出队列中剩余的日志
+    utils._stop_log_listener()
+
+    lines = capsys.readouterr().err.splitlines()
+    assert [line.split(' - ')[-1] for line in lines] == \
+        ['请求第 0 页', '请求第 3 页', '请求第 6 页', '请求被限流', '爬取完成']
+
+
+def test_direct_logging_without_queue(restore_logging, capsys):
+    assert setup_logging(logging.INFO, use_queue=False, request_sample_rate=1) is None
+    assert logging.getLogger(REQUEST_LOGGER).filters == []
+    logging.getLogger(REQUEST_LOGGER).info("请求 %s", 'url')
+    assert capsys.readouterr().err.rstrip().endswith('请求 url')
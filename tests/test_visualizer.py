@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""visualizer 模块测试: 批量图表描述与 PNG/SVG 渲染输出路径"""
+
+import os
+import pytest
+import config
+from conftest import make_movie
+from visualizer import Visualizer, chart_path
+
+# 测试环境可能没有中文字体
+pytestmark = pytest.mark.filterwarnings('ignore:Glyph .* missing from font')
+
+
+@pytest.fixture
+def chart_dir(tmp_path, monkeypatch):
+    chart_dir = str(tmp_path / 'charts')
+    monkeypatch.setattr(config, 'CHART_BATCH_DIR', chart_dir)
+    monkeypatch.setattr(config, 'CHART_DPI', 30)
+    return chart_dir
+
+
+@pytest.fixture
+def movies():
+    return [make_movie(1, 'wuhan', 100, country='中国大陆', release_date='2026-05-01'),
+            make_movie(2, 'wuhan', 300, country='美国', release_date='2026-05-08'),
+            make_movie(3, 'beijing', 200, country='中国大陆 / 美国', release_date='待定')]
+
+
+def test_chart_path_replaces_extension(monkeypatch):
+    assert chart_path('images/charts/a.png', 'svg') == 'images/charts/a.svg'
+    monkeypatch.setattr(config, 'CHART_FORMAT', 'svg')
+    assert chart_path('images/top5.png') == 'images/top5.svg'
+
+
+def test_build_chart_specs_for_two_cities(chart_dir, movies):
+    specs = Visualizer().build_chart_specs(movies)
+    assert [(spec['kind'], os.path.relpath(spec['filepath'], chart_dir)) for spec in specs] == [
+        ('bar', os.path.join('city', 'beijing_top.png')),
+        ('bar', os.path.join('city', 'wuhan_top.png')),
+        ('barh', 'country_wish.png'),
+        ('line', 'release_week_wish.png'),
+    ]
+    # 城市内按想看人数降序
+    assert specs[1]['labels'] == ['电影2', '电影1'] and specs[1]['values'] == [300, 100]
+    assert specs[2]['labels'] == ['中国大陆', '美国'] and specs[2]['values'] == [300, 300]
+    assert specs[3]['values'] == [100, 300]
+
+
+@pytest.mark.parametrize('image_format', ['png', 'svg'])
+def test_render_charts_serially(chart_dir, movies, monkeypatch, image_format):
+    monkeypatch.setattr(config, 'CHART_FORMAT', image_format)
+    visualizer = Visualizer()
+    specs = visualizer.build_chart_specs(movies)
+    rendered = visualizer.render_charts(specs + [dict(specs[0], values=[], labels=[])], workers=1)
+    assert rendered == [chart_path(spec['filepath'], image_format) for spec in specs]
+    assert all(path.endswith(f".{image_format}") and os.path.getsize(path) > 0 for path in rendered)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""vocabulary 模块测试: 编码解码、追加保存、跨对象刷新与向量化计数"""
+
+from array import array
+import numpy as np
+import pytest
+from vocabulary import HEADER_PREFIX, Vocabulary, get_vocabulary
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'vocabulary.txt')
+
+
+def test_encode_assigns_stable_ids(path):
+    vocabulary = Vocabulary(path)
+    ids = vocabulary.encode(['剧情', '特效', '剧情'])
+    assert isinstance(ids, array) and ids.tolist() == [0, 1, 0]
+    assert vocabulary.encode(iter(['特效', '演员'])).tolist() == [1, 2]
+    assert vocabulary.decode(np.array([2, 0])) == ['演员', '剧情']
+    assert vocabulary.lookup('特效') == 1
+    assert vocabulary.lookup('不存在') is None
+    assert len(vocabulary) == 3
+
+
+def test_save_appends_and_reload_keeps_ids(path):
+    vocabulary = Vocabulary(path)
+    vocabulary.encode(['剧情', '特效'])
+    vocabulary.save()
+    vocabulary.encode(['演员'])
+    vocabulary.save()
+    vocabulary.save()
+
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == f"{HEADER_PREFIX}{vocabulary.uid}\n剧情\n特效\n演员\n"
+    reloaded = Vocabulary(path)
+    assert reloaded.uid == vocabulary.uid
+    assert reloaded.encode(['演员', '剧情']).tolist() == [2, 0]
+
+
+def test_empty_vocabulary_is_saved_with_header(path):
+    vocabulary = Vocabulary(path)
+    vocabulary.save()
+    assert Vocabulary(path).uid == vocabulary.uid
+
+
+def test_reader_refreshes_words_appended_by_writer(path):
+    writer = Vocabulary(path)
+    writer.encode(['剧情'])
+    writer.save()
+    reader = Vocabulary(path)
+
+    writer.encode(['特效', '演员'])
+    writer.save()
+    # 未知ID时读取文件末尾新增的词
+    assert reader.decode([2, 1]) == ['演员', '特效']
+    assert reader.lookup('演员') == 2
+
+
+def test_partial_line_is_ignored(path):
+    writer = Vocabulary(path)
+    writer.encode(['剧情'])
+    writer.save()
+    with open(path, 'ab') as f:
+        f.write('未写'.encode('utf-8'))
+    assert len(Vocabulary(path)) == 1
+
+
+def test_concurrent_writer_is_detected(path):
+    first = Vocabulary(path)
+    first.encode(['剧情'])
+    first.save()
+    second = Vocabulary(path)
+    second.encode(['特效'])
+    second.save()
+    first.encode(['演员'])
+    with pytest.raises(RuntimeError):
+        first.save()
+
+
+def test_valid_mask_grows_incrementally(path):
+    vocabulary = Vocabulary(path)
+    vocabulary.encode(['剧情', '的', '好', '2024'])
+    assert vocabulary.valid_mask({'的'}).tolist() == [True, False, False, False]
+    vocabulary.encode(['特效'])
+    assert vocabulary.valid_mask({'的'}).tolist() == [True, False, False, False, True]
+    assert vocabulary.valid_mask({'剧情'}).tolist() == [False, False, False, False, True]
+
+
+def test_count_matches_python_counting(path):
+    vocabulary = Vocabulary(path)
+    comments = [['剧情', '的', '特效'], [], ['剧情', '剧情', '1']]
+    ids, counts = vocabulary.count([vocabulary.encode(tokens) for tokens in comments], {'的'})
+    assert dict(zip(vocabulary.decode(ids), counts.tolist())) == {'剧情': 3, '特效': 1}
+    ids, counts = vocabulary.count([])
+    assert len(ids) == 0 and len(counts) == 0
+
+
+def test_get_vocabulary_is_shared_per_path(path):
+    assert get_vocabulary(path) is get_vocabulary(path)
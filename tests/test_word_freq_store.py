@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""word_freq_store 模块测试: 快照合并、保存加载与跨运行复用"""
+
+import os
+from collections import Counter
+from types import SimpleNamespace
+import pytest
+import word_freq_store
+from conftest import make_movie
+from vocabulary import Vocabulary
+from word_freq_store import FrequencySnapshot, FrequencyStore
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+def test_merge_adds_counts(vocabulary):
+    first = FrequencySnapshot.from_counter(Counter({'剧情': 3, '特效': 1}), vocabulary)
+    second = FrequencySnapshot.from_counter(Counter({'特效': 2, '演员': 5}), vocabulary)
+    merged = FrequencySnapshot.merge([first, second, FrequencySnapshot.empty(vocabulary)])
+    assert merged.to_counter() == Counter({'剧情': 3, '特效': 3, '演员': 5})
+    assert merged.total == 11
+    assert merged.most_common(2) == [('演员', 5), ('剧情', 3)]
+
+
+def test_most_common_breaks_ties_by_word(vocabulary):
+    snapshot = FrequencySnapshot.from_counter(Counter({'b': 2, 'a': 2, 'c': 1}), vocabulary)
+    assert snapshot.most_common(3) == [('a', 2), ('b', 2), ('c', 1)]
+    assert snapshot.words_with_count(1) == [('c', 1)]
+
+
+def test_save_and_load_round_trip(tmp_path, vocabulary):
+    snapshot = FrequencySnapshot.from_counter(Counter({'好看': 4, '无聊': 1}), vocabulary)
+    path = str(tmp_path / 'movie.npz')
+    snapshot.save(path)
+    vocabulary.save()
+    loaded = FrequencySnapshot.load(path, Vocabulary(vocabulary.filepath))
+    assert loaded.to_counter() == snapshot.to_counter()
+
+
+def test_load_rejects_snapshot_of_other_vocabulary(tmp_path, vocabulary):
+    path = str(tmp_path / 'movie.npz')
+    FrequencySnapshot.from_counter(Counter({'好看': 1}), vocabulary).save(path)
+    with pytest.raises(ValueError):
+        FrequencySnapshot.load(path, Vocabulary(str(tmp_path / 'other.txt')))
+
+
+def test_store_reuses_unchanged_movies_and_filters_by_city(tmp_path, vocabulary):
+    store = FrequencyStore(str(tmp_path / 'word_freq'), vocabulary)
+    wuhan = make_movie('1', 'wuhan', comments=['好看'])
+    beijing = make_movie('2', 'beijing', comments=['无聊'])
+    store.save_movie('20260101-000000', wuhan,
+                     FrequencySnapshot.from_counter(Counter({'好看': 2}), vocabulary), 'ns')
+    store.save_movie('20260101-000000', beijing,
+                     FrequencySnapshot.from_counter(Counter({'无聊': 1}), vocabulary), 'ns')
+    store.commit('20260101-000000')
+
+    store = FrequencyStore(str(tmp_path / 'word_freq'), Vocabulary(vocabulary.filepath))
+    assert store.find_reusable(wuhan, 'ns') == ('20260101-000000', 'wuhan_1')
+    assert store.find_reusable(wuhan, 'other-namespace') is None
+    assert store.find_reusable(make_movie('1', 'wuhan', comments=['变了']), 'ns') is None
+    assert store.merged(city='wuhan').to_counter() == Counter({'好看': 2})
+    assert store.merged().total == 3
+
+    store.reuse_movie('20260102-000000', '20260101-000000', 'wuhan_1')
+    store.commit('20260102-000000')
+    assert os.listdir(str(tmp_path / 'word_freq' / '20260102-000000')) == ['index.json']
+    assert store.merged_range(since='20260102').to_counter() == Counter({'好看': 2})
+
+
+def test_top_keeps_highest_counts_in_id_order(vocabulary):
+    snapshot = FrequencySnapshot.from_counter(Counter({'a': 1, 'b': 5, 'c': 3, 'd': 4}), vocabulary)
+    top = snapshot.top(2)
+    assert top.to_counter() == Counter({'b': 5, 'd': 4})
+    assert list(top.ids) == sorted(top.ids)
+    assert snapshot.top(10) is snapshot
+
+
+def test_new_run_ids_in_the_same_second_do_not_collide(tmp_path, vocabulary, monkeypatch):
+    monkeypatch.setattr(word_freq_store, 'time', SimpleNamespace(strftime=lambda fmt: '20260101-000000'))
+    store = FrequencyStore(str(tmp_path / 'word_freq'), vocabulary)
+    first, second = store.new_run_id(), store.new_run_id()
+    assert first == '20260101-000000' and second == '20260101-000000-001'
+    store.save_movie(first, make_movie('1', 'wuhan', comments=['好看']),
+                     FrequencySnapshot.from_counter(Counter({'好看': 1}), vocabulary), 'ns')
+    store.commit(first)
+    store.commit(second)
+    assert store.run_ids() == [first, second]
+    assert FrequencyStore(store.root, vocabulary).merged().total == 0
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""wordcloud_generator 模块测试: 进程池分批分词与串行结果一致、批量词云按渲染摘要跳过未变化的图片"""
+
+import json
+import os
+from collections import Counter
+import pytest
+import config
+from conftest import make_movie
+from vocabulary import Vocabulary
+from word_freq_store import FrequencySnapshot
+from wordcloud_generator import WordCloudGenerator
+
+
+@pytest.fixture
+def vocabulary(tmp_path):
+    return Vocabulary(str(tmp_path / 'vocabulary.txt'))
+
+
+@pytest.fixture
+def generator():
+    generator = WordCloudGenerator(use_cache=False, approximate=False)
+    yield generator
+    generator.close()
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    batch_dir = str(tmp_path / 'wordclouds')
+    monkeypatch.setattr(config, 'WORDCLOUD_BATCH_DIR', batch_dir)
+    monkeypatch.setattr(config, 'WORDCLOUD_WIDTH', 160)
+    monkeypatch.setattr(config, 'WORDCLOUD_HEIGHT', 80)
+    return batch_dir
+
+
+COMMENTS = ['这部电影的剧情很精彩，演员演技在线', '特效画面震撼，配乐也很好听', '剧情拖沓，浪费时间',
+            '演员的表演很自然，故事感人', '画面很美但是剧情一般', '这部电影的剧情很精彩，演员演技在线',
+            '配乐和特效都不错', '故事节奏紧凑，值得一看']
+
+
+@pytest.mark.parametrize('approximate', [False, True])
+def test_process_pool_batches_match_serial_counts(approximate):
+    serial = WordCloudGenerator(use_cache=False, approximate=approximate)
+    pooled = WordCloudGenerator(use_cache=False, approximate=approximate)
+    try:
+        expected = serial.segment_comments(COMMENTS, workers=1, batch_size=len(COMMENTS))
+        # 每批 3 条，共 3 批，分发到 2 个工作进程
+        actual = pooled.segment_comments(COMMENTS, workers=2, batch_size=3)
+        assert len(expected) > 0
+        assert dict(actual.most_common(len(actual))) == dict(expected.most_common(len(expected)))
+    finally:
+        serial.close()
+        pooled.close()
+
+
+def snapshots_for(vocabulary, *counts):
+    return [FrequencySnapshot.from_counter(Counter(c), vocabulary) for c in counts]
+
+
+def test_batch_wordclouds_skip_unchanged_and_rerender_changed(generator, vocabulary, batch_dir):
+    movies = [make_movie(1, 'wuhan'), make_movie(2, 'wuhan'), make_movie(3, 'beijing')]
+    counts = [{'剧情': 5, '特效': 2}, {'演员': 3}, {'画面': 4, '配乐': 1}]
+    first = generator.generate_wordclouds(movies, snapshots_for(vocabulary, *counts), preview=False, workers=1)
+    assert sorted(os.path.relpath(path, batch_dir) for path in first) == \
+        sorted(os.path.join(*parts) for parts in [('movie', 'wuhan_1.png'), ('movie', 'wuhan_2.png'),
+                                                  ('movie', 'beijing_3.png'), ('city', 'wuhan.png'),
+                                                  ('city', 'beijing.png')])
+    assert all(os.path.getsize(path) > 0 for path in first)
+    with open(os.path.join(batch_dir, 'manifest.json'), encoding='utf-8') as f:
+        assert set(json.load(f)) == set(first)
+
+    # 输入未变化时不重新渲染
+    assert generator.generate_wordclouds(movies, snapshots_for(vocabulary, *counts),
+                                         preview=False, workers=1) == []
+
+    # 只有词频变化的电影及其所在城市重新渲染
+    counts[2] = {'画面': 4, '配乐': 2}
+    changed = generator.generate_wordclouds(movies, snapshots_for(vocabulary, *counts), preview=False, workers=1)
+    assert sorted(os.path.relpath(path, batch_dir) for path in changed) == \
+        [os.path.join('city', 'beijing.png'), os.path.join('movie', 'beijing_3.png')]
+
+    # 删除的图片即使摘要未变也会重新渲染
+    os.remove(changed[0])
+    assert generator.generate_wordclouds(movies, snapshots_for(vocabulary, *counts),
+                                         preview=False, workers=1) == [changed[0]]
+
+
+def test_preview_uses_separate_directory_and_manifest(generator, vocabulary, batch_dir):
+    movies = [make_movie(1, 'wuhan')]
+    snapshots = snapshots_for(vocabulary, {'剧情': 5, '特效': 2})
+    full = generator.generate_wordclouds(movies, snapshots, preview=False, workers=1)
+    preview = generator.generate_wordclouds(movies, snapshots, preview=True, workers=1)
+    assert len(preview) == len(full) == 2
+    assert all(path.startswith(os.path.join(batch_dir, 'preview') + os.sep) for path in preview)
+    assert os.path.exists(os.path.join(batch_dir, 'preview', 'manifest.json'))
+    assert generator.generate_wordclouds(movies, snapshots, preview=True, workers=1) == []
+
+
+def test_empty_snapshots_are_not_rendered(generator, vocabulary, batch_dir):
+    movies = [make_movie(1, 'wuhan')]
+    assert generator.generate_wordclouds(movies, [FrequencySnapshot.empty(vocabulary)],
+                                         preview=False, workers=1) == []
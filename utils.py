@@ -1,112 +1,279 @@
-# -*- coding: utf-8 -*-
-"""
-工具函数模块
-提供通用的工具函数
-"""
-
-import os
-import time
-import logging
-from typing import Optional
-
-
-def setup_logging(log_level=logging.INFO):
-    """
-    配置日志系统
-    
-    Args:
-        log_level: 日志级别，默认为INFO
-    """
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-
-def ensure_dir(directory: str):
-    """
-    确保目录存在，如果不存在则创建
-    
-    Args:
-        directory: 目录路径
-    """
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-        logging.info(f"创建目录: {directory}")
-
-
-def safe_request(func):
-    """
-    请求装饰器，添加异常处理和重试机制
-    
-    Args:
-        func: 请求函数
-    """
-    def wrapper(*args, **kwargs):
-        from config import MAX_RETRIES
-        for attempt in range(MAX_RETRIES):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                logging.warning(f"请求失败 (尝试 {attempt + 1}/{MAX_RETRIES}): {str(e)}")
-                if attempt == MAX_RETRIES - 1:
-                    logging.error(f"请求最终失败: {str(e)}")
-                    raise
-                time.sleep(2 ** attempt)  # 指数退避
-        return None
-    return wrapper
-
-
-def clean_text(text: str) -> str:
-    """
-    清理文本，去除多余空白字符
-    
-    Args:
-        text: 原始文本
-        
-    Returns:
-        清理后的文本
-    """
-    if not text:
-        return ""
-    return " ".join(text.split())
-
-
-def extract_number(text: str) -> int:
-    """
-    从文本中提取数字
-    
-    Args:
-        text: 包含数字的文本
-        
-    Returns:
-        提取的数字，如果提取失败返回0
-    """
-    if not text:
-        return 0
-    import re
-    numbers = re.findall(r'\d+', text.replace(',', ''))
-    if numbers:
-        return int(numbers[0])
-    return 0
-
-
-def get_movie_id_from_url(url: str) -> Optional[str]:
-    """
-    从豆瓣电影URL中提取电影ID
-    
-    Args:
-        url: 豆瓣电影URL
-        
-    Returns:
-        电影ID，如果提取失败返回None
-    """
-    if not url:
-        return None
-    import re
-    match = re.search(r'/subject/(\d+)/', url)
-    if match:
-        return match.group(1)
-    return None
-
+# -*- coding: utf-8 -*-
+"""
+工具函数模块
+提供通用的工具函数
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import itertools
+import threading
+from functools import lru_cache
+from typing import Optional
+
+
+# 每个请求一条的日志（请求 URL、每页结果等）使用的记录器，按 LOG_REQUEST_SAMPLE_RATE 抽样输出
+REQUEST_LOGGER = 'douban.request'
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_log_listener = None
+_log_handler = None
+
+
+class SamplingFilter(logging.Filter):
+    """每 N 条记录放行 1 条的日志过滤器，警告及以上级别总是放行"""
+
+    def __init__(self, rate: int):
+        """
+        初始化过滤器
+
+        Args:
+            rate: 抽样间隔，1 表示全部放行
+        """
+        super().__init__()
+        self.rate = max(int(rate), 1)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        # 被丢弃的记录不会格式化消息（配合 %-style 参数延迟格式化）
+        return next(self._counter) % self.rate == 0
+
+
+def setup_logging(log_level=logging.INFO, use_queue: bool = None, request_sample_rate: int = None):
+    """
+    配置日志系统
+    
+    启用队列时，调用方只把日志记录放入内存队列，由后台 QueueListener 线程写入终端，
+    爬取速度不受终端输出速度影响；程序退出时自动输出剩余日志。
+    
+    Args:
+        log_level: 日志级别，默认为INFO
+        use_queue: 是否通过队列在后台线程输出日志，默认使用配置文件中的值
+        request_sample_rate: 每个请求一条的日志每 N 条输出 1 条，默认使用配置文件中的值
+        
+    Returns:
+        启用队列时返回 QueueListener，否则返回None
+    """
+    global _log_listener, _log_handler
+    from config import LOG_QUEUE_ENABLED, LOG_REQUEST_SAMPLE_RATE
+    if use_queue is None:
+        use_queue = LOG_QUEUE_ENABLED
+    if request_sample_rate is None:
+        request_sample_rate = LOG_REQUEST_SAMPLE_RATE
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    _stop_log_listener()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _log_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _log_listener.start()
+        _log_handler = handler
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+    else:
+        root.addHandler(handler)
+    
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    for old in request_logger.filters[:]:
+        request_logger.removeFilter(old)
+    if request_sample_rate > 1:
+        request_logger.addFilter(SamplingFilter(request_sample_rate))
+    return _log_listener
+
+
+def _stop_log_listener():
+    """停止后台日志线程（输出队列中剩余的日志）"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def _direct_logging_in_child():
+    """fork 出的子进程没有后台日志线程，把队列处理器替换为直接输出"""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener = None
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        if isinstance(old, logging.handlers.QueueHandler):
+            root.removeHandler(old)
+            root.addHandler(_log_handler)
+
+
+atexit.register(_stop_log_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_direct_logging_in_child)
+
+
+def ensure_dir(directory: str):
+    """
+    确保目录存在，如果不存在则创建
+    
+    Args:
+        directory: 目录路径
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+        logging.info(f"创建目录: {directory}")
+
+
+def load_jieba():
+    """
+    延迟导入 jieba，并将词典缓存文件放在项目数据目录中
+    
+    jieba 首次分词时需要构建前缀词典（约1秒），构建结果会序列化到缓存文件；
+    默认缓存位于系统临时目录，可能被清理，放在数据目录可跨运行、跨进程复用。
+    
+    Returns:
+        jieba 模块
+    """
+    import jieba
+    from config import DATA_DIR, JIEBA_CACHE_FILE
+    
+    if jieba.dt.cache_file is None:
+        ensure_dir(DATA_DIR)
+        jieba.dt.tmp_dir = os.path.abspath(DATA_DIR)
+        jieba.dt.cache_file = JIEBA_CACHE_FILE
+    return jieba
+
+
+def prewarm_jieba(background: bool = False) -> Optional[threading.Thread]:
+    """
+    预热 jieba 词典（从数据目录中的缓存加载，缓存不存在时构建）
+    
+    Args:
+        background: 是否在后台线程中预热，可与爬取等网络操作并行
+        
+    Returns:
+        后台预热时返回线程对象，否则返回None
+    """
+    def warm_up():
+        start = time.perf_counter()
+        load_jieba().initialize()
+        logging.info("jieba 词典预热完成，耗时 %.2f 秒", time.perf_counter() - start)
+    
+    if not background:
+        warm_up()
+        return None
+    thread = threading.Thread(target=warm_up, name='jieba-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+
+@lru_cache(maxsize=None)
+def resolve_font_path() -> Optional[str]:
+    """
+    查找可用的中文字体（结果缓存，每个进程只查找一次），词云和图表共用
+    
+    Returns:
+        字体路径，未找到返回None
+    """
+    from config import WORDCLOUD_FONT_PATH
+    
+    if os.path.exists(WORDCLOUD_FONT_PATH):
+        return WORDCLOUD_FONT_PATH
+    
+    # 尝试系统字体路径
+    system_fonts = [
+        'C:/Windows/Fonts/simhei.ttf',
+        'C:/Windows/Fonts/simsun.ttc',
+        'C:/Windows/Fonts/msyh.ttc',
+    ]
+    for font in system_fonts:
+        if os.path.exists(font):
+            return font
+    
+    logging.warning("未找到中文字体，词云和图表可能无法正确显示中文")
+    return None
+
+
+def safe_request(func):
+    """
+    请求装饰器，添加异常处理和重试机制
+    
+    Args:
+        func: 请求函数
+    """
+    def wrapper(*args, **kwargs):
+        from config import MAX_RETRIES
+        for attempt in range(MAX_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logging.warning(f"请求失败 (尝试 {attempt + 1}/{MAX_RETRIES}): {str(e)}")
+                if attempt == MAX_RETRIES - 1:
+                    logging.error(f"请求最终失败: {str(e)}")
+                    raise
+                time.sleep(2 ** attempt)  # 指数退避
+        return None
+    return wrapper
+
+
+def clean_text(text: str) -> str:
+    """
+    清理文本，去除多余空白字符
+    
+    Args:
+        text: 原始文本
+        
+    Returns:
+        清理后的文本
+    """
+    if not text:
+        return ""
+    return " ".join(text.split())
+
+
+def extract_number(text: str) -> int:
+    """
+    从文本中提取数字
+    
+    Args:
+        text: 包含数字的文本
+        
+    Returns:
+        提取的数字，如果提取失败返回0
+    """
+    if not text:
+        return 0
+    import re
+    numbers = re.findall(r'\d+', text.replace(',', ''))
+    if numbers:
+        return int(numbers[0])
+    return 0
+
+
+def get_movie_id_from_url(url: str) -> Optional[str]:
+    """
+    从豆瓣电影URL中提取电影ID
+    
+    Args:
+        url: 豆瓣电影URL
+        
+    Returns:
+        电影ID，如果提取失败返回None
+    """
+    if not url:
+        return None
+    import re
+    match = re.search(r'/subject/(\d+)/', url)
+    if match:
+        return match.group(1)
+    return None
+
@@ -1,106 +1,319 @@
-# -*- coding: utf-8 -*-
-"""
-可视化模块
-负责生成数据可视化图表
-"""
-
-import logging
-import matplotlib.pyplot as plt
-import matplotlib
-from typing import List, Dict
-import config
-from utils import ensure_dir
-
-# 设置中文字体
-matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-
-
-class Visualizer:
-    """可视化类"""
-    
-    def __init__(self):
-        """初始化可视化器"""
-        pass
-    
-    def plot_top_movies(self, movies: List[Dict], top_n: int = None, filepath: str = None):
-        """
-        绘制Top N电影柱状图
-        
-        Args:
-            movies: 电影列表（已排序）
-            top_n: 显示前N部电影，默认使用配置文件中的值
-            filepath: 保存路径，默认使用配置文件中的路径
-        """
-        if top_n is None:
-            top_n = config.TOP_N_MOVIES
-        
-        if filepath is None:
-            filepath = config.TOP5_IMAGE_FILE
-        
-        ensure_dir(config.IMAGES_DIR)
-        
-        try:
-            # 获取Top N电影
-            top_movies = movies[:top_n]
-            
-            if not top_movies:
-                logging.warning("没有电影数据可绘制")
-                return
-            
-            # 提取数据
-            movie_names = [movie.get('movie_name', '未知') for movie in top_movies]
-            wish_counts = [movie.get('wish_count', 0) for movie in top_movies]
-            
-            # 处理电影名称过长的情况
-            max_name_length = 15
-            movie_names_display = []
-            for name in movie_names:
-                if len(name) > max_name_length:
-                    movie_names_display.append(name[:max_name_length] + '...')
-                else:
-                    movie_names_display.append(name)
-            
-            # 创建图表
-            plt.figure(figsize=(12, 6))
-            bars = plt.bar(range(len(movie_names_display)), wish_counts, 
-                          color='steelblue', alpha=0.8, edgecolor='navy', linewidth=1.2)
-            
-            # 在柱状图上添加数值标签
-            for i, (bar, count) in enumerate(zip(bars, wish_counts)):
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{count}',
-                        ha='center', va='bottom', fontsize=10, fontweight='bold')
-            
-            # 设置标题和标签
-            plt.title(config.CHART_TITLE, fontsize=16, fontweight='bold', pad=20)
-            plt.xlabel(config.CHART_XLABEL, fontsize=12)
-            plt.ylabel(config.CHART_YLABEL, fontsize=12)
-            
-            # 设置x轴刻度
-            plt.xticks(range(len(movie_names_display)), movie_names_display, 
-                      rotation=45, ha='right', fontsize=10)
-            
-            # 设置y轴从0开始
-            plt.ylim(bottom=0)
-            
-            # 添加网格线
-            plt.grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # 调整布局
-            plt.tight_layout()
-            
-            # 保存图片
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
-            logging.info(f"图表已保存到: {filepath}")
-            
-            # 显示图表（可选）
-            # plt.show()
-            
-            plt.close()
-            
-        except Exception as e:
-            logging.error(f"生成图表失败: {str(e)}")
-            raise
-
+# -*- coding: utf-8 -*-
+"""
+可视化模块
+负责生成数据可视化图表
+
+使用 matplotlib 面向对象接口（Figure + Agg/SVG 画布）直接绘图，不使用 pyplot 全局状态，
+导入本模块不会修改全局 rcParams。每张图表由一个可序列化的图表描述（字典）定义，
+多张图表可分发到进程池并行渲染，字体和样式在每个进程中只解析一次。
+
+图表描述字段:
+    kind     图表类型: 'bar' 柱状图, 'barh' 横向柱状图, 'line' 折线图
+    filepath 保存路径（扩展名由输出格式决定）
+    title / xlabel / ylabel  标题和坐标轴标签
+    labels   类别标签（柱状图）或横坐标刻度（折线图）
+    values   数值列表
+"""
+
+import os
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List
+import config
+from utils import ensure_dir, resolve_font_path
+from models import Movie
+
+# 类别标签的最大显示长度
+MAX_LABEL_LENGTH = 15
+
+# 各类图表的固定边距（比 bbox_inches='tight' 或自动布局少一次完整绘制）
+CHART_MARGINS = {
+    'bar': {'left': 0.08, 'right': 0.97, 'top': 0.88, 'bottom': 0.3},
+    'barh': {'left': 0.2, 'right': 0.95, 'top': 0.9, 'bottom': 0.08},
+    'line': {'left': 0.08, 'right': 0.97, 'top': 0.88, 'bottom': 0.2},
+}
+
+
+@lru_cache(maxsize=None)
+def chart_style() -> Dict:
+    """
+    图表样式参数（每个进程只解析一次字体）
+
+    Returns:
+        渲染时通过 rc_context 临时生效的 rcParams 字典
+    """
+    from matplotlib import font_manager
+
+    families = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS', 'DejaVu Sans']
+    font_path = resolve_font_path()
+    if font_path:
+        font_manager.fontManager.addfont(font_path)
+        families.insert(0, font_manager.FontProperties(fname=font_path).get_name())
+    return {
+        'font.family': 'sans-serif',
+        'font.sans-serif': families,
+        'axes.unicode_minus': False,  # 解决负号显示问题
+        'svg.fonttype': 'none',  # SVG 中保留文字而不转换为路径，文件更小、输出更快
+    }
+
+
+def chart_path(filepath: str, image_format: str = None) -> str:
+    """
+    按输出格式替换图表文件扩展名
+
+    Args:
+        filepath: 图表路径
+        image_format: 'png' 或 'svg'，默认使用配置文件中的值
+
+    Returns:
+        图表路径
+    """
+    image_format = image_format or config.CHART_FORMAT
+    return f"{os.path.splitext(filepath)[0]}.{image_format}"
+
+
+def _shorten(label: str) -> str:
+    """处理类别名称过长的情况"""
+    label = label or '未知'
+    return label[:MAX_LABEL_LENGTH] + '...' if len(label) > MAX_LABEL_LENGTH else label
+
+
+def _init_chart_worker():
+    """渲染工作进程初始化: 预先导入 matplotlib 并解析字体"""
+    import matplotlib.figure  # noqa: F401
+    chart_style()
+
+
+def render_chart(spec: Dict) -> str:
+    """
+    渲染一张图表（可在工作进程中执行）
+
+    Args:
+        spec: 图表描述
+
+    Returns:
+        保存路径
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    filepath = chart_path(spec['filepath'])
+    image_format = os.path.splitext(filepath)[1][1:]
+    if image_format == 'svg':
+        from matplotlib.backends.backend_svg import FigureCanvasSVG as FigureCanvas
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+    labels = spec['labels']
+    values = spec['values']
+    if spec['kind'] not in CHART_MARGINS:
+        raise ValueError(f"不支持的图表类型: {spec['kind']}")
+
+    with matplotlib.rc_context(chart_style()):
+        fig = Figure(figsize=spec.get('figsize', (12, 6)))
+        FigureCanvas(fig)
+        fig.subplots_adjust(**CHART_MARGINS[spec['kind']])
+        ax = fig.add_subplot()
+
+        if spec['kind'] == 'bar':
+            bars = ax.bar(range(len(values)), values, color='steelblue', alpha=0.8,
+                          edgecolor='navy', linewidth=1.2)
+            # 在柱状图上添加数值标签
+            ax.bar_label(bars, labels=[f'{value}' for value in values],
+                         fontsize=10, fontweight='bold')
+            ax.set_xticks(range(len(labels)), [_shorten(label) for label in labels],
+                          rotation=45, ha='right', fontsize=10)
+            ax.set_ylim(bottom=0)
+            ax.grid(axis='y', alpha=0.3, linestyle='--')
+        elif spec['kind'] == 'barh':
+            # 数值最大的类别显示在最上方
+            positions = range(len(values) - 1, -1, -1)
+            bars = ax.barh(positions, values, color='steelblue', alpha=0.8)
+            ax.bar_label(bars, labels=[f'{value}' for value in values], fontsize=9, padding=3)
+            ax.set_yticks(positions, [_shorten(label) for label in labels], fontsize=10)
+            ax.set_xlim(left=0)
+            ax.grid(axis='x', alpha=0.3, linestyle='--')
+        else:
+            ax.plot(range(len(values)), values, color='steelblue', marker='o', linewidth=1.5)
+            # 刻度过多时间隔显示
+            step = max(1, len(labels) // 12)
+            ax.set_xticks(range(0, len(labels), step), labels[::step], rotation=45, ha='right',
+                          fontsize=9)
+            ax.set_ylim(bottom=0)
+            ax.grid(alpha=0.3, linestyle='--')
+
+        # 设置标题和标签
+        ax.set_title(spec.get('title', ''), fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel(spec.get('xlabel', ''), fontsize=12)
+        ax.set_ylabel(spec.get('ylabel', ''), fontsize=12)
+
+        ensure_dir(os.path.dirname(filepath) or '.')
+        if image_format == 'png':
+            fig.savefig(filepath, format=image_format, dpi=config.CHART_DPI,
+                        pil_kwargs={'compress_level': config.CHART_PNG_COMPRESS_LEVEL})
+        else:
+            fig.savefig(filepath, format=image_format)
+    return filepath
+
+
+class Visualizer:
+    """可视化类"""
+
+    def __init__(self):
+        """初始化可视化器"""
+        pass
+
+    def top_movies_spec(self, movies: List[Movie], top_n: int = None, filepath: str = None,
+                        title: str = None) -> Dict:
+        """
+        Top N电影柱状图的图表描述
+
+        Args:
+            movies: 电影列表（已排序）
+            top_n: 显示前N部电影，默认使用配置文件中的值
+            filepath: 保存路径，默认使用配置文件中的路径
+            title: 图表标题，默认使用配置文件中的值
+
+        Returns:
+            图表描述
+        """
+        if top_n is None:
+            top_n = config.TOP_N_MOVIES
+        if filepath is None:
+            filepath = config.TOP5_IMAGE_FILE
+        top_movies = movies[:top_n]
+        return {
+            'kind': 'bar',
+            'filepath': filepath,
+            'title': title or config.CHART_TITLE,
+            'xlabel': config.CHART_XLABEL,
+            'ylabel': config.CHART_YLABEL,
+            'labels': [movie.movie_name for movie in top_movies],
+            'values': [movie.wish_count for movie in top_movies],
+        }
+
+    def plot_top_movies(self, movies: List[Movie], top_n: int = None, filepath: str = None):
+        """
+        绘制Top N电影柱状图
+
+        Args:
+            movies: 电影列表（已排序）
+            top_n: 显示前N部电影，默认使用配置文件中的值
+            filepath: 保存路径，默认使用配置文件中的路径
+
+        Returns:
+            保存路径，没有数据时返回None
+        """
+        ensure_dir(config.IMAGES_DIR)
+
+        try:
+            spec = self.top_movies_spec(movies, top_n, filepath)
+            if not spec['values']:
+                logging.warning("没有电影数据可绘制")
+                return None
+
+            filepath = render_chart(spec)
+            logging.info(f"图表已保存到: {filepath}")
+            return filepath
+
+        except Exception as e:
+            logging.error(f"生成图表失败: {str(e)}")
+            raise
+
+    def build_chart_specs(self, movies: List[Movie]) -> List[Dict]:
+        """
+        生成批量图表的图表描述: 每个城市的Top N、国家/地区分布、按上映周的想看人数趋势
+
+        输出目录结构:
+            images/charts/city/<城市>_top.png
+            images/charts/country_wish.png
+            images/charts/release_week_wish.png
+
+        Args:
+            movies: 电影列表（可包含多个城市）
+
+        Returns:
+            图表描述列表
+        """
+        from analytics import MovieAnalytics
+
+        output_dir = config.CHART_BATCH_DIR
+        specs = []
+
+        by_city: Dict[str, List[Movie]] = defaultdict(list)
+        for movie in movies:
+            by_city[movie.city or 'unknown'].append(movie)
+        for city, city_movies in sorted(by_city.items()):
+            city_movies = sorted(city_movies, key=lambda movie: movie.wish_count, reverse=True)
+            specs.append(self.top_movies_spec(
+                city_movies, filepath=os.path.join(output_dir, 'city', f"{city}_top.png"),
+                title=f"{city} 想看人数Top {config.TOP_N_MOVIES}电影"))
+
+        analytics = MovieAnalytics()
+        by_country = analytics.wish_by_country(movies).head(config.CHART_TOP_COUNTRIES)
+        if len(by_country):
+            specs.append({
+                'kind': 'barh',
+                'filepath': os.path.join(output_dir, 'country_wish.png'),
+                'title': "各国家/地区想看人数",
+                'xlabel': "想看人数",
+                'ylabel': "国家/地区",
+                'labels': by_country['country'].astype(str).tolist(),
+                'values': by_country['wish_count'].astype(int).tolist(),
+                'figsize': (10, 8),
+            })
+
+        by_week = analytics.wish_by_release_week(movies)
+        if len(by_week):
+            specs.append({
+                'kind': 'line',
+                'filepath': os.path.join(output_dir, 'release_week_wish.png'),
+                'title': "按上映周的想看人数趋势",
+                'xlabel': "上映周",
+                'ylabel': "想看人数",
+                'labels': by_week['release_week'].dt.strftime('%Y-%m-%d').tolist(),
+                'values': by_week['wish_count'].astype(int).tolist(),
+            })
+        return specs
+
+    def render_charts(self, specs: List[Dict], workers: int = None) -> List[str]:
+        """
+        批量渲染图表，图表数大于1时分发到进程池
+
+        Args:
+            specs: 图表描述列表
+            workers: 渲染进程数，默认使用配置文件中的值（0 表示CPU核数）
+
+        Returns:
+            保存路径列表
+        """
+        if workers is None:
+            workers = config.CHART_WORKERS
+        workers = workers or os.cpu_count() or 1
+        specs = [spec for spec in specs if spec['values']]
+
+        if workers <= 1 or len(specs) <= 1:
+            rendered = [render_chart(spec) for spec in specs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(specs)),
+                                     initializer=_init_chart_worker) as executor:
+                # 每个进程一次领取多张图表，减少进程间通信
+                chunksize = max(1, len(specs) // (4 * workers))
+                rendered = list(executor.map(render_chart, specs, chunksize=chunksize))
+
+        logging.info("批量图表: 渲染 %s 张", len(rendered))
+        return rendered
+
+    def plot_dashboard(self, movies: List[Movie], workers: int = None) -> List[str]:
+        """
+        生成并渲染全部批量图表
+
+        Args:
+            movies: 电影列表
+            workers: 渲染进程数
+
+        Returns:
+            保存路径列表
+        """
+        return self.render_charts(self.build_chart_specs(movies), workers)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+词表模块
+将分词结果中的词映射为稳定的整数ID: 每条评论的分词结果保存为 array('I')，
+词频用 np.bincount 向量化统计，只有最终输出的前 K 个词才转换回字符串
+
+- 词表只追加、不修改，保存在 data/vocabulary.txt（首行为词表标识，之后每行一个词，行号即ID），
+  跨运行保持ID稳定，词频快照直接保存词ID
+- 同一进程内同一文件只有一个词表对象（get_vocabulary），避免两个对象各自分配ID
+- 词表只由分析阶段追加；查询服务等只读方遇到未知ID时读取文件末尾新增的词
+"""
+
+import os
+import uuid
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import config
+from utils import ensure_dir
+
+# 词表文件首行前缀，其后为词表标识
+HEADER_PREFIX = '#vocabulary '
+
+# 词ID数组元素类型（与 array('I') 相同的 C unsigned int）
+ID_TYPECODE = 'I'
+
+
+class Vocabulary:
+    """持久化词表类: 词 <-> 整数ID"""
+
+    def __init__(self, filepath: str = None):
+        """
+        初始化词表并加载已保存的词
+
+        Args:
+            filepath: 词表文件路径，默认使用配置文件中的路径
+        """
+        self.filepath = filepath or config.VOCABULARY_FILE
+        # 词表标识，词表文件重建后标识随之变化，旧快照中的词ID不再有效
+        self.uid: Optional[str] = None
+        self._words: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # 已写入文件的词数量和已读取的文件字节数
+        self._saved = 0
+        self._offset = 0
+        # 停用词集合 -> 每个词ID是否为有效词汇
+        self._masks: Dict[frozenset, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self._read()
+        if self.uid is None:
+            self.uid = uuid.uuid4().hex
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def _read(self):
+        """读取文件中尚未加载的词（忽略末尾未写完的行）"""
+        if not os.path.exists(self.filepath):
+            return
+        with open(self.filepath, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+
+        words = data[:end].decode('utf-8').split('\n')[:-1]
+        if self._offset == 0:
+            header = words.pop(0)
+            if not header.startswith(HEADER_PREFIX):
+                raise ValueError(f"无效的词表文件: {self.filepath}")
+            self.uid = header[len(HEADER_PREFIX):]
+        start = len(self._words)
+        self._words.extend(words)
+        self._ids.update(zip(words, range(start, start + len(words))))
+        self._offset += end
+        self._saved = len(self._words)
+
+    def refresh(self):
+        """读取其他进程追加到文件中的新词（本对象有未保存的词时不读取）"""
+        with self._lock:
+            if self._saved == len(self._words):
+                self._read()
+
+    def save(self):
+        """将新增的词追加写入词表文件"""
+        with self._lock:
+            if self._offset and self._saved == len(self._words):
+                return
+            new_words = self._words[self._saved:]
+            if any('\n' in word for word in new_words):
+                raise ValueError("词表中的词不能包含换行符")
+
+            ensure_dir(os.path.dirname(self.filepath) or '.')
+            with open(self.filepath, 'ab') as f:
+                if f.tell() != self._offset:
+                    raise RuntimeError(f"词表文件已被其他进程修改: {self.filepath}")
+                data = ''.join(word + '\n' for word in new_words)
+                if not self._offset:
+                    data = f"{HEADER_PREFIX}{self.uid}\n" + data
+                raw = data.encode('utf-8')
+                f.write(raw)
+            self._offset += len(raw)
+            self._saved = len(self._words)
+        logging.debug("词表已保存: %s 个词，本次新增 %s 个", len(self._words), len(new_words))
+
+    def encode(self, words: Iterable[str]) -> array:
+        """
+        将词序列转换为词ID数组，未见过的词分配新ID
+
+        Args:
+            words: 词序列
+
+        Returns:
+            array('I') 词ID数组
+        """
+        if not isinstance(words, list):
+            words = list(words)
+        ids = self._ids
+        result = [ids.get(word) for word in words]
+        if None in result:
+            for i, word in enumerate(words):
+                if result[i] is None:
+                    word_id = ids.get(word)
+                    if word_id is None:
+                        word_id = ids[word] = len(self._words)
+                        self._words.append(word)
+                    result[i] = word_id
+        return array(ID_TYPECODE, result)
+
+    def lookup(self, word: str) -> Optional[int]:
+        """
+        查询词的ID（不分配新ID）
+
+        Args:
+            word: 词
+
+        Returns:
+            词ID，词表中没有该词时返回None
+        """
+        word_id = self._ids.get(word)
+        if word_id is None:
+            self.refresh()
+            word_id = self._ids.get(word)
+        return word_id
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        """
+        将词ID序列转换回词
+
+        Args:
+            ids: 词ID序列（array、NumPy 数组或整数列表）
+
+        Returns:
+            词列表
+        """
+        if isinstance(ids, np.ndarray):
+            ids = ids.tolist()
+        words = self._words
+        try:
+            return [words[i] for i in ids]
+        except IndexError:
+            # 其他进程在本对象加载后追加了新词
+            self.refresh()
+            words = self._words
+            return [words[i] for i in ids]
+
+    def valid_mask(self, stopwords: Set[str]) -> np.ndarray:
+        """
+        每个词ID是否为有效词汇（与 filter_words 相同: 非停用词、非单字符、非纯数字）
+
+        结果按停用词集合缓存，词表增长后只计算新增的词。
+
+        Args:
+            stopwords: 停用词集合
+
+        Returns:
+            长度为词表大小的布尔数组
+        """
+        key = frozenset(stopwords)
+        mask = self._masks.get(key)
+        start = 0 if mask is None else len(mask)
+        if start < len(self._words):
+            new_words = self._words[start:]
+            new_mask = np.fromiter((len(word) > 1 and word not in stopwords and not word.isdigit()
+                                    for word in new_words), dtype=bool, count=len(new_words))
+            mask = new_mask if mask is None else np.concatenate([mask, new_mask])
+            self._masks[key] = mask
+        return mask if mask is not None else np.zeros(0, dtype=bool)
+
+    def count(self, id_arrays: Iterable[array],
+              stopwords: Set[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        统计一组词ID数组中每个词ID的出现次数
+
+        Args:
+            id_arrays: 词ID数组序列（如一部电影每条评论的分词结果）
+            stopwords: 提供时只统计有效词汇（过滤停用词、单字符和纯数字）
+
+        Returns:
+            (排序后的词ID数组, 对应的计数数组)
+        """
+        # 先拼接各数组的字节再一次性转换，避免为每条评论创建 NumPy 数组
+        ids = np.frombuffer(b''.join(id_arrays), dtype=np.uintc)
+        if not len(ids):
+            return np.array([], dtype=np.uint32), np.array([], dtype=np.int64)
+
+        if len(ids) * 8 >= len(self._words):
+            # 词数相对词表较多时直接按词表大小计数
+            counts = np.bincount(ids, minlength=len(self._words))
+            ids = np.flatnonzero(counts)
+            counts = counts[ids]
+        else:
+            # 词数很少（如单部电影）时避免分配词表大小的数组
+            ids, counts = np.unique(ids, return_counts=True)
+
+        if stopwords is not None:
+            keep = self.valid_mask(stopwords)[ids]
+            ids, counts = ids[keep], counts[keep]
+        return ids.astype(np.uint32), counts.astype(np.int64)
+
+
+_vocabularies: Dict[str, Vocabulary] = {}
+_vocabularies_lock = threading.Lock()
+
+
+def get_vocabulary(filepath: str = None) -> Vocabulary:
+    """
+    获取词表文件对应的词表对象（同一进程内共享）
+
+    Args:
+        filepath: 词表文件路径，默认使用配置文件中的路径
+
+    Returns:
+        Vocabulary对象
+    """
+    path = os.path.abspath(filepath or config.VOCABULARY_FILE)
+    with _vocabularies_lock:
+        vocabulary = _vocabularies.get(path)
+        if vocabulary is None:
+            vocabulary = _vocabularies[path] = Vocabulary(path)
+        return vocabulary
@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+"""
+词频快照模块
+按电影、按运行保存可合并的词频快照，全局/城市/时间段词频通过合并快照得到
+
+快照以排序后的词ID数组和计数数组表示（词ID来自跨运行保持稳定的词表），每部电影一个 .npz 文件，
+每次运行一个目录并附带 index.json 索引:
+
+    data/word_freq/<run_id>/index.json
+    data/word_freq/<run_id>/<city>_<movie_id>.npz
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import config
+from utils import ensure_dir
+from models import Movie
+from vocabulary import Vocabulary, get_vocabulary
+
+INDEX_FILENAME = 'index.json'
+
+
+class FrequencySnapshot:
+    """词频快照: 排序后的词ID数组及对应的计数数组"""
+
+    __slots__ = ('ids', 'counts', 'vocabulary')
+
+    def __init__(self, ids: np.ndarray, counts: np.ndarray, vocabulary: Optional[Vocabulary]):
+        """
+        初始化词频快照
+
+        Args:
+            ids: 去重并排序后的词ID数组
+            counts: 与 ids 一一对应的计数数组
+            vocabulary: 词ID所属的词表
+        """
+        self.ids = ids
+        self.counts = counts
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def empty(cls, vocabulary: Vocabulary = None) -> 'FrequencySnapshot':
+        """创建空快照"""
+        return cls(np.array([], dtype=np.uint32), np.array([], dtype=np.int64), vocabulary)
+
+    @classmethod
+    def from_counter(cls, word_freq: Counter, vocabulary: Vocabulary = None) -> 'FrequencySnapshot':
+        """
+        从词频Counter创建快照
+
+        Args:
+            word_freq: 词频统计Counter对象
+            vocabulary: 词表，默认使用配置文件中的词表
+
+        Returns:
+            FrequencySnapshot对象
+        """
+        if vocabulary is None:
+            vocabulary = get_vocabulary()
+        if not word_freq:
+            return cls.empty(vocabulary)
+        ids = np.frombuffer(vocabulary.encode(word_freq.keys()), dtype=np.uintc).astype(np.uint32)
+        counts = np.fromiter(word_freq.values(), dtype=np.int64, count=len(word_freq))
+        order = np.argsort(ids, kind='stable')
+        return cls(ids[order], counts[order], vocabulary)
+
+    @classmethod
+    def merge(cls, snapshots: Iterable['FrequencySnapshot']) -> 'FrequencySnapshot':
+        """
+        合并多个快照，相同词的计数相加
+
+        Args:
+            snapshots: 快照序列（需使用同一词表）
+
+        Returns:
+            合并后的快照
+        """
+        snapshots = [s for s in snapshots if len(s)]
+        if not snapshots:
+            return cls.empty()
+        if len(snapshots) == 1:
+            return snapshots[0]
+
+        vocabulary = snapshots[0].vocabulary
+        if any(s.vocabulary is not vocabulary for s in snapshots):
+            raise ValueError("不能合并使用不同词表的词频快照")
+        counts = np.bincount(np.concatenate([s.ids for s in snapshots]),
+                             weights=np.concatenate([s.counts for s in snapshots]))
+        ids = np.flatnonzero(counts)
+        return cls(ids.astype(np.uint32), counts[ids].astype(np.int64), vocabulary)
+
+    @property
+    def tokens(self) -> np.ndarray:
+        """与 ids 一一对应的词数组（转换全部词，只需要高频词时使用 most_common）"""
+        if not len(self):
+            return np.array([], dtype=str)
+        return np.array(self.vocabulary.decode(self.ids), dtype=str)
+
+    def to_counter(self) -> Counter:
+        """
+        转换为词频Counter
+
+        Returns:
+            词频统计Counter对象
+        """
+        if not len(self):
+            return Counter()
+        return Counter(dict(zip(self.vocabulary.decode(self.ids), self.counts.tolist())))
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """
+        获取计数最高的 n 个词（只有这 n 个词转换为字符串）
+
+        Args:
+            n: 数量
+
+        Returns:
+            (词汇, 频次)元组列表，按频次降序、同频次按词排序
+        """
+        if n <= 0 or not len(self):
+            return []
+        n = min(n, len(self))
+        top = np.argpartition(-self.counts, n - 1)[:n]
+        words = self.vocabulary.decode(self.ids[top])
+        return sorted(zip(words, self.counts[top].tolist()), key=lambda item: (-item[1], item[0]))
+
+    def top(self, n: int) -> 'FrequencySnapshot':
+        """
+        只保留计数最高的 n 个词（同计数的词在边界处任取）
+
+        Args:
+            n: 保留的词数量
+
+        Returns:
+            新快照，词数不超过 n
+        """
+        if len(self) <= n:
+            return self
+        keep = np.sort(np.argpartition(-self.counts, n - 1)[:n]) if n > 0 else []
+        return FrequencySnapshot(self.ids[keep], self.counts[keep], self.vocabulary)
+
+    def words_with_count(self, count: int, limit: int = None) -> List[Tuple[str, int]]:
+        """
+        获取计数等于 count 的词（按词ID顺序，即首次出现的先后）
+
+        Args:
+            count: 计数
+            limit: 最多返回的数量，默认全部
+
+        Returns:
+            (词汇, 频次)元组列表
+        """
+        ids = self.ids[self.counts == count][:limit]
+        if not len(ids):
+            return []
+        return [(word, count) for word in self.vocabulary.decode(ids)]
+
+    @property
+    def total(self) -> int:
+        """总词频"""
+        return int(self.counts.sum())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def save(self, filepath: str):
+        """
+        保存快照到 .npz 文件
+
+        Args:
+            filepath: 文件路径
+        """
+        np.savez_compressed(filepath, ids=self.ids, counts=self.counts,
+                            vocabulary=np.array(self.vocabulary.uid if self.vocabulary is not None else ''))
+
+    @classmethod
+    def load(cls, filepath: str, vocabulary: Vocabulary = None) -> 'FrequencySnapshot':
+        """
+        从 .npz 文件加载快照
+
+        Args:
+            filepath: 文件路径
+            vocabulary: 词表，默认使用配置文件中的词表
+
+        Returns:
+            FrequencySnapshot对象
+        """
+        if vocabulary is None:
+            vocabulary = get_vocabulary()
+        with np.load(filepath) as data:
+            if len(data['ids']) and str(data['vocabulary']) != vocabulary.uid:
+                raise ValueError(f"词频快照使用的词表与当前词表不一致: {filepath}")
+            return cls(data['ids'], data['counts'], vocabulary)
+
+
+def movie_key(movie: Movie) -> str:
+    """
+    电影快照键: 城市 + 电影ID
+
+    Args:
+        movie: 电影记录
+
+    Returns:
+        快照键
+    """
+    movie_id = movie.movie_id or hashlib.md5(movie.movie_name.encode('utf-8')).hexdigest()[:12]
+    return f"{movie.city or 'unknown'}_{movie_id}"
+
+
+def comments_hash(movie: Movie) -> str:
+    """
+    计算电影评论内容摘要，用于判断评论是否变化
+
+    Args:
+        movie: 电影记录
+
+    Returns:
+        摘要字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for text in movie.comment_texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class FrequencyStore:
+    """按运行、按电影保存词频快照的存储类"""
+
+    def __init__(self, root: str = None, vocabulary: Vocabulary = None):
+        """
+        初始化词频快照存储
+
+        Args:
+            root: 存储根目录，默认使用配置文件中的路径
+            vocabulary: 快照词ID所属的词表，默认使用配置文件中的词表
+        """
+        if root is None:
+            root = config.WORD_FREQ_DIR
+        self.root = root
+        self.vocabulary = vocabulary if vocabulary is not None else get_vocabulary()
+        # run_id -> 索引（movie_key -> 条目）
+        self._indexes: Dict[str, Dict[str, Dict]] = {}
+
+    def new_run_id(self) -> str:
+        """
+        生成新的运行ID（时间戳）并独占创建其目录
+
+        同一秒内的多次运行追加序号，避免覆盖上一次运行的快照和索引
+
+        Returns:
+            运行ID
+        """
+        ensure_dir(self.root)
+        base = time.strftime('%Y%m%d-%H%M%S')
+        run_id, suffix = base, 0
+        while True:
+            try:
+                os.mkdir(os.path.join(self.root, run_id))
+                return run_id
+            except FileExistsError:
+                suffix += 1
+                run_id = f"{base}-{suffix:03d}"
+
+    def run_ids(self) -> List[str]:
+        """
+        列出已保存的运行ID（按时间升序）
+
+        Returns:
+            运行ID列表
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, INDEX_FILENAME)))
+
+    def load_index(self, run_id: str) -> Dict[str, Dict]:
+        """
+        加载某次运行的快照索引
+
+        Args:
+            run_id: 运行ID
+
+        Returns:
+            movie_key -> 条目字典
+        """
+        index = self._indexes.get(run_id)
+        if index is None:
+            path = os.path.join(self.root, run_id, INDEX_FILENAME)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            else:
+                index = {}
+            self._indexes[run_id] = index
+        return index
+
+    def save_movie(self, run_id: str, movie: Movie, snapshot: FrequencySnapshot,
+                   namespace: str, content_hash: str = None) -> Dict:
+        """
+        保存单部电影的词频快照（索引在 commit 时写入）
+
+        Args:
+            run_id: 运行ID
+            movie: 电影记录
+            snapshot: 词频快照
+            namespace: 分词命名空间（停用词和词典版本摘要）
+            content_hash: 评论内容摘要，默认根据电影评论计算
+
+        Returns:
+            索引条目
+        """
+        key = movie_key(movie)
+        run_dir = os.path.join(self.root, run_id)
+        ensure_dir(run_dir)
+        filename = f"{key}.npz"
+        snapshot.save(os.path.join(run_dir, filename))
+
+        entry = {
+            'file': filename,
+            'movie_id': movie.movie_id or '',
+            'movie_name': movie.movie_name,
+            'city': movie.city,
+            'release_date': movie.release_date,
+            'comments': len(movie.comments),
+            'comments_hash': content_hash or comments_hash(movie),
+            'namespace': namespace,
+            'vocabulary_id': self.vocabulary.uid,
+            'vocabulary': len(snapshot),
+            'total': snapshot.total,
+        }
+        self.load_index(run_id)[key] = entry
+        return entry
+
+    def reuse_movie(self, run_id: str, source_run_id: str, key: str) -> Dict:
+        """
+        将历史运行中的电影快照登记到本次运行（不复制数据文件）
+
+        Args:
+            run_id: 本次运行ID
+            source_run_id: 快照所在的运行ID
+            key: 电影快照键
+
+        Returns:
+            索引条目
+        """
+        entry = dict(self.load_index(source_run_id)[key])
+        entry['file'] = os.path.relpath(
+            os.path.join(self.root, source_run_id, entry['file']),
+            os.path.join(self.root, run_id))
+        self.load_index(run_id)[key] = entry
+        return entry
+
+    def find_reusable(self, movie: Movie, namespace: str,
+                      content_hash: str = None) -> Optional[Tuple[str, str]]:
+        """
+        在最近一次运行中查找评论与分词配置均未变化、且使用当前词表的电影快照
+
+        Args:
+            movie: 电影记录
+            namespace: 分词命名空间
+            content_hash: 评论内容摘要，默认根据电影评论计算
+
+        Returns:
+            (运行ID, 快照键)，没有可复用的快照返回None
+        """
+        run_ids = self.run_ids()
+        if not run_ids:
+            return None
+        key = movie_key(movie)
+        entry = self.load_index(run_ids[-1]).get(key)
+        if (entry and entry.get('namespace') == namespace and
+                entry.get('vocabulary_id') == self.vocabulary.uid and
+                entry.get('comments_hash') == (content_hash or comments_hash(movie))):
+            return run_ids[-1], key
+        return None
+
+    def commit(self, run_id: str):
+        """
+        写入某次运行的快照索引（先保存词表，索引中的快照引用的词ID均已写入词表文件）
+
+        Args:
+            run_id: 运行ID
+        """
+        self.vocabulary.save()
+        run_dir = os.path.join(self.root, run_id)
+        ensure_dir(run_dir)
+        path = os.path.join(run_dir, INDEX_FILENAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.load_index(run_id), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        logging.info("词频快照索引已保存: %s", path)
+
+    def load_snapshot(self, run_id: str, key: str) -> FrequencySnapshot:
+        """
+        加载某次运行中单部电影的快照
+
+        Args:
+            run_id: 运行ID
+            key: 电影快照键
+
+        Returns:
+            FrequencySnapshot对象
+        """
+        entry = self.load_index(run_id)[key]
+        return FrequencySnapshot.load(os.path.normpath(os.path.join(self.root, run_id, entry['file'])),
+                                      self.vocabulary)
+
+    def merged(self, run_id: str = None, city: str = None,
+               movie_ids: Iterable[str] = None) -> FrequencySnapshot:
+        """
+        合并某次运行中符合条件的电影快照
+
+        Args:
+            run_id: 运行ID，默认最近一次运行
+            city: 只合并该城市的电影
+            movie_ids: 只合并这些电影
+
+        Returns:
+            合并后的快照
+        """
+        if run_id is None:
+            run_ids = self.run_ids()
+            if not run_ids:
+                return FrequencySnapshot.empty(self.vocabulary)
+            run_id = run_ids[-1]
+        return FrequencySnapshot.merge(
+            self.load_snapshot(run_id, key)
+            for key in self._select(self.load_index(run_id), city, movie_ids))
+
+    def merged_range(self, since: str = None, until: str = None, city: str = None,
+                     movie_ids: Iterable[str] = None) -> FrequencySnapshot:
+        """
+        合并一段时间内的快照（如按周），同一电影只取该时间段内最新的快照
+
+        Args:
+            since: 起始运行ID（含），如 "20260501"
+            until: 结束运行ID（不含），如 "20260508"
+            city: 只合并该城市的电影
+            movie_ids: 只合并这些电影
+
+        Returns:
+            合并后的快照
+        """
+        latest: Dict[str, str] = {}
+        for run_id in self.run_ids():
+            if (since and run_id < since) or (until and run_id >= until):
+                continue
+            for key in self._select(self.load_index(run_id), city, movie_ids):
+                latest[key] = run_id
+        return FrequencySnapshot.merge(
+            self.load_snapshot(run_id, key) for key, run_id in latest.items())
+
+    @staticmethod
+    def _select(index: Dict[str, Dict], city: str = None,
+                movie_ids: Iterable[str] = None) -> List[str]:
+        """按城市和电影ID筛选索引中的快照键"""
+        wanted = set(movie_ids) if movie_ids is not None else None
+        return [key for key, entry in index.items()
+                if (city is None or entry.get('city') == city) and
+                (wanted is None or entry.get('movie_id') in wanted)]
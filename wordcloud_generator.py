@@ -1,301 +1,1018 @@
-# -*- coding: utf-8 -*-
-"""
-词云生成模块
-负责评论分析、词频统计和词云图生成
-"""
-
-import os
-import logging
-import jieba
-import jieba.analyse
-from collections import Counter
-from typing import List, Dict, Tuple
-from wordcloud import WordCloud
-import config
-from utils import ensure_dir
-
-
-class WordCloudGenerator:
-    """词云生成器类"""
-    
-    def __init__(self, stopwords_file: str = None):
-        """
-        初始化词云生成器
-        
-        Args:
-            stopwords_file: 停用词文件路径
-        """
-        self.stopwords = set()
-        if stopwords_file and os.path.exists(stopwords_file):
-            self.load_stopwords(stopwords_file)
-        else:
-            # 使用默认停用词
-            self._init_default_stopwords()
-    
-    def _init_default_stopwords(self):
-        """初始化默认停用词"""
-        default_stopwords = {
-            # 常用停用词
-            '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个',
-            '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好',
-            '自己', '这', '这个', '这样', '那样', '那么',
-            '非常', '特别', '真的', '还是', '可以', '应该', '觉得', '感觉', '但是',
-            '不过', '虽然', '如果', '因为', '所以', '然后', '还有', '就是', '只是',
-            '什么', '怎么', '为什么', '多少', '哪个', '哪些',
-            '豆瓣', '评分', '评论', '用户', '网友', '大家', '我们', '你们', '他们',
-            '啊', '呢', '吧', '吗', '呀', '哦', '嗯', '哈哈', '呵呵',
-            # 电影相关停用词
-            '电影', '影片', '片子', '这部', '剧情', '演员', '导演', '演技', '画面', '音乐', '特效',
-            '好看', '不错', '一般', '还行', '不好', '难看', '垃圾', '烂片', '好片', '经典',
-            '推荐', '值得', '值得看', '值得一看', '值得推荐', '不推荐', '不推荐看',
-        }
-        self.stopwords.update(default_stopwords)
-    
-    def load_stopwords(self, filepath: str):
-        """
-        从文件加载停用词
-        
-        Args:
-            filepath: 停用词文件路径
-        """
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    word = line.strip()
-                    if word:
-                        self.stopwords.add(word)
-            logging.info(f"从文件加载 {len(self.stopwords)} 个停用词")
-        except Exception as e:
-            logging.warning(f"加载停用词文件失败: {str(e)}")
-    
-    def extract_comments(self, movies: List[Dict]) -> str:
-        """
-        从电影列表中提取所有评论
-        
-        Args:
-            movies: 电影列表
-            
-        Returns:
-            合并后的评论文本
-        """
-        all_comments = []
-        for movie in movies:
-            comments = movie.get('comments', [])
-            all_comments.extend(comments)
-        
-        text = ' '.join(all_comments)
-        logging.info(f"提取了 {len(all_comments)} 条评论，总字符数: {len(text)}")
-        return text
-    
-    def segment_text(self, text: str) -> List[str]:
-        """
-        对文本进行分词
-        
-        Args:
-            text: 原始文本
-            
-        Returns:
-            分词后的词列表
-        """
-        # 使用jieba分词
-        words = jieba.cut(text, cut_all=False)
-        
-        # 过滤停用词和单字符
-        filtered_words = []
-        for word in words:
-            word = word.strip()
-            if (len(word) > 1 and 
-                word not in self.stopwords and 
-                not word.isspace() and
-                not word.isdigit()):
-                filtered_words.append(word)
-        
-        logging.info(f"分词完成，共 {len(filtered_words)} 个有效词汇")
-        return filtered_words
-    
-    def count_word_frequency(self, words: List[str]) -> Counter:
-        """
-        统计词频
-        
-        Args:
-            words: 词列表
-            
-        Returns:
-            词频统计Counter对象
-        """
-        word_freq = Counter(words)
-        logging.info(f"统计完成，共 {len(word_freq)} 个不同词汇")
-        return word_freq
-    
-    def get_top_words(self, word_freq: Counter, top_n: int = None) -> List[Tuple[str, int]]:
-        """
-        获取高频词汇
-        
-        Args:
-            word_freq: 词频统计Counter对象
-            top_n: 前N个高频词，默认使用配置文件中的值
-            
-        Returns:
-            (词汇, 频次)元组列表
-        """
-        if top_n is None:
-            top_n = config.TOP_WORDS_COUNT
-        
-        top_words = word_freq.most_common(top_n)
-        return top_words
-    
-    def get_low_frequency_words(self, word_freq: Counter) -> List[Tuple[str, int]]:
-        """
-        获取低频词汇（出现1次的词汇）
-        
-        Args:
-            word_freq: 词频统计Counter对象
-            
-        Returns:
-            (词汇, 频次)元组列表
-        """
-        low_freq_words = [(word, count) for word, count in word_freq.items() if count == 1]
-        logging.info(f"找到 {len(low_freq_words)} 个低频词汇（出现1次）")
-        return low_freq_words
-    
-    def save_word_statistics(self, word_freq: Counter, filepath: str = None):
-        """
-        保存词频统计结果
-        
-        Args:
-            word_freq: 词频统计Counter对象
-            filepath: 保存路径，默认使用配置文件中的路径
-        """
-        if filepath is None:
-            filepath = config.WORD_STATISTICS_FILE
-        
-        ensure_dir(config.DATA_DIR)
-        
-        try:
-            top_words = self.get_top_words(word_freq)
-            low_freq_words = self.get_low_frequency_words(word_freq)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("=" * 50 + "\n")
-                f.write("词频统计报告\n")
-                f.write("=" * 50 + "\n\n")
-                
-                f.write(f"总词汇数: {len(word_freq)}\n")
-                f.write(f"总词频: {sum(word_freq.values())}\n\n")
-                
-                f.write("-" * 50 + "\n")
-                f.write(f"高频词汇 Top {config.TOP_WORDS_COUNT}:\n")
-                f.write("-" * 50 + "\n")
-                for i, (word, count) in enumerate(top_words, 1):
-                    f.write(f"{i:2d}. {word:15s} : {count:5d} 次\n")
-                
-                f.write("\n" + "-" * 50 + "\n")
-                f.write(f"低频词汇（出现1次）: {len(low_freq_words)} 个\n")
-                f.write("-" * 50 + "\n")
-                # 只显示前100个低频词，避免文件过大
-                for i, (word, count) in enumerate(low_freq_words[:100], 1):
-                    f.write(f"{word:15s} : {count:5d} 次\n")
-                if len(low_freq_words) > 100:
-                    f.write(f"... 还有 {len(low_freq_words) - 100} 个低频词\n")
-            
-            logging.info(f"词频统计已保存到: {filepath}")
-        except Exception as e:
-            logging.error(f"保存词频统计失败: {str(e)}")
-            raise
-    
-    def generate_wordcloud(self, word_freq: Counter, filepath: str = None):
-        """
-        生成词云图
-        
-        Args:
-            word_freq: 词频统计Counter对象
-            filepath: 保存路径，默认使用配置文件中的路径
-        """
-        if filepath is None:
-            filepath = config.WORDCLOUD_IMAGE_FILE
-        
-        ensure_dir(config.IMAGES_DIR)
-        
-        try:
-            # 准备词频字典
-            word_dict = dict(word_freq)
-            
-            if not word_dict:
-                logging.warning("没有词汇数据，无法生成词云")
-                return
-            
-            # 配置词云参数
-            wordcloud_config = {
-                'width': config.WORDCLOUD_WIDTH,
-                'height': config.WORDCLOUD_HEIGHT,
-                'background_color': config.WORDCLOUD_BACKGROUND_COLOR,
-                'max_words': 200,
-                'relative_scaling': 0.5,
-                'colormap': 'viridis',
-            }
-            
-            # 尝试使用中文字体
-            font_path = config.WORDCLOUD_FONT_PATH
-            if os.path.exists(font_path):
-                wordcloud_config['font_path'] = font_path
-            else:
-                # 尝试系统字体路径
-                system_fonts = [
-                    'C:/Windows/Fonts/simhei.ttf',
-                    'C:/Windows/Fonts/simsun.ttc',
-                    'C:/Windows/Fonts/msyh.ttc',
-                ]
-                for font in system_fonts:
-                    if os.path.exists(font):
-                        wordcloud_config['font_path'] = font
-                        break
-                else:
-                    logging.warning("未找到中文字体，词云可能无法正确显示中文")
-            
-            # 生成词云
-            wordcloud = WordCloud(**wordcloud_config)
-            wordcloud.generate_from_frequencies(word_dict)
-            
-            # 保存图片
-            wordcloud.to_file(filepath)
-            logging.info(f"词云图已保存到: {filepath}")
-            
-        except Exception as e:
-            logging.error(f"生成词云失败: {str(e)}")
-            raise
-    
-    def process_comments(self, movies: List[Dict], stopwords_file: str = None):
-        """
-        处理评论，生成词频统计和词云
-        
-        Args:
-            movies: 电影列表
-            stopwords_file: 停用词文件路径
-        """
-        logging.info("开始处理评论数据...")
-        
-        # 提取评论
-        text = self.extract_comments(movies)
-        
-        if not text or len(text.strip()) < 10:
-            logging.warning("评论数据不足，无法进行分析")
-            return
-        
-        # 分词
-        words = self.segment_text(text)
-        
-        if not words:
-            logging.warning("分词结果为空")
-            return
-        
-        # 统计词频
-        word_freq = self.count_word_frequency(words)
-        
-        # 保存统计结果
-        self.save_word_statistics(word_freq)
-        
-        # 生成词云
-        self.generate_wordcloud(word_freq)
-        
-        logging.info("评论处理完成")
-
+# -*- coding: utf-8 -*-
+"""
+词云生成模块
+负责评论分析、词频统计和词云图生成
+
+分词结果以词ID数组（array('I')，词ID来自持久化词表）保存，精确词频用 np.bincount 统计，
+只有写入报告和词云的前 K 个词才转换回字符串。
+"""
+
+import os
+import json
+import hashlib
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import config
+from utils import ensure_dir, load_jieba, resolve_font_path
+from profiling import profiled, count_first_arg
+from models import Movie
+from segment_cache import SegmentCache, dictionary_version, make_namespace
+from heavy_hitters import SpaceSavingCounter
+
+if TYPE_CHECKING:
+    from cooccurrence import CooccurrenceCounter
+    from word_freq_store import FrequencySnapshot, FrequencyStore
+    from vocabulary import Vocabulary
+
+# jieba、wordcloud、numpy 均在首次使用时导入，只爬取数据时无需加载
+
+# 词频统计结果: 精确计数为 Counter 或词频快照，近似计数为 SpaceSavingCounter
+WordFrequency = Union[Counter, SpaceSavingCounter, 'FrequencySnapshot']
+
+# 分词工作进程内的停用词（由进程池初始化函数设置）
+_worker_stopwords: Set[str] = set()
+
+
+def filter_words(words: Iterable[str], stopwords: Set[str]) -> Iterator[str]:
+    """
+    过滤停用词、单字符和纯数字
+
+    Args:
+        words: 分词结果
+        stopwords: 停用词集合
+
+    Yields:
+        有效词汇
+    """
+    for word in words:
+        word = word.strip()
+        if len(word) > 1 and word not in stopwords and not word.isdigit():
+            yield word
+
+
+def _init_segment_worker(stopwords: Set[str]):
+    """分词工作进程初始化: 保存停用词并加载 jieba 词典"""
+    global _worker_stopwords
+    _worker_stopwords = stopwords
+    load_jieba().initialize()
+
+
+def _segment_batch(comments: List[str], keep_tokens: bool = False, capacity: int = 0):
+    """
+    在工作进程中对一批评论分词并统计词频
+
+    Args:
+        comments: 评论文本列表
+        keep_tokens: 为True时返回每条评论未过滤停用词的完整词列表（用于分词缓存和情感分析）
+        capacity: 大于0时使用该容量的近似计数器统计词频
+
+    Returns:
+        该批评论的词频计数器，或每条评论的词列表
+    """
+    jieba = load_jieba()
+    if keep_tokens:
+        return [[word for word in map(str.strip, jieba.cut(comment, cut_all=False)) if word]
+                for comment in comments]
+
+    word_freq = SpaceSavingCounter(capacity) if capacity > 0 else Counter()
+    for comment in comments:
+        word_freq.update(filter_words(jieba.cut(comment, cut_all=False), _worker_stopwords))
+    return word_freq
+
+
+def wordcloud_options(preview: bool = False) -> Dict:
+    """
+    词云参数
+    
+    Args:
+        preview: 是否为低分辨率预览（尺寸按比例缩小，词数减半）
+        
+    Returns:
+        WordCloud 构造参数字典
+    """
+    scale = config.WORDCLOUD_PREVIEW_SCALE if preview else 1.0
+    options = {
+        'width': max(1, int(config.WORDCLOUD_WIDTH * scale)),
+        'height': max(1, int(config.WORDCLOUD_HEIGHT * scale)),
+        'background_color': config.WORDCLOUD_BACKGROUND_COLOR,
+        'max_words': 100 if preview else 200,
+        'relative_scaling': 0.5,
+        'colormap': 'viridis',
+    }
+    font_path = resolve_font_path()
+    if font_path:
+        options['font_path'] = font_path
+    return options
+
+
+def render_digest(frequencies: Dict[str, int], options: Dict) -> str:
+    """
+    计算渲染输入（词频和参数）的摘要，用于判断图片是否需要重新渲染
+    
+    Args:
+        frequencies: 词频字典
+        options: 词云参数
+        
+    Returns:
+        摘要字符串
+    """
+    payload = json.dumps([sorted(frequencies.items()), sorted(options.items())],
+                         ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def render_wordcloud(frequencies: Dict[str, int], filepath: str, options: Dict) -> str:
+    """
+    渲染一张词云图（可在工作进程中执行）
+    
+    Args:
+        frequencies: 词频字典
+        filepath: 保存路径
+        options: 词云参数
+        
+    Returns:
+        保存路径
+    """
+    from wordcloud import WordCloud
+    wordcloud = WordCloud(**options)
+    wordcloud.generate_from_frequencies(frequencies)
+    wordcloud.to_file(filepath)
+    return filepath
+
+
+class WordCloudGenerator:
+    """词云生成器类"""
+    
+    def __init__(self, stopwords_file: str = None, use_cache: bool = None,
+                 approximate: bool = None):
+        """
+        初始化词云生成器
+        
+        Args:
+            stopwords_file: 停用词文件路径
+            use_cache: 是否使用分词缓存，默认使用配置文件中的值
+            approximate: 是否使用固定内存的近似词频统计，默认使用配置文件中的值
+        """
+        if use_cache is None:
+            use_cache = config.SEGMENT_CACHE_ENABLED
+        if approximate is None:
+            approximate = config.WORD_COUNT_MODE == 'approximate'
+        self.use_cache = use_cache
+        self.approximate = approximate
+        self._cache = None
+        self._vocabulary = None
+        # 本次运行中已分词的评论: 评论文本 -> 完整词ID数组
+        self._tokens: Dict[str, array] = {}
+        
+        self.stopwords = set()
+        # 短语和共现统计使用的停用词（保留特效、剧情等电影领域词）
+        self.phrase_stopwords = self.stopwords
+        if stopwords_file and os.path.exists(stopwords_file):
+            self.load_stopwords(stopwords_file)
+        else:
+            # 使用默认停用词
+            self._init_default_stopwords()
+    
+    def _init_default_stopwords(self):
+        """初始化默认停用词"""
+        general_stopwords = {
+            # 常用停用词
+            '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个',
+            '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好',
+            '自己', '这', '这个', '这样', '那样', '那么',
+            '非常', '特别', '真的', '还是', '可以', '应该', '觉得', '感觉', '但是',
+            '不过', '虽然', '如果', '因为', '所以', '然后', '还有', '就是', '只是',
+            '什么', '怎么', '为什么', '多少', '哪个', '哪些',
+            '豆瓣', '评分', '评论', '用户', '网友', '大家', '我们', '你们', '他们',
+            '啊', '呢', '吧', '吗', '呀', '哦', '嗯', '哈哈', '呵呵',
+        }
+        movie_stopwords = {
+            # 电影相关停用词
+            '电影', '影片', '片子', '这部', '剧情', '演员', '导演', '演技', '画面', '音乐', '特效',
+            '好看', '不错', '一般', '还行', '不好', '难看', '垃圾', '烂片', '好片', '经典',
+            '推荐', '值得', '值得看', '值得一看', '值得推荐', '不推荐', '不推荐看',
+        }
+        self.stopwords.update(general_stopwords, movie_stopwords)
+        self.phrase_stopwords = general_stopwords
+    
+    def load_stopwords(self, filepath: str):
+        """
+        从文件加载停用词
+        
+        Args:
+            filepath: 停用词文件路径
+        """
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    word = line.strip()
+                    if word:
+                        self.stopwords.add(word)
+            logging.info(f"从文件加载 {len(self.stopwords)} 个停用词")
+        except Exception as e:
+            logging.warning(f"加载停用词文件失败: {str(e)}")
+    
+    def collect_comments(self, movies: List[Movie]) -> List[str]:
+        """
+        从电影列表中收集所有评论文本
+        
+        Args:
+            movies: 电影列表
+            
+        Returns:
+            评论文本列表
+        """
+        all_comments = []
+        for movie in movies:
+            all_comments.extend(movie.comment_texts)
+        return all_comments
+    
+    def extract_comments(self, movies: List[Movie]) -> str:
+        """
+        从电影列表中提取所有评论
+        
+        Args:
+            movies: 电影列表
+            
+        Returns:
+            合并后的评论文本
+        """
+        all_comments = self.collect_comments(movies)
+        text = ' '.join(all_comments)
+        logging.info(f"提取了 {len(all_comments)} 条评论，总字符数: {len(text)}")
+        return text
+    
+    def segment_text(self, text: str) -> List[str]:
+        """
+        对文本进行分词
+        
+        Args:
+            text: 原始文本
+            
+        Returns:
+            分词后的词列表
+        """
+        # 使用jieba分词（优先使用分词缓存），过滤停用词和单字符
+        filtered_words = self._tokenize_comments([text], workers=1)[0]
+        logging.info(f"分词完成，共 {len(filtered_words)} 个有效词汇")
+        return filtered_words
+    
+    @profiled(items=count_first_arg)
+    def segment_comments(self, comments: List[str], workers: int = None,
+                         batch_size: int = None) -> Union[SpaceSavingCounter, 'FrequencySnapshot']:
+        """
+        按批对评论分词并统计词频，多批评论分发到进程池并行处理
+        
+        精确模式下每条评论转换为词ID数组，用 np.bincount 统计后过滤停用词，返回词频快照。
+        近似模式下每个工作进程在批内完成分词和过滤，只返回该批的近似计数器，主进程合并各批结果。
+        启用分词缓存或本次运行已分词（如情感分析）时，直接复用已有结果，只有新评论需要分词。
+        
+        Args:
+            comments: 评论文本列表
+            workers: 工作进程数，默认使用配置文件中的值（0 表示CPU核数）
+            batch_size: 每批评论数，默认使用配置文件中的值
+            
+        Returns:
+            精确模式下为 FrequencySnapshot，近似模式下为 SpaceSavingCounter
+        """
+        if not self.approximate:
+            from word_freq_store import FrequencySnapshot
+            vocabulary = self._get_vocabulary()
+            ids, counts = vocabulary.count(self._token_ids(comments, workers, batch_size),
+                                           self.stopwords)
+            word_freq = FrequencySnapshot(ids, counts, vocabulary)
+            logging.info("分词完成，%s 条评论，"
+                         "共 %s 个有效词汇，%s 个不同词汇", len(comments), word_freq.total, len(word_freq))
+            return word_freq
+        
+        word_freq = self.new_counter()
+        if self._get_cache() is None and not self._tokens:
+            for partial in self._run_segment_batches(comments, False, workers, batch_size):
+                word_freq = self._merge_counts(word_freq, partial)
+        else:
+            for tokens in self._tokenize_comments(comments, workers, batch_size):
+                word_freq.update(tokens)
+        
+        logging.info("分词完成，%s 条评论，"
+                     "共 %s 个有效词汇，%s 个不同词汇", len(comments), sum(word_freq.values()), len(word_freq))
+        return word_freq
+    
+    def segment_movies(self, movies: List[Movie], workers: int = None,
+                       batch_size: int = None) -> List['FrequencySnapshot']:
+        """
+        对每部电影的评论分词，分别统计词频
+        
+        所有电影的评论合并后统一分批（并查询分词缓存），再按电影拆分，
+        对每部电影的词ID数组向量化计数并过滤停用词。
+        
+        Args:
+            movies: 电影列表
+            workers: 工作进程数，默认使用配置文件中的值
+            batch_size: 每批评论数，默认使用配置文件中的值
+            
+        Returns:
+            与 movies 一一对应的词频快照列表
+        """
+        from word_freq_store import FrequencySnapshot
+        
+        vocabulary = self._get_vocabulary()
+        comments = self.collect_comments(movies)
+        comment_ids = self._token_ids(comments, workers, batch_size)
+        
+        results = []
+        start = 0
+        for movie in movies:
+            end = start + len(movie.comments)
+            ids, counts = vocabulary.count(comment_ids[start:end], self.stopwords)
+            results.append(FrequencySnapshot(ids, counts, vocabulary))
+            start = end
+        
+        logging.info("完成 %s 部电影、%s 条评论的分词", len(movies), len(comments))
+        return results
+    
+    def _token_ids(self, comments: List[str], workers: int = None,
+                   batch_size: int = None) -> List[array]:
+        """
+        获取每条评论未过滤停用词的完整词ID数组
+        
+        依次使用本次运行已有的分词结果、分词缓存，其余评论去重后分词，
+        分词结果转换为词ID后保存在内存中。
+        缓存保存未过滤停用词的完整词列表，停用词变化不会使缓存失效。
+        
+        Args:
+            comments: 评论文本列表
+            workers: 工作进程数
+            batch_size: 每批评论数
+            
+        Returns:
+            与 comments 一一对应的词ID数组
+        """
+        missing = [comment for comment in dict.fromkeys(comments) if comment not in self._tokens]
+        if missing:
+            encode = self._get_vocabulary().encode
+            cache = self._get_cache()
+            if cache is not None:
+                namespace = make_namespace(set(), dictionary_version())
+                keys = [SegmentCache.make_key(namespace, comment) for comment in missing]
+                cached = cache.get_many(keys)
+                for key, comment in zip(keys, missing):
+                    if key in cached:
+                        self._tokens[comment] = encode(cached[key])
+            
+            pending = [comment for comment in missing if comment not in self._tokens]
+            segmented = []
+            if pending:
+                for batch_tokens in self._run_segment_batches(pending, True, workers, batch_size):
+                    segmented.extend(batch_tokens)
+            self._tokens.update(zip(pending, map(encode, segmented)))
+            
+            if cache is not None:
+                cache.put_many((SegmentCache.make_key(namespace, comment), tokens)
+                               for comment, tokens in zip(pending, segmented))
+                cache.flush()
+                logging.info("分词缓存: %s 条评论中新分词 %s 条", len(missing), len(pending))
+        
+        return [self._tokens[comment] for comment in comments]
+    
+    def _tokenize_comments(self, comments: List[str], workers: int = None,
+                           batch_size: int = None) -> List[List[str]]:
+        """
+        获取每条评论过滤停用词后的词列表（由词ID数组转换回字符串）
+        
+        Args:
+            comments: 评论文本列表
+            workers: 工作进程数
+            batch_size: 每批评论数
+            
+        Returns:
+            与 comments 一一对应的词列表
+        """
+        decode = self._get_vocabulary().decode
+        comment_ids = self._token_ids(comments, workers, batch_size)
+        return [list(filter_words(decode(ids), self.stopwords)) for ids in comment_ids]
+    
+    def namespace(self) -> str:
+        """
+        当前分词配置（停用词集合、词典版本和近似模式下的快照容量）的摘要
+        
+        Returns:
+            十六进制摘要字符串
+        """
+        version = dictionary_version()
+        if self.approximate:
+            version += f":top{config.HEAVY_HITTER_CAPACITY}"
+        return make_namespace(self.stopwords, version).hex()
+    
+    @profiled(items=count_first_arg)
+    def build_frequency_snapshots(self, movies: List[Movie], store: 'FrequencyStore' = None,
+                                  run_id: str = None) -> List['FrequencySnapshot']:
+        """
+        生成并保存每部电影的词频快照
+        
+        评论和分词配置均未变化的电影直接复用最近一次运行的快照，
+        其余电影分词后保存为新快照。近似模式下每部电影的快照只保留
+        计数最高的 HEAVY_HITTER_CAPACITY 个词，保存和合并的词频不随词汇量增长。
+        
+        Args:
+            movies: 电影列表
+            store: 词频快照存储，默认使用配置文件中的目录
+            run_id: 运行ID，默认按当前时间生成
+            
+        Returns:
+            与 movies 一一对应的词频快照列表
+        """
+        from word_freq_store import FrequencyStore, comments_hash
+        
+        if store is None:
+            store = FrequencyStore(vocabulary=self._get_vocabulary())
+        if run_id is None:
+            run_id = store.new_run_id()
+        namespace = self.namespace()
+        
+        snapshots: List[Optional['FrequencySnapshot']] = [None] * len(movies)
+        pending = []
+        for i, movie in enumerate(movies):
+            content_hash = comments_hash(movie)
+            reusable = store.find_reusable(movie, namespace, content_hash)
+            if reusable is not None and reusable[0] != run_id:
+                store.reuse_movie(run_id, *reusable)
+                snapshots[i] = store.load_snapshot(*reusable)
+            else:
+                pending.append((i, content_hash))
+        
+        new_snapshots = self.segment_movies([movies[i] for i, _ in pending])
+        for (i, content_hash), snapshot in zip(pending, new_snapshots):
+            if self.approximate:
+                snapshot = snapshot.top(config.HEAVY_HITTER_CAPACITY)
+            snapshots[i] = snapshot
+            store.save_movie(run_id, movies[i], snapshot, namespace, content_hash)
+        
+        store.commit(run_id)
+        logging.info("词频快照 %s: 复用 %s 部电影，"
+                     "新生成 %s 部电影", run_id, len(movies) - len(pending), len(pending))
+        return snapshots
+    
+    def _run_segment_batches(self, comments: List[str], keep_tokens: bool,
+                             workers: int = None, batch_size: int = None) -> Iterator:
+        """
+        将评论分批交给分词函数处理，批数大于1时使用进程池
+        
+        Args:
+            comments: 评论文本列表
+            keep_tokens: 是否返回每条评论的词列表（否则返回每批的词频计数器）
+            workers: 工作进程数
+            batch_size: 每批评论数
+            
+        Yields:
+            每批的处理结果
+        """
+        if workers is None:
+            workers = config.SEGMENT_WORKERS
+        if batch_size is None:
+            batch_size = config.SEGMENT_BATCH_SIZE
+        workers = workers or os.cpu_count() or 1
+        
+        batches = [comments[i:i + batch_size] for i in range(0, len(comments), batch_size)]
+        capacity = config.HEAVY_HITTER_CAPACITY if self.approximate else 0
+        
+        if workers <= 1 or len(batches) <= 1:
+            # 数据量小时直接在当前进程处理，省去进程池开销
+            _init_segment_worker(self.stopwords)
+            for batch in batches:
+                yield _segment_batch(batch, keep_tokens, capacity)
+        else:
+            # 父进程先加载词典，fork 出的工作进程可直接复用
+            load_jieba().initialize()
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                     initializer=_init_segment_worker,
+                                     initargs=(self.stopwords,)) as executor:
+                yield from executor.map(_segment_batch, batches, repeat(keep_tokens),
+                                        repeat(capacity))
+        
+        logging.debug("%s 条评论分为 %s 批完成分词", len(comments), len(batches))
+    
+    def _get_cache(self) -> Optional[SegmentCache]:
+        """
+        获取分词缓存，首次使用时打开
+        
+        Returns:
+            SegmentCache对象，未启用缓存返回None
+        """
+        if not self.use_cache:
+            return None
+        if self._cache is None:
+            self._cache = SegmentCache()
+        return self._cache
+    
+    def _get_vocabulary(self) -> 'Vocabulary':
+        """
+        获取持久化词表，首次使用时加载
+        
+        Returns:
+            Vocabulary对象
+        """
+        if self._vocabulary is None:
+            from vocabulary import get_vocabulary
+            self._vocabulary = get_vocabulary()
+        return self._vocabulary
+    
+    def close(self):
+        """保存词表、关闭分词缓存并释放本次运行的分词结果"""
+        self._tokens.clear()
+        if self._vocabulary is not None:
+            self._vocabulary.save()
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+    
+    @profiled(items=count_first_arg)
+    def count_word_frequency(self, words: List[str]) -> Counter:
+        """
+        统计词频
+        
+        Args:
+            words: 词列表
+            
+        Returns:
+            词频统计Counter对象（近似模式下为 SpaceSavingCounter）
+        """
+        word_freq = self.new_counter()
+        word_freq.update(words)
+        logging.info(f"统计完成，共 {len(word_freq)} 个不同词汇")
+        return word_freq
+    
+    def new_counter(self):
+        """
+        创建空的词频计数器
+        
+        Returns:
+            近似模式下为固定容量的 SpaceSavingCounter，否则为 Counter
+        """
+        if self.approximate:
+            return SpaceSavingCounter(config.HEAVY_HITTER_CAPACITY)
+        return Counter()
+    
+    @staticmethod
+    def _merge_counts(word_freq, partial):
+        """合并部分词频结果，近似计数器之间使用 Space-Saving 合并"""
+        if isinstance(word_freq, SpaceSavingCounter) and isinstance(partial, SpaceSavingCounter):
+            return word_freq.merge(partial)
+        word_freq.update(partial)
+        return word_freq
+    
+    @profiled(items=count_first_arg)
+    def extract_movie_keywords(self, movies: List[Movie], snapshots: List['FrequencySnapshot'],
+                               group_by: str = None, top_k: int = None) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        基于每部电影的词频快照提取 TF-IDF 关键词
+        
+        Args:
+            movies: 电影列表
+            snapshots: 与 movies 一一对应的词频快照
+            group_by: "movie" 按电影合并各城市评论，"movie_city" 每个城市单独计算，
+                      默认使用配置文件中的值
+            top_k: 每部电影的关键词数量，默认使用配置文件中的值
+            
+        Returns:
+            文档ID -> [(关键词, TF-IDF)] 列表
+        """
+        from keyword_extractor import DocumentTermMatrix, top_keywords
+        from word_freq_store import movie_key
+        
+        if group_by is None:
+            group_by = config.KEYWORDS_GROUP_BY
+        if top_k is None:
+            top_k = config.KEYWORDS_TOP_K
+        
+        if group_by == 'movie':
+            doc_ids = [movie.movie_id or movie_key(movie) for movie in movies]
+        else:
+            doc_ids = [movie_key(movie) for movie in movies]
+        
+        matrix = DocumentTermMatrix.from_snapshots(doc_ids, snapshots)
+        return top_keywords(matrix, top_k=top_k, max_df_ratio=config.KEYWORDS_MAX_DF_RATIO)
+    
+    def save_movie_keywords(self, movies: List[Movie], keywords: Dict[str, List[Tuple[str, float]]],
+                            group_by: str = None, filepath: str = None):
+        """
+        保存每部电影的关键词到JSON文件
+        
+        Args:
+            movies: 电影列表
+            keywords: extract_movie_keywords 的结果
+            group_by: 与 extract_movie_keywords 相同的分组方式
+            filepath: 保存路径，默认使用配置文件中的路径
+        """
+        from word_freq_store import movie_key
+        
+        if group_by is None:
+            group_by = config.KEYWORDS_GROUP_BY
+        if filepath is None:
+            filepath = config.MOVIE_KEYWORDS_FILE
+        
+        ensure_dir(config.DATA_DIR)
+        
+        records = {}
+        for movie in movies:
+            doc_id = (movie.movie_id or movie_key(movie)) if group_by == 'movie' else movie_key(movie)
+            if doc_id in records:
+                continue
+            records[doc_id] = {
+                'doc_id': doc_id,
+                'movie_id': movie.movie_id or '',
+                'movie_name': movie.movie_name,
+                'city': movie.city if group_by != 'movie' else '',
+                'keywords': [[word, score] for word, score in keywords.get(doc_id, [])],
+            }
+        
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(list(records.values()), f, ensure_ascii=False, indent=2)
+            logging.info("电影关键词已保存到: %s", filepath)
+        except Exception as e:
+            logging.error("保存电影关键词失败: %s", e)
+            raise
+    
+    @profiled(items=count_first_arg)
+    def score_movie_sentiment(self, movies: List[Movie], comments: List[str] = None
+                              ) -> List[Tuple[Optional[float], Optional[float]]]:
+        """
+        基于情感词典计算每部电影的评论情感
+        
+        Args:
+            movies: 电影列表
+            comments: 按电影顺序收集的评论文本，默认从 movies 收集
+            
+        Returns:
+            与 movies 一一对应的 (情感得分, 正面比例)
+        """
+        from sentiment import SentimentScorer
+        
+        if comments is None:
+            comments = self.collect_comments(movies)
+        scorer = SentimentScorer(vocabulary=self._get_vocabulary())
+        return scorer.score_movies(movies, self._token_ids(comments))
+    
+    @profiled(items=count_first_arg)
+    def update_inverted_index(self, movies: List[Movie], comments: List[str] = None) -> int:
+        """
+        将电影评论的分词结果增量写入倒排索引
+        
+        索引不过滤停用词（如“特效”同样可以查询），只去掉单字符和纯数字。
+        
+        Args:
+            movies: 电影列表
+            comments: 按电影顺序收集的评论文本，默认从 movies 收集
+            
+        Returns:
+            新加入索引的评论数量
+        """
+        from inverted_index import InvertedIndex
+        
+        if comments is None:
+            comments = self.collect_comments(movies)
+        index = InvertedIndex(vocabulary=self._get_vocabulary())
+        try:
+            return index.add_movies(movies, self._token_ids(comments))
+        finally:
+            index.close()
+    
+    @profiled(items=count_first_arg)
+    def compute_cooccurrence(self, comments: List[str]) -> 'CooccurrenceCounter':
+        """
+        一次遍历评论分词结果，统计相邻词组和窗口共现词对
+        
+        Args:
+            comments: 评论文本列表
+            
+        Returns:
+            CooccurrenceCounter对象
+        """
+        from cooccurrence import CooccurrenceCounter
+        
+        counter = CooccurrenceCounter(vocabulary=self._get_vocabulary(),
+                                      stopwords=self.phrase_stopwords)
+        counter.update(self._token_ids(comments))
+        logging.info("共现统计完成: %s 条评论，%s 个相邻词组，"
+                     "%s 个共现词对", counter.comments, len(counter.bigrams), len(counter.pairs))
+        return counter
+    
+    def get_top_words(self, word_freq: WordFrequency, top_n: int = None) -> List[Tuple[str, int]]:
+        """
+        获取高频词汇
+        
+        Args:
+            word_freq: 词频统计（Counter、SpaceSavingCounter 或 FrequencySnapshot）
+            top_n: 前N个高频词，默认使用配置文件中的值
+            
+        Returns:
+            (词汇, 频次)元组列表
+        """
+        if top_n is None:
+            top_n = config.TOP_WORDS_COUNT
+        
+        top_words = word_freq.most_common(top_n)
+        return top_words
+    
+    def get_low_frequency_words(self, word_freq: WordFrequency) -> List[Tuple[str, int]]:
+        """
+        获取低频词汇（出现1次的词汇）
+        
+        Args:
+            word_freq: 词频统计（Counter、SpaceSavingCounter 或 FrequencySnapshot）
+            
+        Returns:
+            (词汇, 频次)元组列表
+        """
+        from word_freq_store import FrequencySnapshot
+        
+        if isinstance(word_freq, FrequencySnapshot):
+            low_freq_words = word_freq.words_with_count(1)
+        else:
+            low_freq_words = [(word, count) for word, count in word_freq.items() if count == 1]
+        logging.info(f"找到 {len(low_freq_words)} 个低频词汇（出现1次）")
+        return low_freq_words
+    
+    def save_word_statistics(self, word_freq: WordFrequency, filepath: str = None,
+                             cooccurrence: 'CooccurrenceCounter' = None):
+        """
+        保存词频统计结果
+        
+        Args:
+            word_freq: 词频统计（Counter、SpaceSavingCounter 或 FrequencySnapshot）
+            filepath: 保存路径，默认使用配置文件中的路径
+            cooccurrence: 短语与共现统计结果，提供时追加到报告末尾
+        """
+        from word_freq_store import FrequencySnapshot
+        
+        if filepath is None:
+            filepath = config.WORD_STATISTICS_FILE
+        
+        ensure_dir(config.DATA_DIR)
+        
+        try:
+            top_words = self.get_top_words(word_freq)
+            if isinstance(word_freq, FrequencySnapshot):
+                # 词频快照只把报告中列出的低频词转换为字符串
+                low_freq_total = int((word_freq.counts == 1).sum())
+                low_freq_words = word_freq.words_with_count(1, limit=100)
+            else:
+                low_freq_words = self.get_low_frequency_words(word_freq)
+                low_freq_total = len(low_freq_words)
+            
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write("=" * 50 + "\n")
+                f.write("词频统计报告\n")
+                f.write("=" * 50 + "\n\n")
+                
+                if isinstance(word_freq, SpaceSavingCounter):
+                    f.write(f"统计模式: 近似计数 (Space-Saving, 跟踪 {word_freq.capacity} 个词)\n")
+                    f.write(f"跟踪词汇数: {len(word_freq)}\n")
+                    f.write(f"总词频: {word_freq.total}\n")
+                    f.write(f"频次误差上限: {word_freq.error_bound}\n\n")
+                elif isinstance(word_freq, FrequencySnapshot):
+                    f.write(f"总词汇数: {len(word_freq)}\n")
+                    f.write(f"总词频: {word_freq.total}\n\n")
+                else:
+                    f.write(f"总词汇数: {len(word_freq)}\n")
+                    f.write(f"总词频: {sum(word_freq.values())}\n\n")
+                
+                f.write("-" * 50 + "\n")
+                f.write(f"高频词汇 Top {config.TOP_WORDS_COUNT}:\n")
+                f.write("-" * 50 + "\n")
+                for i, (word, count) in enumerate(top_words, 1):
+                    f.write(f"{i:2d}. {word:15s} : {count:5d} 次\n")
+                
+                f.write("\n" + "-" * 50 + "\n")
+                if isinstance(word_freq, SpaceSavingCounter):
+                    f.write("近似计数模式只保留高频词，以下仅为仍在跟踪中的低频词\n")
+                f.write(f"低频词汇（出现1次）: {low_freq_total} 个\n")
+                f.write("-" * 50 + "\n")
+                # 只显示前100个低频词，避免文件过大
+                for i, (word, count) in enumerate(low_freq_words[:100], 1):
+                    f.write(f"{word:15s} : {count:5d} 次\n")
+                if low_freq_total > 100:
+                    f.write(f"... 还有 {low_freq_total - 100} 个低频词\n")
+                
+                if cooccurrence is not None:
+                    f.write("\n" + "-" * 50 + "\n")
+                    f.write(f"高频短语 Top {config.TOP_WORDS_COUNT}:\n")
+                    f.write("-" * 50 + "\n")
+                    for i, (first, second, count) in enumerate(
+                            cooccurrence.top_bigrams(config.TOP_WORDS_COUNT), 1):
+                        f.write(f"{i:2d}. {first + second:15s} : {count:5d} 次\n")
+                    
+                    f.write("\n" + "-" * 50 + "\n")
+                    f.write(f"高频共现词对 Top {config.TOP_WORDS_COUNT}"
+                            f"（同一评论内相距不超过 {cooccurrence.window} 个词）:\n")
+                    f.write("-" * 50 + "\n")
+                    for i, (first, second, count) in enumerate(
+                            cooccurrence.top_pairs(config.TOP_WORDS_COUNT), 1):
+                        f.write(f"{i:2d}. {first + ' + ' + second:20s} : {count:5d} 次\n")
+                    if cooccurrence.pairs.undercount:
+                        f.write(f"低频词对已剪枝，计数最多低估 {cooccurrence.pairs.undercount} 次\n")
+            
+            logging.info(f"词频统计已保存到: {filepath}")
+        except Exception as e:
+            logging.error(f"保存词频统计失败: {str(e)}")
+            raise
+    
+    @profiled()
+    def generate_wordcloud(self, word_freq: WordFrequency, filepath: str = None):
+        """
+        生成词云图
+        
+        Args:
+            word_freq: 词频统计（Counter、SpaceSavingCounter 或 FrequencySnapshot）
+            filepath: 保存路径，默认使用配置文件中的路径
+        """
+        if filepath is None:
+            filepath = config.WORDCLOUD_IMAGE_FILE
+        
+        ensure_dir(os.path.dirname(filepath) or config.IMAGES_DIR)
+        
+        try:
+            options = wordcloud_options()
+            
+            # 只传入布局会用到的前 max_words 个词
+            word_dict = dict(word_freq.most_common(options['max_words']))
+            
+            if not word_dict:
+                logging.warning("没有词汇数据，无法生成词云")
+                return
+            
+            render_wordcloud(word_dict, filepath, options)
+            logging.info(f"词云图已保存到: {filepath}")
+            
+        except Exception as e:
+            logging.error(f"生成词云失败: {str(e)}")
+            raise
+    
+    @profiled(items=count_first_arg)
+    def generate_wordclouds(self, movies: List[Movie], snapshots: List['FrequencySnapshot'],
+                            preview: bool = None, workers: int = None) -> List[str]:
+        """
+        批量生成每部电影和每个城市的词云图
+        
+        字体只解析一次，渲染任务分发到进程池；输入词频（前 max_words 个词）
+        和渲染参数与上次渲染相同且图片仍存在时跳过该图片。
+        
+        输出目录结构:
+            images/wordclouds[/preview]/movie/<城市>_<电影ID>.png
+            images/wordclouds[/preview]/city/<城市>.png
+        
+        Args:
+            movies: 电影列表
+            snapshots: 与 movies 一一对应的词频快照
+            preview: 是否使用低分辨率预览模式，默认使用配置文件中的值
+            workers: 渲染进程数，默认使用配置文件中的值（0 表示CPU核数）
+            
+        Returns:
+            本次实际渲染的图片路径列表
+        """
+        from word_freq_store import FrequencySnapshot, movie_key
+        
+        if preview is None:
+            preview = config.WORDCLOUD_PREVIEW
+        if workers is None:
+            workers = config.WORDCLOUD_WORKERS
+        workers = workers or os.cpu_count() or 1
+        
+        options = wordcloud_options(preview)
+        output_dir = config.WORDCLOUD_BATCH_DIR
+        if preview:
+            output_dir = os.path.join(output_dir, 'preview')
+        
+        # 每部电影一张，每个城市合并后一张
+        targets = []
+        by_city: Dict[str, List[FrequencySnapshot]] = {}
+        for movie, snapshot in zip(movies, snapshots):
+            targets.append((os.path.join(output_dir, 'movie', f"{movie_key(movie)}.png"), snapshot))
+            by_city.setdefault(movie.city or 'unknown', []).append(snapshot)
+        for city, city_snapshots in by_city.items():
+            targets.append((os.path.join(output_dir, 'city', f"{city}.png"),
+                            FrequencySnapshot.merge(city_snapshots)))
+        
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        
+        jobs = []
+        digests = {}
+        skipped = 0
+        for filepath, snapshot in targets:
+            frequencies = dict(snapshot.most_common(options['max_words']))
+            if not frequencies:
+                continue
+            digest = render_digest(frequencies, options)
+            digests[filepath] = digest
+            if manifest.get(filepath) == digest and os.path.exists(filepath):
+                skipped += 1
+                continue
+            ensure_dir(os.path.dirname(filepath))
+            jobs.append((frequencies, filepath))
+        
+        rendered = []
+        if workers <= 1 or len(jobs) <= 1:
+            for frequencies, filepath in jobs:
+                rendered.append(render_wordcloud(frequencies, filepath, options))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                rendered.extend(executor.map(render_wordcloud,
+                                             [job[0] for job in jobs],
+                                             [job[1] for job in jobs],
+                                             repeat(options)))
+        
+        manifest.update(digests)
+        ensure_dir(output_dir)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        
+        logging.info("批量词云: 渲染 %s 张，未变化跳过 %s 张，输出目录 %s", len(rendered), skipped, output_dir)
+        return rendered
+    
+    @profiled(items=count_first_arg)
+    def process_comments(self, movies: List[Movie], stopwords_file: str = None):
+        """
+        处理评论，生成词频统计和词云
+        
+        Args:
+            movies: 电影列表
+            stopwords_file: 停用词文件路径
+        """
+        logging.info("开始处理评论数据...")
+        
+        # 剔除近似重复评论，避免复制粘贴和刷评放大词频
+        source_movies = movies
+        if config.DEDUP_ENABLED:
+            from dedup import CommentDeduplicator
+            movies = CommentDeduplicator().deduplicate(movies)
+        
+        # 提取评论
+        comments = self.collect_comments(movies)
+        total_chars = sum(len(comment) for comment in comments)
+        logging.info("提取了 %s 条评论，总字符数: %s", len(comments), total_chars)
+        
+        if total_chars < 10:
+            logging.warning("评论数据不足，无法进行分析")
+            return
+        
+        # 评论情感分析，结果写入原电影记录；分词结果保留在内存中供词频统计复用
+        if config.SENTIMENT_ENABLED:
+            sentiments = self.score_movie_sentiment(movies, comments)
+            for movie, (score, positive_ratio) in zip(source_movies, sentiments):
+                movie.sentiment_score = score
+                movie.positive_ratio = positive_ratio
+        
+        # 评论倒排索引增量更新
+        if config.INVERTED_INDEX_ENABLED:
+            self.update_inverted_index(movies, comments)
+        
+        if config.WORD_FREQ_SNAPSHOTS_ENABLED:
+            # 按电影生成词频快照，全局词频由快照合并得到
+            from word_freq_store import FrequencySnapshot
+            snapshots = self.build_frequency_snapshots(movies)
+            if self.approximate:
+                # 逐个快照累加到固定容量的计数器，内存不随词汇量增长
+                word_freq = self.new_counter()
+                for snapshot in snapshots:
+                    word_freq.update(snapshot.to_counter())
+            else:
+                # 按词ID合并，报告和词云只把前 K 个词转换为字符串
+                word_freq = FrequencySnapshot.merge(snapshots)
+            
+            # 每部电影的 TF-IDF 关键词
+            keywords = self.extract_movie_keywords(movies, snapshots)
+            self.save_movie_keywords(movies, keywords)
+            
+            # 每部电影、每个城市的词云
+            if config.WORDCLOUD_BATCH_ENABLED:
+                self.generate_wordclouds(movies, snapshots)
+        else:
+            # 分批并行分词并统计词频
+            word_freq = self.segment_comments(comments)
+        
+        if not word_freq:
+            logging.warning("分词结果为空")
+            return
+        
+        # 相邻词组和共现词对
+        cooccurrence = None
+        if config.COOCCURRENCE_ENABLED:
+            cooccurrence = self.compute_cooccurrence(comments)
+            cooccurrence.save()
+        
+        # 保存统计结果
+        self.save_word_statistics(word_freq, cooccurrence=cooccurrence)
+        
+        # 生成词云
+        self.generate_wordcloud(word_freq)
+        
+        logging.info("评论处理完成")
+